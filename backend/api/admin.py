@@ -1,23 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-import cloudinary
-import cloudinary.uploader
 import pandas as pd
 import os
 import logging
-import io # Para exportar a Excel
-from typing import List, Optional
+import shutil
+import tempfile
+import json
+import asyncio
+from typing import List, Literal, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.database import get_db
+from core.cache import StaleWhileRevalidate
+from core.config import settings
+from core.database import get_db, id_in, AsyncSessionLocal
+from core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from core.security import password_hash_stats
+from services import catalog_cache, principal_cache, sales_rollup
+from services import sales_analytics as sales_analytics_service
+from services.product_import import import_file
+from services import image_storage, jobs, order_export
 from models.product import Product
 from models.order import Order, OrderItem, OrderStatus # ✅ Importa el Enum
 from models.user import User, UserRole # ✅ Importa UserRole
-from sqlalchemy import select, update, delete, func, extract, desc
-from sqlalchemy.orm import joinedload, selectinload
+from models.analytics import DailySalesRollup, DailyProductSalesRollup
+from models.job import Job
+from sqlalchemy import select, update, delete, func, desc, tuple_
 from jose import jwt
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 
 # Configurar un logger
 logging.basicConfig(level=logging.INFO)
@@ -25,18 +37,13 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# ---------------- CONFIG CLOUDINARY ----------------
-CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
-CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
-CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
+# ---------------- CONFIG ----------------
+# (Cloudinary se configura en services/image_storage.py)
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 
-cloudinary.config(
-    cloud_name=CLOUDINARY_CLOUD_NAME,
-    api_key=CLOUDINARY_API_KEY,
-    api_secret=CLOUDINARY_API_SECRET
-)
+# Filas por bloque al leer pedidos con cursor del lado del servidor
+ORDERS_STREAM_CHUNK = 500
 
 # ---------------- SCHEMAS (BUENA PRÁCTICA) ----------------
 
@@ -96,139 +103,197 @@ def verify_admin_token(authorization: str = Header(...)):
             detail=f"No autorizado (admin): {str(e)}"
         )
 
-# ---------------- DASHBOARD ADMIN (MEJORADO) ----------------
+# ---------------- DASHBOARD ADMIN (CONSULTAS AGRUPADAS Y CONCURRENTES) ----------------
+
+async def _fetch_all(statement):
+    """Ejecuta una consulta en su propia sesión (conexión del pool) para poder lanzarla en paralelo."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(statement)
+        return result.all()
+
+
+async def _build_dashboard() -> dict:
+    """
+    Calcula el payload del dashboard. Los KPIs, la serie de 7 días, el top de productos
+    y el desglose de estados salen de los rollups diarios (coste proporcional a días,
+    no a pedidos); junto con los pedidos recientes se ejecutan en paralelo.
+    """
+    now = datetime.now(timezone.utc)
+    income_statuses = [s.value for s in sales_rollup.INCOME_STATUSES]
+    is_income = DailySalesRollup.status.in_(income_statuses)
+
+    # Los rollups se agrupan por día UTC
+    today = now.date()
+    month_start = today.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    in_month = DailySalesRollup.day >= month_start, DailySalesRollup.day < next_month
+    week_start = today - timedelta(days=6)
+
+    # --- 1. KPIs del mes y globales en una sola consulta ---
+    income_orders = func.sum(DailySalesRollup.orders_count).filter(is_income)
+    kpis_query = select(
+        func.coalesce(func.sum(DailySalesRollup.gross_amount).filter(*in_month, is_income), 0).label("ingresos_mes"),
+        func.coalesce(func.sum(DailySalesRollup.orders_count).filter(*in_month), 0).label("pedidos_mes"),
+        func.coalesce(func.sum(DailySalesRollup.orders_count), 0).label("total_orders"),
+        func.coalesce(
+            func.sum(DailySalesRollup.gross_amount).filter(is_income) / func.nullif(income_orders, 0), 0
+        ).label("average_order_value"),
+        select(func.count(User.id)).scalar_subquery().label("total_users"),
+        select(func.count(User.id))
+        .where(User.created_at >= datetime.combine(month_start, datetime.min.time(), timezone.utc),
+               User.created_at < datetime.combine(next_month, datetime.min.time(), timezone.utc))
+        .scalar_subquery().label("clientes_mes"),
+        select(func.count(Product.id)).scalar_subquery().label("total_products"),
+    )
+
+    # --- 2. Ventas de los últimos 7 días ---
+    sales_query = (
+        select(DailySalesRollup.day, func.sum(DailySalesRollup.gross_amount).label("ventas"))
+        .where(DailySalesRollup.day >= week_start, is_income)
+        .group_by(DailySalesRollup.day)
+    )
+
+    # --- 3. Top Productos ---
+    sold = func.sum(DailyProductSalesRollup.units).label("sold")
+    top_query = (
+        select(DailyProductSalesRollup.product_id, Product.name, sold)
+        .join(Product, Product.id == DailyProductSalesRollup.product_id)
+        .group_by(DailyProductSalesRollup.product_id, Product.name)
+        .having(sold > 0)
+        .order_by(desc("sold"))
+        .limit(5)
+    )
+
+    # --- 4. Pedidos Recientes ---
+    recent_query = (
+        select(Order, User)
+        .join(User, Order.user_id == User.id)
+        .order_by(desc(Order.created_at))
+        .limit(5)
+    )
+
+    # --- 5. Desglose de Estados ---
+    status_count = func.sum(DailySalesRollup.orders_count).label("count")
+    status_query = (
+        select(DailySalesRollup.status, status_count)
+        .group_by(DailySalesRollup.status)
+        .having(status_count > 0)
+    )
+
+    kpi_rows, sales_rows, top_rows, recent_rows, status_rows = await asyncio.gather(
+        _fetch_all(kpis_query),
+        _fetch_all(sales_query),
+        _fetch_all(top_query),
+        _fetch_all(recent_query),
+        _fetch_all(status_query),
+    )
+
+    kpis = kpi_rows[0]
+    sales_by_day = {r.day: float(r.ventas or 0) for r in sales_rows}
+    salesData = []
+    for d in range(6, -1, -1): # 7 días incluyendo hoy
+        day = today - timedelta(days=d)
+        salesData.append({"name": day.strftime("%d %b"), "ventas": round(sales_by_day.get(day, 0), 2)})
+
+    topProducts = [
+        {"id": r.product_id, "name": r.name, "sold": r.sold}
+        for r in top_rows
+    ]
+    recentOrders = [{
+        "id": order.id,
+        "customer": user.name,
+        "date": order.created_at.strftime("%b %d, %Y"),
+        "total": float(order.total_amount),
+        "status": order.status.value
+    } for order, user in recent_rows]
+    statusBreakdown = [
+        {"name": status, "value": count}
+        for status, count in status_rows
+    ]
+
+    return {
+        "stats": [
+            {"title": "Ingresos (Mes)", "value": f"${kpis.ingresos_mes:,.2f}"},
+            {"title": "Nuevos Pedidos (Mes)", "value": kpis.pedidos_mes},
+            {"title": "Nuevos Clientes (Mes)", "value": kpis.clientes_mes},
+            {"title": "Ticket Promedio (AOV)", "value": f"${kpis.average_order_value:,.2f}"}
+        ],
+        "kpis": {
+            "total_users": kpis.total_users,
+            "total_products": kpis.total_products,
+            "total_orders": kpis.total_orders
+        },
+        "salesData": salesData,
+        "topProducts": topProducts,
+        "recentOrders": recentOrders,
+        "statusBreakdown": statusBreakdown
+    }
+
+
+# Varios admins con auto-refresco comparten el mismo payload; se recalcula como mucho
+# una vez por TTL y, mientras, se sirve el anterior
+_dashboard_cache = StaleWhileRevalidate(
+    _build_dashboard, ttl=settings.DASHBOARD_CACHE_TTL, max_stale=settings.DASHBOARD_CACHE_MAX_STALE
+)
+
+
 @router.get("/dashboard")
-async def dashboard_metrics(db: AsyncSession = Depends(get_db), admin=Depends(verify_admin_token)):
+async def dashboard_metrics(refresh: bool = False, admin=Depends(verify_admin_token)):
     """
     Obtiene las métricas clave para el dashboard del administrador.
+    `cache` indica cuándo se generó el payload (age_seconds, stale); refresh=true fuerza
+    a recalcularlo.
     """
     try:
-        now = datetime.utcnow()
-        
-        # ✅ ¡CORREGIDO! Usar los valores en español del Enum
-        valid_income_statuses = [OrderStatus.COMPLETADO, OrderStatus.ENVIADO]
-        
-        # --- 1. KPIs Principales (Stats) ---
-        logger.info("Iniciando consulta de dashboard: 1. Ingresos (Mes)")
-        ingresos_res = await db.execute(
-            select(func.sum(Order.total_amount)).where(
-                extract("month", Order.created_at) == now.month,
-                extract("year", Order.created_at) == now.year,
-                Order.status.in_(valid_income_statuses)
-            )
-        )
-        ingresos_mes = ingresos_res.scalar() or 0
-        
-        logger.info("Iniciando consulta de dashboard: 2. Pedidos (Mes)")
-        pedidos_mes_res = await db.execute(
-            select(func.count(Order.id)).where(
-                extract("month", Order.created_at) == now.month,
-                extract("year", Order.created_at) == now.year
-            )
-        )
-        pedidos_mes = pedidos_mes_res.scalar() or 0
-        
-        logger.info("Iniciando consulta de dashboard: 3. Clientes (Mes)")
-        clientes_mes_res = await db.execute(
-            select(func.count(User.id)).where(
-                extract("month", User.created_at) == now.month,
-                extract("year", User.created_at) == now.year
-            )
-        )
-        clientes_mes = clientes_mes_res.scalar() or 0
+        payload, cache_meta = await _dashboard_cache.get(force=refresh)
+        return {**payload, "cache": cache_meta}
+    except Exception as e:
+        logger.exception(f"Error 500 al generar métricas del dashboard: {e}")
+        raise HTTPException(status_code=500, detail=f"Error al generar métricas: {e}")
 
-        # --- 2. KPIs Globales (NUEVO) ---
-        logger.info("Iniciando consulta de dashboard: 4. KPIs Globales")
-        total_users_res = await db.execute(select(func.count(User.id)))
-        total_users = total_users_res.scalar() or 0
-        
-        total_products_res = await db.execute(select(func.count(Product.id)))
-        total_products = total_products_res.scalar() or 0
-        
-        total_orders_res = await db.execute(select(func.count(Order.id)))
-        total_orders = total_orders_res.scalar() or 0
-        
-        aov_res = await db.execute(
-            select(func.avg(Order.total_amount)).where(Order.status.in_(valid_income_statuses))
-        )
-        average_order_value = aov_res.scalar() or 0
-
-        # --- 3. Gráfica de Ventas (7 días) ---
-        logger.info("Iniciando consulta de dashboard: 5. Ventas (7 días)")
-        salesData = []
-        for d in range(6, -1, -1): # 7 días incluyendo hoy
-            date = now - timedelta(days=d)
-            ventas_res = await db.execute(
-                select(func.sum(Order.total_amount)).where(
-                    func.date(Order.created_at) == date.date(),
-                    Order.status.in_(valid_income_statuses)
-                )
-            )
-            ventas = ventas_res.scalar() or 0
-            salesData.append({"name": date.strftime("%d %b"), "ventas": round(ventas, 2)})
-
-        # --- 4. Top Productos (OK) ---
-        logger.info("Iniciando consulta de dashboard: 6. Top Productos")
-        top_query = (
-            select(OrderItem.product_id, Product.name, func.sum(OrderItem.quantity).label("sold"))
-            .join(Product, Product.id == OrderItem.product_id)
-            .group_by(OrderItem.product_id, Product.name)
-            .order_by(desc("sold"))
-            .limit(5)
-        )
-        top_result = await db.execute(top_query)
-        topProducts = [
-            {"id": r.product_id, "name": r.name, "sold": r.sold}
-            for r in top_result.fetchall()
-        ]
 
-        # --- 5. Pedidos Recientes (OK) ---
-        logger.info("Iniciando consulta de dashboard: 7. Pedidos Recientes")
-        recent_query = (
-            select(Order, User)
-            .join(User, Order.user_id == User.id)
-            .order_by(desc(Order.created_at))
-            .limit(5)
-        )
-        recent_result = await db.execute(recent_query)
-        recentOrders = [{
-            "id": order.id,
-            "customer": user.name,
-            "date": order.created_at.strftime("%b %d, %Y"),
-            "total": float(order.total_amount),
-            "status": order.status.value
-        } for order, user in recent_result.fetchall()]
-
-        # --- 6. Desglose de Estados (NUEVO) ---
-        logger.info("Iniciando consulta de dashboard: 8. Desglose de Estados")
-        status_query = select(Order.status, func.count(Order.id).label("count")).group_by(Order.status)
-        status_result = await db.execute(status_query)
-        statusBreakdown = [
-            {"name": status.value, "value": count}
-            for status, count in status_result.fetchall()
-        ]
+@router.get("/metrics/password-hashing")
+async def password_hashing_metrics(admin=Depends(verify_admin_token)):
+    """Carga del pool de bcrypt: pendientes, rechazos (503) y tiempos medios en cola y de cálculo."""
+    return password_hash_stats()
+
+
+# ---------------- ANALÍTICA DE VENTAS (DESDE ROLLUPS) ----------------
+# Rango máximo por consulta; los rollups son diarios, así que el coste crece con los días
+ANALYTICS_MAX_DAYS = 366 * 5
+
+@router.get("/analytics/sales")
+async def sales_analytics(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    granularity: Literal["day", "week", "month"] = "day",
+    group_by: Optional[Literal["category", "brand", "product"]] = None,
+    compare: Optional[Literal["yoy"]] = None,
+    top: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(verify_admin_token)
+):
+    """
+    Serie temporal de ingresos (pedidos COMPLETADO/ENVIADO) entre `from` y `to` (por defecto,
+    los últimos 30 días), con huecos rellenados a 0. Con group_by devuelve una serie por
+    categoría/marca/producto (las `top` mayores + "Otros"); compare=yoy añade el mismo
+    rango del año anterior.
+    """
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' debe ser anterior o igual a 'to'")
+    if (date_to - date_from).days > ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"El rango máximo es de {ANALYTICS_MAX_DAYS} días")
 
-        logger.info("Consultas de dashboard completadas con éxito.")
-        return {
-            "stats": [
-                {"title": "Ingresos (Mes)", "value": f"${ingresos_mes:,.2f}"},
-                {"title": "Nuevos Pedidos (Mes)", "value": pedidos_mes},
-                {"title": "Nuevos Clientes (Mes)", "value": clientes_mes},
-                {"title": "Ticket Promedio (AOV)", "value": f"${average_order_value:,.2f}"}
-            ],
-            "kpis": {
-                "total_users": total_users,
-                "total_products": total_products,
-                "total_orders": total_orders
-            },
-            "salesData": salesData,
-            "topProducts": topProducts,
-            "recentOrders": recentOrders,
-            "statusBreakdown": statusBreakdown
-        }
+    try:
+        return await sales_analytics_service.sales_timeseries(
+            db, date_from, date_to, granularity, group_by, compare == "yoy", top
+        )
     except Exception as e:
-        logger.exception(f"Error 500 al generar métricas del dashboard: {e}")
-        raise HTTPException(status_code=500, detail=f"Error al generar métricas: {e}")
+        logger.exception(f"Error 500 al generar analítica de ventas: {e}")
+        raise HTTPException(status_code=500, detail=f"Error al generar analítica: {e}")
+
 
 # ---------------- PRODUCTOS ADMIN (MEJORADO CON SCHEMAS) ----------------
 @router.get("/products")
@@ -258,7 +323,9 @@ async def create_product(product_data: ProductCreate, db: AsyncSession = Depends
 
         new_product = Product(**product_data.model_dump())
         db.add(new_product)
+        await catalog_cache.bump(db)
         await db.commit()
+        catalog_cache.invalidate()
         await db.refresh(new_product)
         return {"success": True, "product_id": new_product.id}
     except Exception as e:
@@ -278,8 +345,11 @@ async def update_product(product_id: int, product_data: ProductUpdate, db: Async
         if not update_data:
             raise HTTPException(status_code=400, detail="No hay datos para actualizar")
 
-        await db.execute(update(Product).where(Product.id == product_id).values(**update_data))
+        # content_hash=NULL: la próxima importación vuelve a aplicar su fila aunque no cambie
+        await db.execute(update(Product).where(Product.id == product_id).values(**update_data, content_hash=None))
+        await catalog_cache.bump(db)
         await db.commit()
+        catalog_cache.invalidate()
         return {"success": True}
     except Exception as e:
         await db.rollback()
@@ -293,77 +363,158 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db), ad
     """
     try:
         await db.execute(delete(Product).where(Product.id == product_id))
+        await catalog_cache.bump(db)
         await db.commit()
+        catalog_cache.invalidate()
         return {"success": True}
     except Exception as e:
         await db.rollback()
         logger.exception(f"Error 500 al eliminar producto: {e}")
         raise HTTPException(status_code=500, detail=f"Error al eliminar producto: {e}")
 
-# ---------------- PEDIDOS ADMIN (OPTIMIZADO N+1) ----------------
+# ---------------- PEDIDOS ADMIN (PAGINADO + STREAMING) ----------------
+
+def _order_filters(
+    status: Optional[str],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    email: Optional[str],
+    order_number: Optional[str],
+) -> list:
+    """Condiciones WHERE comunes para listar/exportar pedidos (requiere JOIN con User)."""
+    conditions = []
+    if status:
+        try:
+            conditions.append(Order.status == OrderStatus(status.upper()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Estado no válido: {status}")
+    if date_from:
+        conditions.append(Order.created_at >= date_from)
+    if date_to:
+        conditions.append(Order.created_at < date_to)
+    if email:
+        conditions.append(func.lower(User.email) == email.strip().lower())
+    if order_number:
+        conditions.append(Order.order_number == order_number.strip().upper())
+    return conditions
+
+
+def _serialize_admin_order(order: Order, user: User, items: list) -> dict:
+    return {
+        "id": order.id,
+        "order_number": order.order_number,
+        "created_at": order.created_at,
+        "total_amount": float(order.total_amount),
+        "status": order.status.value,
+        "shipping_address": order.shipping_address,
+        "user": {
+            "name": user.name,
+            "email": user.email
+        },
+        "items": items
+    }
+
+
+def _serialize_admin_item(item: OrderItem, product: Optional[Product]) -> dict:
+    return {
+        "id": item.id,
+        "product_id": item.product_id,
+        "quantity": item.quantity,
+        "product_name": product.name if product else "Producto Eliminado",
+        "product_price": float(product.price) if product else 0.0
+    }
+
+
+async def _stream_orders_ndjson(conditions: list):
+    """
+    Genera una línea JSON por pedido leyendo con un cursor del lado del servidor
+    (stream_results) en bloques, así la memoria no depende del número de pedidos.
+    Usa su propia sesión porque se ejecuta después de devolver la respuesta.
+    """
+    query = (
+        select(Order, User, OrderItem, Product)
+        .join(User, Order.user_id == User.id)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(*conditions)
+        .order_by(desc(Order.created_at), desc(Order.id), OrderItem.id)
+        .execution_options(yield_per=ORDERS_STREAM_CHUNK)
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        current, current_user, items = None, None, []
+        async for order, user, item, product in result:
+            if current is not None and order.id != current.id:
+                yield json.dumps(jsonable_encoder(_serialize_admin_order(current, current_user, items))) + "\n"
+                items = []
+            current, current_user = order, user
+            if item is not None:
+                items.append(_serialize_admin_item(item, product))
+        if current is not None:
+            yield json.dumps(jsonable_encoder(_serialize_admin_order(current, current_user, items))) + "\n"
+
 
 @router.get("/orders")
 async def get_all_orders(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    email: Optional[str] = None,
+    order_number: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
     db: AsyncSession = Depends(get_db), 
     admin = Depends(verify_admin_token)
 ):
     """
-    Obtiene todos los pedidos con detalles de usuario e items (Optimizado).
+    Lista pedidos con usuario e items, del más reciente al más antiguo.
+    - format=json: paginado por cursor sobre (created_at, id); el siguiente va en X-Next-Cursor.
+    - format=ndjson: volcado completo en streaming (un pedido por línea), ignora limit/cursor.
     """
+    conditions = _order_filters(status, date_from, date_to, email, order_number)
+    if format == "ndjson":
+        return StreamingResponse(_stream_orders_ndjson(conditions), media_type="application/x-ndjson")
+
+    after = decode_cursor(cursor, (datetime, int))
+    if after is not None:
+        conditions.append(tuple_(Order.created_at, Order.id) < tuple_(*after))
+
     try:
-        # 1. Obtener todos los pedidos con la info del usuario (joinedload)
+        # 1. Página de pedidos con su usuario (limit + 1 para saber si hay más)
         order_query = (
-            select(Order)
-            .options(joinedload(Order.user))
-            .order_by(desc(Order.created_at))
+            select(Order, User)
+            .join(User, Order.user_id == User.id)
+            .where(*conditions)
+            .order_by(desc(Order.created_at), desc(Order.id))
+            .limit(limit + 1)
         )
-        order_result = await db.execute(order_query)
-        orders = order_result.scalars().unique().all()
-        
-        order_ids = [order.id for order in orders]
-        
-        if not order_ids:
+        rows = (await db.execute(order_query)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.created_at, last.id])
+
+        if not rows:
             return []
-            
-        # 2. Obtener TODOS los items y productos para esos pedidos en UNA consulta
+
+        # 2. Items y productos de la página en UNA consulta
         items_query = (
-            select(OrderItem)
-            .options(joinedload(OrderItem.product)) # Carga el producto de cada item
-            .where(OrderItem.order_id.in_(order_ids))
+            select(OrderItem, Product)
+            .outerjoin(Product, Product.id == OrderItem.product_id)
+            .where(id_in(OrderItem.order_id, [order.id for order, _ in rows]))
+            .order_by(OrderItem.id)
         )
-        items_result = await db.execute(items_query)
-        all_items = items_result.scalars().all()
-        
-        # 3. Mapear los items a sus pedidos en Python (mucho más rápido)
         items_by_order_id = {}
-        for item in all_items:
-            if item.order_id not in items_by_order_id:
-                items_by_order_id[item.order_id] = []
-            items_by_order_id[item.order_id].append({
-                "id": item.id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "product_name": item.product.name if item.product else "Producto Eliminado",
-                "product_price": float(item.product.price) if item.product else 0.0
-            })
-            
-        # 4. Construir la respuesta final
-        orders_list = []
-        for order in orders:
-            orders_list.append({
-                "id": order.id,
-                "created_at": order.created_at,
-                "total_amount": float(order.total_amount),
-                "status": order.status.value,
-                "shipping_address": order.shipping_address,
-                "user": {
-                    "name": order.user.name,
-                    "email": order.user.email
-                },
-                "items": items_by_order_id.get(order.id, []) # Asigna los items desde el mapa
-            })
-        
-        return orders_list
+        for item, product in (await db.execute(items_query)).all():
+            items_by_order_id.setdefault(item.order_id, []).append(_serialize_admin_item(item, product))
+
+        # 3. Construir la respuesta final
+        return [
+            _serialize_admin_order(order, user, items_by_order_id.get(order.id, []))
+            for order, user in rows
+        ]
         
     except Exception as e:
         logger.exception(f"Error 500 al obtener pedidos: {e}")
@@ -390,12 +541,15 @@ async def update_order_status(
             logger.warning(f"Intento de actualizar a estado no válido: {request.status}")
             raise HTTPException(status_code=400, detail=f"Estado no válido: {request.status}")
 
-        order_res = await db.execute(select(Order).where(Order.id == order_id))
+        # FOR UPDATE: dos cambios simultáneos no pueden mover el pedido de cubo dos veces
+        order_res = await db.execute(select(Order).where(Order.id == order_id).with_for_update())
         order = order_res.scalar_one_or_none()
         
         if not order:
             raise HTTPException(status_code=404, detail="Pedido no encontrado")
         
+        await sales_rollup.record_status_change(db, order, order.status, OrderStatus(status_upper))
+
         # Actualiza el estado usando el valor de string validado
         await db.execute(
             update(Order)
@@ -443,12 +597,16 @@ async def update_user_role(
     Actualiza el rol de un usuario (ej. a ADMIN o USER).
     """
     try:
-        await db.execute(
+        result = await db.execute(
             update(User)
             .where(User.id == user_id)
             .values(role=request.role) # Pydantic ya validó el Enum
+            .returning(User.email)
         )
+        email = result.scalar_one_or_none()
         await db.commit()
+        if email:
+            principal_cache.invalidate(email)
         return {"success": True, "user_id": user_id, "new_role": request.role.value}
     except Exception as e:
         await db.rollback()
@@ -468,16 +626,20 @@ async def delete_user(
     """
     try:
         # Opción 1: Desactivar (Recomendado)
-        await db.execute(
+        result = await db.execute(
             update(User)
             .where(User.id == user_id)
             .values(is_active=False)
+            .returning(User.email)
         )
+        email = result.scalar_one_or_none()
         
         # Opción 2: Eliminar (Peligroso si hay pedidos)
         # await db.execute(delete(User).where(User.id == user_id))
         
         await db.commit()
+        if email:
+            principal_cache.invalidate(email)
         return {"success": True, "action": "user deactivated"}
     except Exception as e:
         await db.rollback()
@@ -486,76 +648,62 @@ async def delete_user(
 
 
 # ---------------- UTILIDADES ADMIN (EXCEL & IMÁGENES) ----------------
+def _upload_list(file: Optional[UploadFile], files: List[UploadFile]) -> List[UploadFile]:
+    # `file` es el campo original (una imagen); `files` admite varias en la misma petición
+    uploads = ([file] if file else []) + (files or [])
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No se recibió ninguna imagen")
+    if len(uploads) > settings.IMAGE_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.IMAGE_MAX_FILES} imágenes por petición")
+    return uploads
+
+
 @router.post("/upload-images")
-async def upload_images(file: UploadFile = File(...), admin=Depends(verify_admin_token)):
+async def upload_images(
+    file: Optional[UploadFile] = File(None),
+    files: List[UploadFile] = File([]),
+    admin=Depends(verify_admin_token)
+):
     """
-    Sube una imagen de producto a Cloudinary.
+    Sube una o varias imágenes de producto al almacenamiento configurado (Cloudinary).
+    Las subidas van en paralelo fuera del event loop y las imágenes ya subidas antes
+    se reutilizan sin volver a subirlas. `urls` lleva las URLs correctas en orden;
+    `files` el detalle por archivo (incluidos errores).
     """
-    temp_path = f"/tmp/{file.filename}"
+    uploads = _upload_list(file, files)
+    temp_dir = tempfile.mkdtemp(prefix="uploads-")
     try:
-        with open(temp_path, "wb") as f:
-            f.write(await file.read())
-            
-        result = cloudinary.uploader.upload(
-            temp_path,
-            folder="campeones-gn/products",
-            transformation=[
-                {"width": 800, "height": 800, "crop": "limit"},
-                {"quality": "auto"}
-            ],
-        )
-        return {"urls": [result["secure_url"]]}
+        spooled = [await image_storage.spool_upload(upload, temp_dir) for upload in uploads]
+        results = await image_storage.store_images(spooled)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error 500 al subir imagen: {e}")
         raise HTTPException(status_code=500, detail=f"Error al subir imagen: {str(e)}")
     finally:
-        if os.path.exists(temp_path):
-             os.remove(temp_path)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    urls = [r["url"] for r in results if "url" in r]
+    if not urls:
+        raise HTTPException(status_code=502, detail=f"Error al subir imagen: {results[0]['error']}")
+    return {"urls": urls, "files": results}
 
 @router.post("/import-excel")
 async def import_excel(excel: UploadFile = File(...), db: AsyncSession = Depends(get_db), admin=Depends(verify_admin_token)):
     """
-    Importa o actualiza productos masivamente desde un archivo Excel.
+    Importa o actualiza productos masivamente desde un archivo Excel (.xlsx) o CSV.
+    El archivo se lee y se escribe por bloques de IMPORT_BATCH_SIZE filas. Los productos
+    se identifican por (Nombre, Marca); las filas inválidas se omiten y se devuelven en
+    `errors` con su número de fila.
     """
     try:
-        df = pd.read_excel(excel.file)
-        imported_count = 0
-        updated_count = 0
-
-        for _, row in df.iterrows():
-            # Limpia los datos de pandas (ej. NaN -> None)
-            row_data = row.to_dict()
-            data = {
-                "name": row_data.get("Nombre"),
-                "brand": row_data.get("Marca"),
-                "category": row_data.get("Categoria"),
-                "price": float(row_data.get("Precio", 0)),
-                "stock": int(row_data.get("Stock", 0)),
-                "description": row_data.get("Descripcion"),
-                "slug": row_data.get("Slug"),
-                "sku": row_data.get("SKU"),
-                "image_url": row_data.get("Image URL")
-            }
-            # Filtra valores nulos para no sobrescribir con None
-            data = {k: v for k, v in data.items() if pd.notna(v)}
-
-            if not data.get("name") or not data.get("brand"):
-                logger.warning(f"Omitiendo fila por falta de Nombre o Marca: {row_data}")
-                continue
-
-            existing = await db.execute(select(Product).where(Product.name == data["name"], Product.brand == data["brand"]))
-            product = existing.scalar_one_or_none()
-
-            if product:
-                await db.execute(update(Product).where(Product.id == product.id).values(**data))
-                updated_count += 1
-            else:
-                new_product = Product(**data)
-                db.add(new_product)
-                imported_count += 1
-
+        importer = await import_file(db, excel.file, excel.filename, settings.IMPORT_BATCH_SIZE)
+        if importer.changed:
+            await catalog_cache.bump(db)
         await db.commit()
-        return {"success": True, "imported": imported_count, "updated": updated_count}
+        if importer.changed:
+            catalog_cache.invalidate()
+        return importer.summary()
     except Exception as e:
         await db.rollback()
         logger.exception(f"Error 500 al importar Excel: {e}")
@@ -564,81 +712,195 @@ async def import_excel(excel: UploadFile = File(...), db: AsyncSession = Depends
 
 @router.get("/export-orders")
 async def export_orders_to_excel(
-    db: AsyncSession = Depends(get_db), 
+    format: Literal["xlsx", "csv"] = "xlsx",
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     admin = Depends(verify_admin_token)
 ):
     """
-    Exporta un reporte de todos los pedidos a un archivo Excel.
-    Un pedido con 3 items ocupará 3 filas en el Excel.
+    Exporta un reporte de pedidos (filtrable por estado y fechas) a Excel o CSV.
+    Un pedido con 3 items ocupará 3 filas. Solo el CSV se envía en streaming según se
+    lee de la BD; el XLSX se genera entero en un archivo temporal y se envía al final
+    (para exportaciones grandes en XLSX, usar /jobs/export-orders).
     """
+    conditions = _order_filters(status, date_from, date_to, None, None)
     try:
-        # Usamos la misma lógica optimizada de get_all_orders
-        query = (
-            select(Order)
-            .options(
-                joinedload(Order.user),
-                selectinload(Order.items).joinedload(OrderItem.product) # Carga items y sus productos
-            )
-            .order_by(desc(Order.created_at))
-        )
-        result = await db.execute(query)
-        orders = result.scalars().unique().all()
-        
-        data_to_export = []
-        
-        for order in orders:
-            if not order.items:
-                # Incluir pedidos sin items (ej. pedidos fallidos)
-                data_to_export.append({
-                    "ID Pedido": order.id,
-                    "Fecha": order.created_at.strftime("%Y-%m-%d %H:%M"),
-                    "Cliente": order.user.name,
-                    "Email Cliente": order.user.email,
-                    "Total Pedido": float(order.total_amount),
-                    "Estado": order.status.value,
-                    "Dirección": order.shipping_address,
-                    "Producto SKU": "N/A",
-                    "Producto Nombre": "N/A",
-                    "Cantidad": 0,
-                    "Precio Unitario": 0
-                })
-            else:
-                # Crear una fila por cada item en el pedido
-                for item in order.items:
-                    data_to_export.append({
-                        "ID Pedido": order.id,
-                        "Fecha": order.created_at.strftime("%Y-%m-%d %H:%M"),
-                        "Cliente": order.user.name,
-                        "Email Cliente": order.user.email,
-                        "Total Pedido": float(order.total_amount),
-                        "Estado": order.status.value,
-                        "Dirección": order.shipping_address,
-                        "Producto SKU": item.product.sku if item.product else "N/A",
-                        "Producto Nombre": item.product.name if item.product else "Producto Eliminado",
-                        "Cantidad": item.quantity,
-                        "Precio Unitario": float(item.product.price) if item.product else 0.0
-                    })
-        
-        if not data_to_export:
+        if not await order_export.has_orders(conditions):
             raise HTTPException(status_code=404, detail="No hay pedidos para exportar")
-            
-        # Crear el DataFrame y el archivo Excel en memoria
-        df = pd.DataFrame(data_to_export)
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Pedidos', index=False)
-        
-        buffer.seek(0)
-        
+
         # Generar nombre de archivo con fecha
-        filename = f"Reporte_Pedidos_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        
-        return StreamingResponse(
-            buffer,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        filename = f"Reporte_Pedidos_{datetime.now().strftime('%Y%m%d')}.{format}"
+        if format == "csv":
+            return StreamingResponse(
+                order_export.stream_csv(conditions),
+                media_type=order_export.CSV_MEDIA_TYPE,
+                headers={"Content-Disposition": f"attachment; filename={filename}"}
+            )
+
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            await order_export.write_xlsx(conditions, path)
+        except BaseException:
+            os.remove(path)
+            raise
+        return FileResponse(
+            path,
+            media_type=order_export.XLSX_MEDIA_TYPE,
+            filename=filename,
+            background=BackgroundTask(os.remove, path)
         )
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error 500 al exportar pedidos: {e}")
-        raise HTTPException(status_code=500, detail=f"Error al exportar pedidos: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error al exportar pedidos: {str(e)}")
+
+
+
+# ---------------- TAREAS EN SEGUNDO PLANO (IMPORTAR / EXPORTAR / IMÁGENES) ----------------
+# Misma lógica que los endpoints síncronos, pero ejecutada por el ejecutor de services/jobs.py:
+# la petición devuelve 202 con el id de la tarea y el cliente consulta /jobs/{id}.
+
+def _serialize_job(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "download_url": f"/api/admin/jobs/{job.id}/download" if job.result_path else None,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+@jobs.handler("import_products")
+async def _import_products_job(context: jobs.JobContext, params: dict) -> dict:
+    try:
+        async with AsyncSessionLocal() as db:
+            with open(params["path"], "rb") as f:
+                importer = await import_file(
+                    db, f, params["filename"], settings.IMPORT_BATCH_SIZE, progress=context.progress
+                )
+            if importer.changed:
+                await catalog_cache.bump(db)
+            await db.commit()
+    finally:
+        if os.path.exists(params["path"]):
+            os.remove(params["path"])
+    if importer.changed:
+        catalog_cache.invalidate()
+    return importer.summary()
+
+
+@jobs.handler("export_orders")
+async def _export_orders_job(context: jobs.JobContext, params: dict) -> dict:
+    conditions = _order_filters(
+        params.get("status"),
+        datetime.fromisoformat(params["date_from"]) if params.get("date_from") else None,
+        datetime.fromisoformat(params["date_to"]) if params.get("date_to") else None,
+        None, None
+    )
+    filename = f"Reporte_Pedidos_{datetime.now().strftime('%Y%m%d')}.{params['format']}"
+    path = os.path.join(context.workdir, filename)
+    writer = order_export.write_csv if params["format"] == "csv" else order_export.write_xlsx
+    rows = await writer(conditions, path, progress=context.progress)
+    context.set_result_file(path, filename)
+    return {"rows": rows}
+
+
+@jobs.handler("upload_images")
+async def _upload_images_job(context: jobs.JobContext, params: dict) -> dict:
+    try:
+        images = [await asyncio.to_thread(image_storage.hash_file, path) for path in params["paths"]]
+        results = await image_storage.store_images(images)
+    finally:
+        for path in params["paths"]:
+            if os.path.exists(path):
+                os.remove(path)
+    context.progress_value = len(results)
+    return {"urls": [r["url"] for r in results if "url" in r], "files": results}
+
+
+@router.post("/jobs/import-products", status_code=202)
+async def submit_import_job(excel: UploadFile = File(...), admin=Depends(verify_admin_token)):
+    """Encola la importación de productos desde Excel (.xlsx) o CSV."""
+    job_id = jobs.new_job_id()
+    directory = jobs.job_dir(job_id)
+    try:
+        path = (await image_storage.spool_upload(excel, directory, images_only=False)).path
+        job = await jobs.submit(
+            "import_products", {"path": path, "filename": excel.filename}, admin.get("sub"), job_id=job_id
+        )
+    except BaseException:
+        # Sin tarea registrada nadie limpiaría el directorio
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return _serialize_job(job)
+
+
+@router.post("/jobs/export-orders", status_code=202)
+async def submit_export_job(
+    format: Literal["xlsx", "csv"] = "xlsx",
+    status: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin=Depends(verify_admin_token)
+):
+    """Encola la exportación de pedidos; el archivo se descarga desde /jobs/{id}/download."""
+    _order_filters(status, date_from, date_to, None, None)  # valida los filtros antes de encolar
+    params = {"format": format, "status": status, "date_from": date_from, "date_to": date_to}
+    job = await jobs.submit("export_orders", params, admin.get("sub"))
+    return _serialize_job(job)
+
+
+@router.post("/jobs/upload-images", status_code=202)
+async def submit_upload_images_job(
+    file: Optional[UploadFile] = File(None),
+    files: List[UploadFile] = File([]),
+    admin=Depends(verify_admin_token)
+):
+    """Encola la subida de imágenes; las URLs quedan en `result.urls`."""
+    uploads = _upload_list(file, files)
+    job_id = jobs.new_job_id()
+    directory = jobs.job_dir(job_id)
+    try:
+        paths = [(await image_storage.spool_upload(upload, directory)).path for upload in uploads]
+        job = await jobs.submit("upload_images", {"paths": paths}, admin.get("sub"), job_id=job_id)
+    except BaseException:
+        # Sin tarea registrada nadie limpiaría el directorio
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    return _serialize_job(job)
+
+
+@router.get("/jobs")
+async def list_jobs(limit: int = Query(20, ge=1, le=100), admin=Depends(verify_admin_token)):
+    return [_serialize_job(job) for job in await jobs.recent(limit)]
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, admin=Depends(verify_admin_token)):
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    return _serialize_job(job)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_job_result(job_id: str, admin=Depends(verify_admin_token)):
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if job.status != jobs.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"La tarea no ha terminado (estado: {job.status})")
+    if not job.result_path or not os.path.exists(job.result_path):
+        raise HTTPException(status_code=404, detail="La tarea no generó archivo o ya fue eliminado")
+    media_type = order_export.CSV_MEDIA_TYPE if job.result_path.endswith(".csv") else order_export.XLSX_MEDIA_TYPE
+    return FileResponse(job.result_path, media_type=media_type, filename=job.result_filename)
@@ -8,8 +8,9 @@ from jose import JWTError, jwt
 import os
 
 from core.database import get_db
-from core.security import create_access_token, verify_google_token, hash_password, verify_password
+from core.security import create_access_token, hash_password_async, verify_password_async
 from models.user import User, UserRole, AuthProvider
+from services import google_auth, principal_cache
 
 
 router = APIRouter()
@@ -51,11 +52,21 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user or not user.hashed_password:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales incorrectas"
         )
+    valid, new_hash = await verify_password_async(data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciales incorrectas"
+        )
+    if new_hash:
+        # Hash con un BCRYPT_ROUNDS anterior: se actualiza al coste actual
+        user.hashed_password = new_hash
+        await db.commit()
 
     token = create_access_token({
         "sub": user.email,
@@ -73,7 +84,7 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
 # --- LOGIN CON GOOGLE ---
 @router.post("/google-login")
 async def google_login(data: GoogleLoginRequest):
-    userinfo = verify_google_token(data.token_id)
+    userinfo = await google_auth.verify_id_token(data.token_id)
     if not userinfo:
         raise HTTPException(status_code=401, detail="Token Google inválido o email no verificado")
 
@@ -101,7 +112,7 @@ async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
     new_user = User(
         email=data.email,
         name=data.name,
-        hashed_password=hash_password(data.password),
+        hashed_password=await hash_password_async(data.password),
         provider=AuthProvider.EMAIL,
         role=UserRole.USER,
         is_active=True
@@ -142,17 +153,28 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    # Payload ya verificado (válido hasta su exp) y usuario en caché: sin JWT ni BD
+    payload = principal_cache.get_payload(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        principal_cache.set_payload(token, payload)
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
+    user = await principal_cache.get_user(db, email)
     if user is None:
-        raise credentials_exception
+        at_version = principal_cache.version()
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise credentials_exception
+        principal_cache.set_user(user, at_version)
+
+    if not user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Usuario desactivado")
 
     return user
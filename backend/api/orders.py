@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-from sqlalchemy import select
-from typing import List
-from core.database import get_db
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import select, update, insert, case, func, tuple_
+from typing import Awaitable, Callable, List, Literal, Optional, Union
+from datetime import datetime
+from core.database import get_db, id_in
+from core.config import settings
+from core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from models.order import (
     Order as OrderModel,
     OrderItem as OrderItemModel,
@@ -13,11 +17,13 @@ from models.order import (
 from schemas.order import (
     OrderCreate,
     Order as OrderSchema,
+    OrderSummary,
     OrderStatusUpdate,
 )
 from models.product import Product as ProductModel
 from models.user import User as UserModel
 from api.auth import get_current_user
+from services import catalog_cache, email_service, idempotency, sales_rollup
 from pydantic import BaseModel
 import uuid
 
@@ -43,23 +49,79 @@ async def validate_coupon(data: CouponValidateRequest, db: AsyncSession = Depend
 async def create_order(
     order_data: OrderCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: UserModel = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
-    total_amount = 0.0
-    product_details_for_items = []
+    """
+    Crea un pedido. Si se envía la cabecera Idempotency-Key, los reintentos con la misma
+    clave devuelven la respuesta original sin crear otro pedido ni descontar stock de nuevo.
+    """
+    if not idempotency_key:
+        return await _place_order(order_data, db, current_user)
+
+    async def handler(reservation: idempotency.Reservation):
+        body = None
 
+        async def save_response(order):
+            # En la misma transacción que el pedido: o se confirman los dos o ninguno
+            nonlocal body
+            body = OrderSchema.model_validate(order).model_dump(mode="json")
+            await reservation.save_response(db, body)
+
+        await _place_order(order_data, db, current_user, before_commit=save_response)
+        return body
+
+    status_code, body, replayed = await idempotency.run_idempotent(
+        current_user.id,
+        idempotency_key,
+        idempotency.fingerprint(order_data.model_dump()),
+        handler,
+        status_code=201,
+    )
+    return JSONResponse(
+        status_code=status_code,
+        content=body,
+        headers={"Idempotent-Replayed": "true" if replayed else "false"},
+    )
+
+async def _place_order(
+    order_data: OrderCreate,
+    db: AsyncSession,
+    current_user: UserModel,
+    before_commit: Optional[Callable[[OrderModel], Awaitable[None]]] = None,
+):
+    """
+    Reserva stock y crea el pedido en una transacción. `before_commit` recibe el pedido ya
+    cargado justo antes del commit, para escribir en la misma transacción (idempotencia).
+    """
+    # Agrupa líneas repetidas del mismo producto (una sola fila por producto)
+    quantities = {}
     for item_in_cart in order_data.items:
-        result = await db.execute(select(ProductModel).where(ProductModel.id == item_in_cart.product_id))
-        product_in_db = result.scalar_one_or_none()
+        if item_in_cart.quantity <= 0:
+            raise HTTPException(status_code=400, detail="La cantidad de cada producto debe ser mayor a cero.")
+        quantities[item_in_cart.product_id] = quantities.get(item_in_cart.product_id, 0) + item_in_cart.quantity
+    if not quantities:
+        raise HTTPException(status_code=400, detail="El pedido no contiene productos.")
+
+    # 1. Un solo SELECT ... FOR UPDATE, ordenado por id para bloquear siempre en el mismo orden
+    #    (dos pedidos concurrentes no pueden leer el mismo stock ni provocar deadlocks)
+    product_ids = sorted(quantities)
+    result = await db.execute(
+        select(ProductModel)
+        .where(id_in(ProductModel.id, product_ids))
+        .order_by(ProductModel.id)
+        .with_for_update()
+    )
+    products = {product.id: product for product in result.scalars()}
+
+    total_amount = 0.0
+    for product_id, quantity in quantities.items():
+        product_in_db = products.get(product_id)
         if not product_in_db:
-            raise HTTPException(status_code=404, detail=f"Producto con ID {item_in_cart.product_id} no encontrado.")
-        if product_in_db.stock < item_in_cart.quantity:
+            raise HTTPException(status_code=404, detail=f"Producto con ID {product_id} no encontrado.")
+        if product_in_db.stock < quantity:
             raise HTTPException(status_code=400, detail=f"Stock insuficiente para {product_in_db.name}.")
-        total_amount += product_in_db.price * item_in_cart.quantity
-        product_details_for_items.append({
-            "product_model": product_in_db,
-            "quantity": item_in_cart.quantity
-        })
+        total_amount += product_in_db.price * quantity
 
     total_amount += order_data.shipping_cost or 0
 
@@ -78,22 +140,44 @@ async def create_order(
         db.add(new_order)
         await db.flush()
 
-        for detail in product_details_for_items:
-            product = detail["product_model"]
-            quantity = detail["quantity"]
-            line_total = product.price * quantity
-            order_item = OrderItemModel(
-                order_id=new_order.id,
-                product_id=product.id,
-                quantity=quantity,
-                product_name=product.name,
-                product_price=product.price,
-                line_total=line_total
-            )
-            db.add(order_item)
-            product.stock -= quantity
+        # 2. Descuento de stock en un único UPDATE condicional (stock >= cantidad).
+        #    content_hash=NULL: la próxima importación volverá a fijar el stock del archivo
+        requested = case(quantities, value=ProductModel.id)
+        stock_result = await db.execute(
+            update(ProductModel)
+            .where(id_in(ProductModel.id, product_ids), ProductModel.stock >= requested)
+            .values(stock=ProductModel.stock - requested, content_hash=None)
+            .execution_options(synchronize_session=False)
+        )
+        if stock_result.rowcount != len(product_ids):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Stock insuficiente para uno o más productos.")
 
-        await db.commit()
+        # 3. Items del pedido en un solo INSERT masivo
+        order_items = [
+            {
+                "order_id": new_order.id,
+                "product_id": product_id,
+                "quantity": quantity,
+                "product_name": products[product_id].name,
+                "product_price": products[product_id].price,
+                "line_total": products[product_id].price * quantity,
+            }
+            for product_id, quantity in quantities.items()
+        ]
+        await db.execute(insert(OrderItemModel), order_items)
+
+        # 4. Rollups de analítica en la misma transacción
+        await sales_rollup.record_new_order(
+            db, new_order, [(i["product_id"], i["quantity"], i["line_total"]) for i in order_items]
+        )
+
+        # 5. Correo de confirmación a la bandeja de salida (se envía en segundo plano)
+        email_service.queue_order_confirmation_email(
+            db, current_user.email, order_number, order_items, total_amount
+        )
+
+        # 6. Pedido completo para la respuesta (populate_existing: stock ya descontado)
         query = (
             select(OrderModel)
             .options(
@@ -101,31 +185,100 @@ async def create_order(
                 joinedload(OrderModel.items).joinedload(OrderItemModel.product)
             )
             .where(OrderModel.id == new_order.id)
+            .execution_options(populate_existing=True)
         )
         result = await db.execute(query)
         order_fresh = result.unique().scalars().first()
+        if before_commit is not None:
+            await before_commit(order_fresh)
+
+        await db.commit()
+        catalog_cache.invalidate_products(product_ids)
+        email_service.wake()
         return order_fresh
 
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error interno al crear el pedido: {e}")
 
-@router.get("/", response_model=List[OrderSchema])
+@router.get("/", response_model=Union[List[OrderSummary], List[OrderSchema]])
 async def get_all_orders(
+    response: Response,
+    view: Literal["full", "summary"] = "full",
+    limit: int = Query(settings.ORDERS_PAGE_SIZE, ge=1, le=settings.ORDERS_PAGE_MAX),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
-):
-    query = (
-        select(OrderModel)
-        .options(
-            joinedload(OrderModel.user),
-            joinedload(OrderModel.items).joinedload(OrderItemModel.product)
+) -> Union[List[OrderSummary], List[OrderSchema]]:
+    """
+    Historial de pedidos del usuario, del más reciente al más antiguo, paginado por cursor
+    sobre (created_at, id). El cursor siguiente se devuelve en la cabecera X-Next-Cursor.
+    Con view=summary solo se devuelven las columnas del pedido, el número de items y su total.
+    """
+    after = decode_cursor(cursor, (datetime, int))
+    page_filter = [OrderModel.user_id == current_user.id]
+    if after is not None:
+        page_filter.append(tuple_(OrderModel.created_at, OrderModel.id) < tuple_(*after))
+
+    if view == "summary":
+        # Página de cabeceras + agregado de items solo para esos pedidos (sin cargar el grafo ORM)
+        page = (
+            select(
+                OrderModel.id,
+                OrderModel.order_number,
+                OrderModel.status,
+                OrderModel.total_amount,
+                OrderModel.shipping_type,
+                OrderModel.shipping_cost,
+                OrderModel.payment_method,
+                OrderModel.created_at,
+            )
+            .where(*page_filter)
+            .order_by(OrderModel.created_at.desc(), OrderModel.id.desc())
+            .limit(limit + 1)
+            .cte("page")
         )
-        .where(OrderModel.user_id == current_user.id)
-        .order_by(OrderModel.created_at.desc())
-    )
-    result = await db.execute(query)
-    orders = result.unique().scalars().all()
+        items_agg = (
+            select(
+                OrderItemModel.order_id,
+                func.count(OrderItemModel.id).label("item_count"),
+                func.sum(OrderItemModel.line_total).label("items_total"),
+            )
+            .where(OrderItemModel.order_id.in_(select(page.c.id)))
+            .group_by(OrderItemModel.order_id)
+            .subquery()
+        )
+        query = (
+            select(
+                page,
+                func.coalesce(items_agg.c.item_count, 0).label("item_count"),
+                func.coalesce(items_agg.c.items_total, 0).label("items_total"),
+            )
+            .outerjoin(items_agg, items_agg.c.order_id == page.c.id)
+            .order_by(page.c.created_at.desc(), page.c.id.desc())
+        )
+        rows = (await db.execute(query)).all()
+        orders = [OrderSummary.model_validate(row) for row in rows]
+    else:
+        query = (
+            select(OrderModel)
+            .options(
+                joinedload(OrderModel.user),
+                selectinload(OrderModel.items).joinedload(OrderItemModel.product)
+            )
+            .where(*page_filter)
+            .order_by(OrderModel.created_at.desc(), OrderModel.id.desc())
+            .limit(limit + 1)
+        )
+        result = await db.execute(query)
+        orders = [OrderSchema.model_validate(order) for order in result.scalars().all()]
+
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last.created_at, last.id])
     return orders
 
 @router.get("/{order_id}", response_model=OrderSchema)
@@ -156,13 +309,15 @@ async def update_order_status(
     status_update: OrderStatusUpdate,
     db: AsyncSession = Depends(get_db)
 ):
-    result = await db.execute(select(OrderModel).where(OrderModel.id == order_id))
+    result = await db.execute(select(OrderModel).where(OrderModel.id == order_id).with_for_update())
     db_order = result.scalar_one_or_none()
 
     if not db_order:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
 
-    db_order.status = OrderStatus[status_update.status.upper()]
+    new_status = OrderStatus[status_update.status.upper()]
+    await sales_rollup.record_status_change(db, db_order, db_order.status, new_status)
+    db_order.status = new_status
     await db.commit()
     await db.refresh(db_order)
     return db_order
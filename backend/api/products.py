@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession 
-from sqlalchemy import select, delete 
+from sqlalchemy import select, delete, func, tuple_
+from typing import List, Optional
 import uuid
 import logging
 
 from models.product import Product as ProductModel 
-from schemas.product import ProductCreate, ProductUpdate, Product as ProductSchema
-from core.database import get_db 
+from schemas.product import ProductCreate, ProductUpdate, ProductBatch, Product as ProductSchema
+from core.database import get_db, id_in
+from core.config import settings
+from core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from api.admin import verify_admin_token
+from services import catalog_cache, product_search
 
 logger = logging.getLogger(__name__)
 
@@ -14,33 +19,188 @@ router = APIRouter(
     tags=["Products"]
 )
 
+def _cache_headers(etag: str) -> dict:
+    # no-cache: el navegador puede guardar la respuesta pero debe revalidarla con el ETag
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
 @router.get("/", response_model=list[ProductSchema])
-async def get_all_products(db: AsyncSession = Depends(get_db)):
-    """Obtiene todos los productos activos, ordenados por nombre."""
+async def get_all_products(
+    response: Response,
+    limit: int = Query(settings.PRODUCTS_PAGE_SIZE, ge=1, le=settings.PRODUCTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    category: Optional[List[str]] = Query(None),
+    brand: Optional[str] = None,
+    is_featured: Optional[bool] = None,
+    is_active: bool = True,
+    include_inactive: bool = False,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    if_none_match: Optional[str] = Header(None),
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Obtiene los productos activos ordenados por nombre, paginados por cursor (keyset) sobre
+    (name, id). El cursor de la siguiente página se devuelve en la cabecera X-Next-Cursor.
+    `category` se puede repetir (?category=a&category=b) y no distingue mayúsculas.
+    Solo un admin puede pedir los inactivos (is_active=false o include_inactive=true).
+    Responde 304 si el If-None-Match del cliente coincide con el ETag de la página; si la
+    página está en la caché en memoria, sin consultar la BD.
+    """
+    if include_inactive or not is_active:
+        verify_admin_token(authorization or "")
+    after = decode_cursor(cursor, (str, int))
+    await catalog_cache.sync(db)
+    catalog_version = catalog_cache.version()
+    categories = tuple(sorted({c.lower() for c in category})) if category else None
+    cache_key = ("list", limit, cursor, categories, brand, is_featured, is_active, include_inactive, min_price, max_price)
+
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        (items, next_cursor), etag = cached
+    else:
+        try:
+            query = select(ProductModel)
+            if categories:
+                query = query.where(func.lower(ProductModel.category).in_(categories))
+            if brand is not None:
+                query = query.where(ProductModel.brand == brand)
+            if is_featured is not None:
+                query = query.where(ProductModel.is_featured == is_featured)
+            if not include_inactive:
+                query = query.where(ProductModel.is_active == is_active)
+            if min_price is not None:
+                query = query.where(ProductModel.price >= min_price)
+            if max_price is not None:
+                query = query.where(ProductModel.price <= max_price)
+            if after is not None:
+                query = query.where(tuple_(ProductModel.name, ProductModel.id) > tuple_(*after))
+
+            # Pedimos una fila de más para saber si existe otra página
+            query = query.order_by(ProductModel.name, ProductModel.id).limit(limit + 1)
+            result = await db.execute(query)
+            products = result.scalars().all()
+
+            next_cursor = None
+            if len(products) > limit:
+                products = products[:limit]
+                last = products[-1]
+                next_cursor = encode_cursor([last.name, last.id])
+
+            items = [ProductSchema.model_validate(p).model_dump() for p in products]
+            etag = catalog_cache.set(
+                cache_key, (items, next_cursor), at_version=catalog_version, product_ids=[p.id for p in products]
+            )
+        except Exception as e:
+            logger.exception(f"Error al obtener todos los productos: {e}")
+            raise HTTPException(status_code=500, detail="Error interno al obtener productos")
+
+    if catalog_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+@router.get("/search", response_model=list[ProductSchema])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Búsqueda rankeada por nombre, marca, descripción y categoría.
+    Tolera errores de tipeo y acepta prefijos para autocompletado.
+    """
+    # La versión de la BD en la clave: una edición en otro worker deja de servir resultados viejos
+    cache_key = ("search", await catalog_cache.sync(db), product_search.normalize(q).strip(), limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached[0]
+    catalog_version = catalog_cache.version()
     try:
-        query = select(ProductModel).order_by(ProductModel.name)
-        result = await db.execute(query) 
-        products = result.scalars().all()
-        print("### DEBUG FastAPI: productos encontrados =", len(products))  # <<-- DEPURACIÓN
-        return products
+        items = await product_search.search_products(db, q, limit)
+        catalog_cache.set(cache_key, items, at_version=catalog_version, product_ids=[item["id"] for item in items])
+        return items
     except Exception as e:
-        logger.exception(f"Error al obtener todos los productos: {e}")
-        raise HTTPException(status_code=500, detail="Error interno al obtener productos")
+        logger.exception(f"Error al buscar productos '{q}': {e}")
+        raise HTTPException(status_code=500, detail="Error interno al buscar productos")
 
-@router.get("/{product_id}", response_model=ProductSchema)
-async def get_product_by_id(product_id: int, db: AsyncSession = Depends(get_db)):
-    """Obtiene un producto específico por su ID."""
+@router.get("/batch", response_model=ProductBatch)
+async def get_products_batch(
+    ids: str = Query(..., description="IDs separados por comas, ej. 1,2,3"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Obtiene varios productos en una sola llamada (precio y stock para carrito/checkout).
+    Los IDs que no existen se devuelven en `missing`.
+    """
     try:
-        result = await db.execute(select(ProductModel).where(ProductModel.id == product_id)) 
-        product = result.scalar_one_or_none()
+        product_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="El parámetro ids debe ser una lista de enteros")
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="Debes indicar al menos un ID")
+    if len(product_ids) > settings.PRODUCTS_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.PRODUCTS_PAGE_MAX} productos por consulta")
+
+    await catalog_cache.sync(db)
+    catalog_version = catalog_cache.version()
+    products = {}
+    pending = []
+    for product_id in product_ids:
+        cached = catalog_cache.get(("product", product_id))
+        if cached is not None:
+            products[product_id] = cached[0]
+        else:
+            pending.append(product_id)
+
+    if pending:
+        try:
+            result = await db.execute(select(ProductModel).where(id_in(ProductModel.id, pending)))
+            for product in result.scalars():
+                item = ProductSchema.model_validate(product).model_dump()
+                catalog_cache.set(("product", product.id), item, at_version=catalog_version, product_ids=[product.id])
+                products[product.id] = item
+        except Exception as e:
+            logger.exception(f"Error al obtener productos {pending}: {e}")
+            raise HTTPException(status_code=500, detail="Error interno al obtener productos")
+
+    missing = [product_id for product_id in product_ids if product_id not in products]
+    ordered = {product_id: products[product_id] for product_id in product_ids if product_id in products}
+    return {"products": ordered, "missing": missing}
+
+@router.get("/{product_id}", response_model=ProductSchema)
+async def get_product_by_id(
+    product_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Obtiene un producto específico por su ID (admite If-None-Match)."""
+    await catalog_cache.sync(db)
+    catalog_version = catalog_cache.version()
+    cache_key = ("product", product_id)
+
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        item, etag = cached
+    else:
+        try:
+            result = await db.execute(select(ProductModel).where(ProductModel.id == product_id)) 
+            product = result.scalar_one_or_none()
+        except Exception as e:
+            logger.exception(f"Error al obtener el producto {product_id}: {e}")
+            raise HTTPException(status_code=500, detail="Error interno al obtener el producto")
         if product is None:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
-        return product
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.exception(f"Error al obtener el producto {product_id}: {e}")
-        raise HTTPException(status_code=500, detail="Error interno al obtener el producto")
+        item = ProductSchema.model_validate(product).model_dump()
+        etag = catalog_cache.set(cache_key, item, at_version=catalog_version, product_ids=[product_id])
+
+    if catalog_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
+    return item
 
 @router.post("/", response_model=ProductSchema, status_code=201, summary="Crea un nuevo producto (¡Proteger!)") 
 async def create_product(
@@ -64,7 +224,9 @@ async def create_product(
             is_featured=False
         )
         db.add(db_product)
+        await catalog_cache.bump(db)
         await db.commit() 
+        catalog_cache.invalidate()
         await db.refresh(db_product) 
         return db_product
     except Exception as e:
@@ -87,7 +249,10 @@ async def update_product(
         update_data = product_data.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_product, key, value)
+        db_product.content_hash = None  # la próxima importación vuelve a aplicar su fila
+        await catalog_cache.bump(db)
         await db.commit() 
+        catalog_cache.invalidate()
         await db.refresh(db_product) 
         return db_product
     except HTTPException:
@@ -106,7 +271,9 @@ async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
         if not db_product:
             raise HTTPException(status_code=404, detail="Producto no encontrado")
         await db.delete(db_product)
+        await catalog_cache.bump(db)
         await db.commit()
+        catalog_cache.invalidate()
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,118 @@
+# backend/core/cache.py
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# --- Caché en memoria TTL + LRU ---
+class TTLCache:
+    """
+    Caché en proceso con expiración por tiempo (TTL) y expulsión LRU.
+    Cada entrada puede tener su propio TTL; si no se indica se usa el por defecto.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# --- Valor único con stale-while-revalidate ---
+class StaleWhileRevalidate:
+    """
+    Guarda un único valor calculado por una corrutina. Mientras tenga menos de `ttl`
+    segundos se sirve tal cual; hasta `ttl + max_stale` se sirve el valor viejo y se
+    lanza una sola recarga en segundo plano; pasado eso (o sin valor) se espera a la
+    recarga. Las recargas concurrentes comparten la misma tarea (single-flight).
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float, max_stale: float):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value: Any = _MISSING
+        self._loaded_at = 0.0
+        self._generated_at: Optional[datetime] = None
+        self._refresh: Optional[asyncio.Task] = None
+
+    async def get(self, force: bool = False) -> Tuple[Any, Dict[str, Any]]:
+        """Devuelve (valor, metadatos de antigüedad)."""
+        if self._value is not _MISSING and not force:
+            age = time.monotonic() - self._loaded_at
+            if age < self.ttl:
+                return self._value, self._meta(age, stale=False)
+            if age < self.ttl + self.max_stale:
+                self._schedule()
+                return self._value, self._meta(age, stale=True)
+        await asyncio.shield(self._schedule())
+        return self._value, self._meta(time.monotonic() - self._loaded_at, stale=False)
+
+    def invalidate(self) -> None:
+        self._value = _MISSING
+
+    def _schedule(self) -> asyncio.Task:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._load())
+            self._refresh.add_done_callback(self._log_failure)
+        return self._refresh
+
+    async def _load(self) -> None:
+        value = await self.loader()
+        self._value = value
+        self._loaded_at = time.monotonic()
+        self._generated_at = datetime.now(timezone.utc)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        # Si la recarga era en segundo plano nadie la espera: se registra aquí
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Fallo al recargar valor en caché: {task.exception()}")
+
+    def _meta(self, age: float, stale: bool) -> Dict[str, Any]:
+        return {
+            "generated_at": self._generated_at.isoformat() if self._generated_at else None,
+            "age_seconds": round(age, 1),
+            "stale": stale,
+        }
@@ -1,6 +1,15 @@
 # en backend/core/config.py
+import os
+from typing import Any, Dict, List
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
+
+def _default_proxy_hops() -> int:
+    # Render define RENDER en sus servicios y pone un proxy delante de la app
+    return 1 if os.environ.get("RENDER") else 0
+
+
 class Settings(BaseSettings):
     # Variables que ya tenías
     DATABASE_URL: str
@@ -15,10 +24,66 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: str
     FROM_EMAIL: str
+    SENDGRID_API_KEY: str = ""
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
 
+    # --- Rendimiento / paginación ---
+    PRODUCTS_PAGE_SIZE: int = 100      # tamaño de página por defecto en /api/products
+    PRODUCTS_PAGE_MAX: int = 500       # límite superior aceptado en ?limit=
+    CATALOG_CACHE_TTL: float = 60.0    # segundos que vive una entrada del catálogo en memoria
+    CATALOG_CACHE_MAXSIZE: int = 2048  # entradas máximas (páginas + detalles) antes de expulsar LRU
+    CATALOG_VERSION_TTL: float = 5.0   # cada cuánto se mira si otro worker cambió el catálogo (tabla catalog_version)
+    ORDERS_PAGE_SIZE: int = 20         # pedidos por página en /api/orders
+    ORDERS_PAGE_MAX: int = 100
+    SEARCH_BACKEND: str = "auto"       # auto | postgres | memory
+    IDEMPOTENCY_TTL_HOURS: int = 24    # ventana en la que se reutiliza una Idempotency-Key
+    IDEMPOTENCY_LOCK_SECONDS: int = 60 # tras este tiempo una petición "en curso" se considera abandonada
+    SALES_ROLLUP_SHARDS: int = 8       # filas por (día, estado) en los rollups: checkouts simultáneos no esperan a la misma fila
+    DASHBOARD_CACHE_TTL: float = 15.0  # segundos que el dashboard de admin se sirve sin recalcular
+    DASHBOARD_CACHE_MAX_STALE: float = 300.0  # margen en el que se sirve viejo mientras se recalcula
+    PRINCIPAL_CACHE_TTL: float = 60.0  # segundos que get_current_user reutiliza un usuario sin ir a la BD
+    PRINCIPAL_CACHE_MAXSIZE: int = 10000
+    TOKEN_CACHE_MAXSIZE: int = 10000   # payloads JWT verificados en memoria (cada uno hasta su exp)
+    BCRYPT_ROUNDS: int = 12            # coste de bcrypt (cada +1 duplica el tiempo de login/registro)
+    PASSWORD_HASH_WORKERS: int = 2     # hilos dedicados a bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 32  # hashes en curso + en cola antes de responder 503
+    PASSWORD_HASH_QUEUE_WARN_MS: float = 500.0  # se registra un aviso si un hash espera más en cola
+    SQL_METRICS_ENABLED: bool = True   # Server-Timing y log de consultas por petición
+    SQL_METRICS_LOG_REQUESTS: bool = False  # una línea JSON por petición que consulta la BD (volumen alto: activar para diagnosticar)
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10 # repeticiones de la misma sentencia en una petición para avisar de N+1
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_MAX_KEYS: int = 100_000 # cubos (cliente + regla) en memoria antes de expulsar LRU
+    # Proxies de confianza delante (0 = IP de la conexión). Detrás de un proxy con 0 todos los
+    # clientes comparten su IP y el límite pasa a ser global
+    RATE_LIMIT_PROXY_HOPS: int = Field(default_factory=_default_proxy_hops)
+    # rate = peticiones/minuto sostenidas, burst = ráfaga permitida. En el entorno se da como JSON.
+    RATE_LIMIT_RULES: List[Dict[str, Any]] = [
+        {"prefix": "/api/auth/login", "rate": 10, "burst": 5, "methods": ["POST"]},
+        {"prefix": "/api/auth/google-login", "rate": 10, "burst": 5, "methods": ["POST"]},
+        {"prefix": "/api/auth/register", "rate": 5, "burst": 3, "methods": ["POST"]},
+        {"prefix": "/api/orders/validate", "rate": 20, "burst": 5, "methods": ["POST"]},
+        {"prefix": "/api/orders", "rate": 60, "burst": 20},
+        {"prefix": "/api/products", "rate": 300, "burst": 60, "methods": ["GET"]},
+    ]
+    IMPORT_BATCH_SIZE: int = 1000      # filas por bloque al importar productos (acota la memoria)
+    JOBS_CONCURRENCY: int = 2          # tareas de admin (importar/exportar) ejecutándose a la vez
+    JOBS_DIR: str = "/tmp/jobs"        # archivos subidos y resultados de las tareas
+    JOBS_RETENTION_HOURS: int = 24     # tras este tiempo se borran las tareas terminadas y sus archivos
+    JOBS_PURGE_INTERVAL_SECONDS: float = 3600.0  # cada cuánto los workers buscan tareas caducadas
+    IMAGE_STORAGE: str = "cloudinary"  # cloudinary | local (static/uploads, para desarrollo y pruebas)
+    IMAGE_UPLOAD_WORKERS: int = 4      # subidas simultáneas al almacenamiento (pool de hilos)
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_MAX_FILES: int = 20          # archivos por petición
+    EMAIL_TRANSPORT: str = "auto"      # auto (sendgrid si hay API key, si no console) | sendgrid | console | file
+    EMAIL_FILE_PATH: str = "/tmp/emails.jsonl"  # destino del transporte "file"
+    EMAIL_BATCH_SIZE: int = 20         # correos enviados por ciclo del dispatcher
+    EMAIL_POLL_SECONDS: float = 10.0   # espera máxima entre ciclos si no hay avisos
+    EMAIL_MAX_ATTEMPTS: int = 8        # tras estos intentos el correo queda como "failed"
+    EMAIL_RETRY_BASE_SECONDS: float = 30.0  # backoff exponencial: 30s, 60s, 120s... (máx. 1h)
+    EMAIL_LEASE_SECONDS: float = 300.0  # un lote reclamado y sin resultado tras este tiempo se vuelve a enviar
+
     class Config:
         env_file = ".env"
 
@@ -1,10 +1,14 @@
 # backend/core/database.py
 
+import logging
+from sqlalchemy import Integer, any_, inspect, literal, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from urllib.parse import urlparse, parse_qs, urlunparse
 from core.config import settings
 
+logger = logging.getLogger(__name__)
 
 # --- Conexión a la Base de Datos ---
 
@@ -13,15 +17,17 @@ db_url = settings.DATABASE_URL
 parsed_url = urlparse(db_url)
 query_params = parse_qs(parsed_url.query)
 
-# 2. Preparamos los argumentos de conexión
+# 2. Preparamos los argumentos de conexión (solo PostgreSQL; SQLite se usa en pruebas locales)
+is_postgres = parsed_url.scheme.startswith("postgres")
 connect_args = {}
-if "sslmode" in query_params:
-    connect_args["ssl"] = query_params["sslmode"][0]
-elif "ssl" not in connect_args:
-    connect_args["ssl"] = "require"  # asegúrate de SSL para NeonDB
+if is_postgres:
+    if "sslmode" in query_params:
+        connect_args["ssl"] = query_params["sslmode"][0]
+    elif "ssl" not in connect_args:
+        connect_args["ssl"] = "require"  # asegúrate de SSL para NeonDB
 
 # 3. Reconstruimos la URL sin los parámetros que ahora van en connect_args
-base_url = urlunparse(parsed_url._replace(query=""))
+base_url = urlunparse(parsed_url._replace(query="")) if is_postgres else db_url
 if base_url.endswith("?"):
     base_url = base_url[:-1]
 
@@ -52,6 +58,18 @@ AsyncSessionLocal = sessionmaker(
 Base = declarative_base()
 
 
+# --- Utilidades de consulta ---
+def id_in(column, ids):
+    """
+    Filtro `column = ANY(:ids)` en PostgreSQL: un único parámetro de tipo array, así la
+    sentencia preparada es la misma sin importar cuántos ids se pidan. En otras BD, IN (...).
+    """
+    ids = list(ids)
+    if async_engine.dialect.name == "postgresql":
+        return column == any_(literal(ids, ARRAY(Integer)))
+    return column.in_(ids)
+
+
 # --- Dependencia de Sesión ---
 async def get_db():
     async with AsyncSessionLocal() as session:
@@ -69,6 +87,54 @@ async def create_tables():
     from models.product import Product
     from models.user import User
     from models.order import Order, OrderItem
+    from models.idempotency import IdempotencyKey
+    from models.analytics import DailySalesRollup, DailyProductSalesRollup
+    from models.job import Job
+    from models.image import ImageUpload
+    from models.email import EmailOutbox
 
     async with async_engine.begin() as conn:
+        # Los rollups se pueden recalcular desde los pedidos: si cambió su clave se recrean
+        await conn.run_sync(_drop_outdated_tables, [DailySalesRollup.__table__, DailyProductSalesRollup.__table__])
         await conn.run_sync(Base.metadata.create_all)
+        # create_all tampoco altera tablas existentes: añade las columnas nuevas que falten
+        await conn.run_sync(_add_missing_columns)
+        # create_all solo crea índices junto con tablas nuevas; los añadimos a las existentes
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _drop_outdated_tables(sync_conn, tables):
+    """Borra las tablas (derivadas) cuya clave primaria en la BD no coincide con el modelo."""
+    inspector = inspect(sync_conn)
+    for table in tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = set(inspector.get_pk_constraint(table.name)["constrained_columns"])
+        if existing != {column.name for column in table.primary_key.columns}:
+            logger.warning(f"La tabla {table.name} tiene una clave primaria antigua: se recrea vacía")
+            table.drop(sync_conn)
+
+
+def _add_missing_columns(sync_conn):
+    """Solo columnas nullable (no requieren valor para las filas existentes)."""
+    inspector = inspect(sync_conn)
+    preparer = sync_conn.dialect.identifier_preparer
+    if_not_exists = " IF NOT EXISTS" if sync_conn.dialect.name == "postgresql" else ""
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN{if_not_exists} {preparer.format_column(column)} {column_type}"
+            ))
+
+
+def _create_missing_indexes(sync_conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
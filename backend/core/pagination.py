@@ -0,0 +1,47 @@
+# backend/core/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+# Cabecera donde se devuelve el cursor de la siguiente página.
+# (Se usa cabecera para no romper a los clientes que esperan una lista JSON)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# --- Codificación de cursores (keyset) ---
+def encode_cursor(values: List[Any]) -> str:
+    """Convierte los valores de la última fila en un token opaco (base64 url-safe)."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_value(value: Any, expected: type) -> Any:
+    if expected is datetime:
+        return datetime.fromisoformat(value)
+    # bool es subclase de int: no se acepta como id
+    if not isinstance(value, expected) or isinstance(value, bool):
+        raise TypeError(f"Se esperaba {expected.__name__}")
+    return value
+
+
+def decode_cursor(token: Optional[str], types: Sequence[type]) -> Optional[List[Any]]:
+    """
+    Decodifica un cursor generado por `encode_cursor` comprobando que cada valor sea del
+    tipo indicado en `types` (las fechas se vuelven a convertir a datetime). Lanza 400 si
+    el cursor no es válido, así un cursor manipulado nunca llega a la consulta SQL.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("Tamaño de cursor inesperado")
+        return [_decode_value(value, expected) for value, expected in zip(values, types)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
@@ -0,0 +1,144 @@
+# backend/core/rate_limit.py
+"""
+Limitador de peticiones en proceso (token bucket) como middleware ASGI.
+
+Cada regla se aplica a un prefijo de ruta (por segmentos completos: /api/auth/login
+no cubre /api/auth/login-x) y tiene su propio cubo por IP; si la petición lleva un
+JWT válido se descuenta además del cubo de su usuario (`sub`), así ni varias cuentas
+desde una IP ni una cuenta desde varias IPs esquivan el límite. Los cubos ocupan
+memoria constante (tokens + última recarga) y se expulsan por LRU al superar
+RATE_LIMIT_MAX_KEYS. Al agotarse se responde 429 con Retry-After sin tocar la BD,
+así los bots no consumen conexiones del pool.
+
+La IP sale de X-Forwarded-For solo si RATE_LIMIT_PROXY_HOPS > 0 (por defecto 1 en
+Render); si no, de la conexión, que detrás de un proxy es la del propio proxy.
+
+Los contadores son por proceso: con varios workers el límite efectivo se multiplica.
+"""
+
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.security import verify_token
+
+
+@dataclass
+class RateLimitRule:
+    prefix: str
+    rate: float                 # peticiones por minuto (ritmo sostenido)
+    burst: int                  # peticiones seguidas permitidas con el cubo lleno
+    methods: Optional[Tuple[str, ...]] = None  # None = todos salvo OPTIONS
+
+    @property
+    def per_second(self) -> float:
+        return self.rate / 60
+
+    def matches(self, method: str, path: str) -> bool:
+        prefix = self.prefix.rstrip("/")
+        if path != prefix and not path.startswith(prefix + "/"):
+            return False
+        if self.methods is None:
+            return method != "OPTIONS"
+        return method in self.methods
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RateLimitRule":
+        methods = data.get("methods")
+        return cls(
+            prefix=data["prefix"],
+            rate=float(data["rate"]),
+            burst=int(data["burst"]),
+            methods=tuple(m.upper() for m in methods) if methods else None,
+        )
+
+
+class TokenBuckets:
+    """Cubos por clave: [tokens, última recarga] en un OrderedDict con expulsión LRU."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[Any, List[float]]" = OrderedDict()
+
+    def take(self, key: Any, per_second: float, burst: int) -> float:
+        """Consume un token. Devuelve 0 si se permite o los segundos hasta el siguiente."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(burst), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * per_second)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / per_second
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, rules: List[RateLimitRule], max_keys: int = 100_000, proxy_hops: int = 0):
+        self.app = app
+        # Prefijos más largos primero: /api/products/search antes que /api/products
+        self.rules = sorted(rules, key=lambda rule: len(rule.prefix), reverse=True)
+        self.buckets = TokenBuckets(max_keys)
+        self.proxy_hops = proxy_hops
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method, path = scope["method"], scope["path"]
+        rule = next((rule for rule in self.rules if rule.matches(method, path)), None)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        retry_after = max(
+            self.buckets.take((rule.prefix, client_key), rule.per_second, rule.burst)
+            for client_key in self._client_keys(scope, headers)
+        )
+        if retry_after == 0:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps({"detail": "Demasiadas solicitudes, intenta de nuevo más tarde"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _client_keys(self, scope, headers: Dict[bytes, bytes]) -> List[str]:
+        keys = [f"ip:{self._client_ip(scope, headers)}"]
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization[:7].lower() == "bearer ":
+            # Solo tokens firmados por nosotros: un `sub` inventado no abre un cubo nuevo
+            payload = verify_token(authorization[7:].strip())
+            if payload and payload.get("sub"):
+                keys.append(f"user:{payload['sub']}")
+        return keys
+
+    def _client_ip(self, scope, headers: Dict[bytes, bytes]) -> str:
+        # Detrás de N proxies de confianza la IP real es la N-ésima empezando por el final;
+        # las anteriores las puede escribir el propio cliente
+        if self.proxy_hops:
+            forwarded = [ip.strip() for ip in headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",") if ip.strip()]
+            if forwarded:
+                return forwarded[-min(self.proxy_hops, len(forwarded))]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
@@ -1,10 +1,20 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from jose import JWTError, jwt
 from core.config import settings
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Callable, Dict, Tuple, TypeVar
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Los hashes con otro coste siguen verificando; el login los regenera con BCRYPT_ROUNDS
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -12,6 +22,69 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# --- bcrypt fuera del event loop ---
+# bcrypt libera el GIL, así que un pool de hilos pequeño basta. Como mucho
+# PASSWORD_HASH_MAX_PENDING operaciones (en curso + en cola); el resto recibe 503
+# en vez de acumular logins que esperarían segundos.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+_stats = {"calls": 0, "rejected": 0, "queue_ms_total": 0.0, "queue_ms_max": 0.0, "run_ms_total": 0.0}
+
+async def _run_hashing(fn: Callable[..., T], *args) -> T:
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        _stats["rejected"] += 1
+        logger.warning(f"Cola de bcrypt llena ({_pending} pendientes), se rechaza la petición")
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted = time.perf_counter()
+    timings = {}
+
+    def timed() -> T:
+        started = time.perf_counter()
+        timings["queue"] = started - submitted
+        try:
+            return fn(*args)
+        finally:
+            timings["run"] = time.perf_counter() - started
+
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, timed)
+    finally:
+        _pending -= 1
+        queue_ms = timings.get("queue", time.perf_counter() - submitted) * 1000
+        _stats["calls"] += 1
+        _stats["queue_ms_total"] += queue_ms
+        _stats["queue_ms_max"] = max(_stats["queue_ms_max"], queue_ms)
+        _stats["run_ms_total"] += timings.get("run", 0.0) * 1000
+        if queue_ms > settings.PASSWORD_HASH_QUEUE_WARN_MS:
+            logger.warning(f"bcrypt esperó {queue_ms:.0f} ms en cola ({_pending} pendientes)")
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(válida, nuevo hash o None). Hay nuevo hash si el guardado usa otro coste."""
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def password_hash_stats() -> Dict[str, Any]:
+    calls = _stats["calls"] or 1
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "rounds": settings.BCRYPT_ROUNDS,
+        "pending": _pending,
+        "calls": _stats["calls"],
+        "rejected": _stats["rejected"],
+        "queue_ms_avg": round(_stats["queue_ms_total"] / calls, 1),
+        "queue_ms_max": round(_stats["queue_ms_max"], 1),
+        "run_ms_avg": round(_stats["run_ms_total"] / calls, 1),
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=getattr(settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 60)))
@@ -25,18 +98,3 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
         return payload
     except JWTError:
         return None
-
-def verify_google_token(google_token: str):
-    # Requiere: pip install google-auth
-    from google.oauth2 import id_token
-    from google.auth.transport import requests
-
-    try:
-        idinfo = id_token.verify_oauth2_token(
-            google_token, requests.Request(), settings.GOOGLE_CLIENT_ID
-        )
-        if idinfo.get('email_verified'):
-            return idinfo
-    except Exception:
-        return None
-    return None
@@ -0,0 +1,142 @@
+# backend/core/sql_metrics.py
+"""
+Métricas de SQL por petición.
+
+Los eventos del engine suman a la petición en curso (ContextVar) el número de
+consultas, el tiempo total en BD y la consulta más lenta. El middleware los publica
+en la cabecera Server-Timing (visible en las DevTools del navegador) y, con
+SQL_METRICS_LOG_REQUESTS, en una línea de log JSON por petición. Siempre avisa
+cuando una misma sentencia se repite SQL_N_PLUS_ONE_THRESHOLD veces o más
+(probable patrón N+1: una consulta por item).
+
+Las consultas hechas después de enviar las cabeceras (respuestas en streaming,
+tareas en segundo plano) cuentan en el log pero no en Server-Timing.
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_SQL_CHARS = 300
+
+
+class RequestSQLStats:
+    __slots__ = ("queries", "total_ms", "slowest_ms", "slowest_sql", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.queries += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] += 1
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement
+
+    def repeated(self, threshold: int):
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.queries} queries", db-slowest;dur={self.slowest_ms:.1f}'
+
+
+_current: ContextVar[Optional[RequestSQLStats]] = ContextVar("request_sql_stats", default=None)
+
+
+# --- Eventos del engine ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["sql_metrics_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("sql_metrics_start", None)
+    stats = _current.get()
+    if started is None or stats is None:
+        return
+    stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None:
+        connection.info.pop("sql_metrics_start", None)
+
+
+def instrument(engine: Engine) -> None:
+    """
+    Engancha los eventos al engine síncrono (para uno async: `async_engine.sync_engine`).
+    Llamarlo de nuevo no hace nada: cada consulta se cuenta una sola vez.
+    """
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# --- Middleware ---
+class SQLMetricsMiddleware:
+    def __init__(self, app, n_plus_one_threshold: int = 10, log_requests: bool = False):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.log_requests = log_requests
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestSQLStats()
+        token = _current.set(stats)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if stats.queries:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if stats.queries:
+                self._report(scope, status_code, stats)
+
+    def _report(self, scope, status_code: int, stats: RequestSQLStats) -> None:
+        path = scope["path"]
+        if self.log_requests:
+            logger.info(json.dumps({
+                "event": "request_sql",
+                "method": scope["method"],
+                "path": path,
+                "status": status_code,
+                "queries": stats.queries,
+                "db_ms": round(stats.total_ms, 1),
+                "slowest_ms": round(stats.slowest_ms, 1),
+                "slowest_sql": (stats.slowest_sql or "")[:SLOWEST_SQL_CHARS],
+            }, ensure_ascii=False))
+        for statement, count in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(json.dumps({
+                "event": "sql_n_plus_one",
+                "method": scope["method"],
+                "path": path,
+                "count": count,
+                "sql": statement[:SLOWEST_SQL_CHARS],
+            }, ensure_ascii=False))
@@ -5,7 +5,10 @@ from contextlib import asynccontextmanager
 import logging
 
 from core.config import settings
-from core.database import create_tables
+from core.database import async_engine, create_tables
+from core.rate_limit import RateLimitMiddleware, RateLimitRule
+from core.sql_metrics import SQLMetricsMiddleware, instrument
+from services import email_service, jobs, product_search, sales_rollup
 # Asegúrate de importar todos tus routers
 from api import auth, products, cart, orders, admin, address 
 
@@ -17,8 +20,14 @@ async def lifespan(app: FastAPI):
     logger.info("Iniciando aplicación y creando tablas si no existen...")
     await create_tables()
     logger.info("El proceso de creación de tablas ha finalizado.")
+    await sales_rollup.backfill_if_empty()
+    await product_search.init_backend()
+    await jobs.start()
+    await email_service.start()
     yield
     logger.info("Cerrando aplicación.")
+    await email_service.stop()
+    await jobs.stop()
 
 app = FastAPI(
     title="E-commerce API",
@@ -28,6 +37,25 @@ app = FastAPI(
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# --- MÉTRICAS DE SQL POR PETICIÓN ---
+if settings.SQL_METRICS_ENABLED:
+    instrument(async_engine.sync_engine)
+    app.add_middleware(
+        SQLMetricsMiddleware,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+        log_requests=settings.SQL_METRICS_LOG_REQUESTS,
+    )
+
+# --- LÍMITE DE PETICIONES ---
+# Se añade antes que CORS para que las respuestas 429 también lleven sus cabeceras
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        rules=[RateLimitRule.from_dict(rule) for rule in settings.RATE_LIMIT_RULES],
+        max_keys=settings.RATE_LIMIT_MAX_KEYS,
+        proxy_hops=settings.RATE_LIMIT_PROXY_HOPS,
+    )
+
 # --- CONFIGURACIÓN DE CORS ---
 origins = [
     "https://www.suplementosdeloscampeonesgn.shop",
@@ -41,6 +69,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed", "Retry-After", "Server-Timing"],
 )
 
 # --- REGISTRO DE RUTAS ---
@@ -0,0 +1,32 @@
+# backend/models/analytics.py
+
+from sqlalchemy import Column, Integer, Float, String, Date
+from core.database import Base
+
+
+# Los contadores están repartidos en SALES_ROLLUP_SHARDS filas (`shard` = order_id % N)
+# para que los checkouts simultáneos no se serialicen en una sola fila caliente.
+# Las lecturas siempre suman todas las filas del cubo.
+
+# --- ROLLUP DIARIO DE VENTAS (por día y estado del pedido) ---
+class DailySalesRollup(Base):
+    __tablename__ = "daily_sales_rollup"
+
+    day = Column(Date, primary_key=True)              # día (UTC) de creación del pedido
+    status = Column(String(20), primary_key=True)     # valor de OrderStatus
+    shard = Column(Integer, primary_key=True, default=0)
+    orders_count = Column(Integer, nullable=False, default=0)
+    gross_amount = Column(Float, nullable=False, default=0)   # suma de total_amount
+
+
+# --- ROLLUP DIARIO POR PRODUCTO ---
+class DailyProductSalesRollup(Base):
+    __tablename__ = "daily_product_sales_rollup"
+
+    day = Column(Date, primary_key=True)
+    # Sin ForeignKey: el histórico se conserva aunque el producto se elimine
+    product_id = Column(Integer, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)          # suma de line_total
@@ -0,0 +1,27 @@
+# backend/models/email.py
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func
+from core.database import Base
+
+
+# --- BANDEJA DE SALIDA DE CORREOS (outbox) ---
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_content = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")   # pending | sending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # pending: cuándo toca el siguiente intento; sending: fin del lease del dispatcher que lo reclamó
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    lease_token = Column(String(32), nullable=True)   # lote del dispatcher que lo está enviando
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # El dispatcher busca pendientes cuyo siguiente intento ya venció
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
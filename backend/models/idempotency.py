@@ -0,0 +1,20 @@
+# backend/models/idempotency.py
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from core.database import Base
+
+
+# --- MODELO DE CLAVES DE IDEMPOTENCIA ---
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Clave compuesta: la misma Idempotency-Key de dos usuarios distintos no colisiona
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+
+    request_hash = Column(String(64), nullable=False)   # sha256 del cuerpo de la petición
+    status_code = Column(Integer, nullable=True)        # NULL = la petición original sigue en curso
+    response_body = Column(Text, nullable=True)         # respuesta JSON guardada para repeticiones
+    lock_token = Column(String(32), nullable=True)      # identifica la reserva vigente (ver services/idempotency.py)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
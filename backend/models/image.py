@@ -0,0 +1,15 @@
+# backend/models/image.py
+
+from sqlalchemy import Column, Integer, String, DateTime, func
+from core.database import Base
+
+
+# --- IMÁGENES SUBIDAS (deduplicación por contenido) ---
+class ImageUpload(Base):
+    __tablename__ = "image_uploads"
+
+    content_hash = Column(String(64), primary_key=True)   # sha256 del archivo
+    storage = Column(String(20), primary_key=True)        # backend donde está guardada
+    url = Column(String(500), nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
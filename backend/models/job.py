@@ -0,0 +1,23 @@
+# backend/models/job.py
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from core.database import Base
+
+
+# --- MODELO DE TAREAS EN SEGUNDO PLANO ---
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)                   # uuid4 hex
+    kind = Column(String(50), nullable=False)                   # "import_products", "export_orders", ...
+    status = Column(String(20), nullable=False, index=True)     # queued | running | succeeded | failed
+    params = Column(Text, nullable=True)                        # parámetros JSON de la tarea
+    progress = Column(Integer, nullable=False, default=0)       # filas/elementos procesados
+    result = Column(Text, nullable=True)                        # resumen JSON al terminar
+    result_path = Column(String(500), nullable=True)            # archivo generado (descargable)
+    result_filename = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(String(255), nullable=True)             # email del admin que la lanzó
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
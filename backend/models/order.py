@@ -1,6 +1,6 @@
 # backend/models/order.py
 
-from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, Float, String, DateTime, Boolean, ForeignKey, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from core.database import Base
@@ -40,6 +40,16 @@ class Order(Base):
     items = relationship("OrderItem", back_populates="order")
     user = relationship("User", back_populates="orders")
 
+    # Recupera created_at (server_default) en el mismo INSERT ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        # Historial por usuario paginado por (created_at, id)
+        Index("ix_orders_user_created_id", "user_id", "created_at", "id"),
+        # Rangos de fecha del dashboard y listados de admin
+        Index("ix_orders_created_at", "created_at"),
+    )
+
 
 # --- MODELO DE ITEMS DE PEDIDO (ORDER ITEMS) ---
 class OrderItem(Base):
@@ -49,7 +59,7 @@ class OrderItem(Base):
     id = Column(Integer, primary_key=True, index=True)
     
     # ✅ CORREGIDO: Apunta a "orders.id"
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False) 
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     
     # ✅ ¡ESTA ES LA CORRECCIÓN PRINCIPAL!
     # Apunta a "products.id" (plural y minúscula)
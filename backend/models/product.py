@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, TIMESTAMP, text, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Boolean, Text, TIMESTAMP, text, ForeignKey, Index
 from core.database import Base
 
 class Product(Base):
@@ -23,4 +23,26 @@ class Product(Base):
     is_featured = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
     
-    updated_at = Column(TIMESTAMP(timezone=True), onupdate=text('now()'))
\ No newline at end of file
+    updated_at = Column(TIMESTAMP(timezone=True), onupdate=text('now()'))
+
+    # Huella de la última fila importada (services/product_import.py). Cualquier otra
+    # escritura en las columnas importadas debe ponerla a NULL para que la próxima
+    # importación vuelva a aplicar la fila.
+    content_hash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        # Índice para la paginación keyset por (name, id) del catálogo
+        Index("ix_products_name_id", "name", "id"),
+    )
+
+
+class CatalogVersion(Base):
+    """
+    Fila única (id=1) cuya versión se incrementa en cada transacción que cambia el
+    catálogo. Los workers la comparan con la suya para saber si su caché sigue vigente
+    (services/catalog_cache.py).
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
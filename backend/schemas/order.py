@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, constr
+from pydantic import BaseModel, ConfigDict, constr, field_validator
 from typing import List, Optional
 from datetime import datetime
 import enum
@@ -55,5 +55,24 @@ class Order(BaseModel):
     user: UserInOrder
     items: List[OrderItem]
 
+# Proyección ligera para el historial (view=summary): cabecera del pedido + agregados
+class OrderSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    order_number: str
+    status: str
+    total_amount: float
+    shipping_type: Optional[str] = None
+    shipping_cost: Optional[float] = None
+    payment_method: str
+    created_at: datetime
+    item_count: int
+    items_total: float
+
+    @field_validator("status", mode="before")
+    @classmethod
+    def _status_value(cls, value):
+        return getattr(value, "value", value)
+
 class OrderStatusUpdate(BaseModel):
     status: OrderStatusEnum             # -- Ahora validado con Enum (mayúsculas)
@@ -1,7 +1,7 @@
 # en backend/schemas/product.py
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # Schema base con los campos comunes
@@ -44,4 +44,9 @@ class Product(ProductBase):
     updated_at: Optional[datetime] = None
 
     class Config:
-        orm_mode = True # Permite que Pydantic lea los datos desde el modelo SQLAlchemy
\ No newline at end of file
+        from_attributes = True # Permite que Pydantic lea los datos desde el modelo SQLAlchemy
+
+# Schema para la consulta de varios productos a la vez (carrito / checkout)
+class ProductBatch(BaseModel):
+    products: Dict[int, Product]
+    missing: List[int] = []
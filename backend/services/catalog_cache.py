@@ -0,0 +1,153 @@
+# backend/services/catalog_cache.py
+
+import hashlib
+import itertools
+import json
+import logging
+import time
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import TTLCache
+from core.config import settings
+from core.database import async_engine
+from models.product import CatalogVersion
+
+logger = logging.getLogger(__name__)
+
+# Guarda páginas del listado ("list", ...), detalles ("product", id) y búsquedas ya
+# serializados: (valor, etag, versión en que se leyó, ids de los productos que contiene)
+_cache = TTLCache(maxsize=settings.CATALOG_CACHE_MAXSIZE, ttl=settings.CATALOG_CACHE_TTL)
+
+# Versión local del catálogo; toda invalidación hecha en este proceso la incrementa
+# (descarta valores calculados mientras tanto, ver `set`).
+_versions = itertools.count(1)
+_version = next(_versions)
+# Versión de la última invalidación completa y de la última de cada producto (checkout)
+_cleared_at = _version
+_product_changed_at: Dict[int, int] = {}
+
+# Última versión leída de la tabla catalog_version (ver `sync`) y cuándo se leyó
+_db_version: Optional[int] = None
+_db_checked_at = 0.0
+
+
+def version() -> int:
+    return _version
+
+
+def get(key: Hashable) -> Optional[Tuple[Any, str]]:
+    """(valor, etag) guardado para `key`, o None si no está o alguno de sus productos cambió."""
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    value, value_etag, read_at, product_ids = entry
+    if _changed_since(read_at, product_ids):
+        _cache.pop(key)
+        return None
+    return value, value_etag
+
+
+def set(key: Hashable, value: Any, at_version: Optional[int] = None, product_ids: Iterable[int] = ()) -> str:
+    """
+    Guarda un valor en el catálogo y devuelve su ETag. `product_ids` son los productos que
+    contiene (ver `invalidate_products`). Si se indica `at_version` (la versión leída antes
+    de consultar la BD) y desde entonces se invalidó el catálogo o alguno de esos
+    productos, el valor no se guarda (el ETag se devuelve igualmente).
+    """
+    value_etag = etag(value)
+    product_ids = tuple(product_ids)
+    read_at = _version if at_version is None else at_version
+    if not _changed_since(read_at, product_ids):
+        _cache.set(key, (value, value_etag, read_at, product_ids))
+    return value_etag
+
+
+def _changed_since(read_at: int, product_ids: Tuple[int, ...]) -> bool:
+    if _cleared_at > read_at:
+        return True
+    return any(_product_changed_at.get(product_id, 0) > read_at for product_id in product_ids)
+
+
+def invalidate() -> None:
+    """
+    Vacía el catálogo en memoria e incrementa su versión. Debe llamarse después de
+    cualquier commit que modifique productos (altas, bajas, cambios, importaciones).
+    """
+    global _version, _cleared_at, _db_version
+    _version = next(_versions)
+    _cleared_at = _version
+    _product_changed_at.clear()
+    # Nuestro propio `bump` ya cambió la versión en la BD: se adopta en la próxima lectura
+    _db_version = None
+    _cache.clear()
+    logger.debug(f"Caché de catálogo invalidada (versión {_version})")
+
+
+def invalidate_products(product_ids: Iterable[int]) -> None:
+    """
+    Descarta solo las entradas que contienen alguno de estos productos (el resto de la
+    caché sigue caliente). Para cambios que no afectan a qué productos aparecen en cada
+    página ni a la búsqueda, es decir, los descuentos de stock del checkout. No toca la
+    versión de la BD: en otros workers el stock puede verse viejo hasta
+    CATALOG_CACHE_TTL segundos (el checkout lo vuelve a comprobar).
+    """
+    global _version
+    _version = next(_versions)
+    for product_id in product_ids:
+        _product_changed_at[product_id] = _version
+        _cache.pop(("product", product_id))
+
+
+# --- Versión compartida entre procesos ---
+async def bump(db: AsyncSession) -> None:
+    """
+    Incrementa la versión del catálogo en la BD. Se llama dentro de la transacción que
+    modifica productos (altas, bajas, ediciones, importaciones), antes del commit, y tras
+    el commit `invalidate()`. Los demás workers lo ven en su siguiente `sync`.
+    """
+    dialect_insert = postgresql.insert if async_engine.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(CatalogVersion).values(id=1, version=1)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[CatalogVersion.id],
+        set_={"version": CatalogVersion.version + 1},
+    ))
+
+
+async def sync(db: AsyncSession) -> int:
+    """
+    Devuelve la versión del catálogo en la BD, leída como mucho una vez cada
+    CATALOG_VERSION_TTL segundos (una lectura por clave primaria). Si otro proceso la
+    cambió se vacía la caché local; mientras tanto las respuestas y los 304 se sirven
+    desde memoria sin consultar la BD. Solo cambia con altas, bajas, ediciones e
+    importaciones, no con el stock: de ella depende también el índice de búsqueda.
+    """
+    global _db_version, _db_checked_at
+    if _db_version is not None and time.monotonic() < _db_checked_at + settings.CATALOG_VERSION_TTL:
+        return _db_version
+    current = (await db.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1))).scalar() or 0
+    if _db_version is not None and current != _db_version:
+        logger.info(f"Catálogo modificado en otro proceso (versión {current})")
+        invalidate()
+    _db_version = current
+    _db_checked_at = time.monotonic()
+    return current
+
+
+# --- ETags ---
+def etag(value: Any) -> str:
+    """ETag fuerte: hash del contenido serializado (igual en todos los workers)."""
+    payload = json.dumps(value, default=str, sort_keys=True, separators=(",", ":"))
+    return '"' + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    """Evalúa la cabecera If-None-Match (lista separada por comas o '*')."""
+    if not if_none_match:
+        return False
+    # Comparación débil (RFC 9110): un proxy que comprime puede añadir el prefijo W/
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return current in candidates or "*" in candidates
@@ -1,18 +1,265 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+# backend/services/email_service.py
+"""
+Correos transaccionales mediante una bandeja de salida (tabla email_outbox).
+
+Quien quiere enviar un correo solo inserta una fila en la misma transacción que el
+cambio que lo origina (p. ej. el pedido), así la latencia del checkout no depende
+del proveedor y no se pierden correos si el proceso cae. Un dispatcher en segundo
+plano, arrancado desde el lifespan, los envía por lotes con un cliente reutilizado
+y reintentos con backoff exponencial, sin mantener abierta una transacción durante
+el envío (ver dispatch_batch).
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from core.config import settings
+from core.database import AsyncSessionLocal
+from models.email import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+MAX_RETRY_DELAY = 3600
+# Segundos que se espera al lote en curso al detener la app
+SHUTDOWN_TIMEOUT = 10.0
+
+
+# --- Transportes ---
+class EmailTransport:
+    """Interfaz de envío. `send` es síncrono: el dispatcher lo ejecuta en hilos."""
+
+    def send(self, to_email: str, subject: str, html_content: str) -> None:
+        raise NotImplementedError
+
+
+class SendGridTransport(EmailTransport):
+    def __init__(self):
+        from sendgrid import SendGridAPIClient
+        # Un único cliente para todos los envíos (reutiliza la conexión HTTP)
+        self.client = SendGridAPIClient(settings.SENDGRID_API_KEY)
+
+    def send(self, to_email: str, subject: str, html_content: str) -> None:
+        from sendgrid.helpers.mail import Mail
+        message = Mail(
+            from_email=settings.FROM_EMAIL,
+            to_emails=to_email,
+            subject=subject,
+            html_content=html_content,
+        )
+        response = self.client.send(message)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid respondió {response.status_code}: {response.body}")
+
+
+class ConsoleTransport(EmailTransport):
+    """Solo registra el correo en el log (desarrollo)."""
+
+    def send(self, to_email: str, subject: str, html_content: str) -> None:
+        logger.info(f"[email] Para: {to_email} | Asunto: {subject}")
+
+
+class FileTransport(EmailTransport):
+    """Añade cada correo como una línea JSON a EMAIL_FILE_PATH (pruebas)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.EMAIL_FILE_PATH
+
+    def send(self, to_email: str, subject: str, html_content: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"to": to_email, "subject": subject, "html": html_content}, ensure_ascii=False) + "\n")
+
+
+TRANSPORTS = {"sendgrid": SendGridTransport, "console": ConsoleTransport, "file": FileTransport}
+
+_transport: Optional[EmailTransport] = None
+
+
+def get_transport() -> EmailTransport:
+    global _transport
+    if _transport is None:
+        name = settings.EMAIL_TRANSPORT
+        if name == "auto":
+            name = "sendgrid" if settings.SENDGRID_API_KEY else "console"
+        _transport = TRANSPORTS[name]()
+    return _transport
+
 
-def send_order_confirmation_email(to_email: str, order_details: str):
-    message = Mail(
-        from_email=settings.FROM_EMAIL,
-        to_emails=to_email,
-        subject='Confirmación de su pedido',
-        html_content=order_details,
+# --- Encolado (dentro de la transacción del llamador) ---
+def queue_email(db: AsyncSession, to_email: str, subject: str, html_content: str) -> EmailOutbox:
+    """Añade el correo a la sesión; se envía después del commit del llamador."""
+    email = EmailOutbox(to_email=to_email, subject=subject, html_content=html_content,
+                        status=PENDING, attempts=0)
+    db.add(email)
+    return email
+
+
+def queue_order_confirmation_email(db: AsyncSession, to_email: str, order_number: str,
+                                   items: List[dict], total_amount: float) -> EmailOutbox:
+    rows = "".join(
+        f"<tr><td>{escape(str(item['product_name']))}</td><td>{item['quantity']}</td>"
+        f"<td>${item['line_total']:,.2f}</td></tr>"
+        for item in items
+    )
+    html_content = (
+        f"<h2>¡Gracias por tu compra!</h2>"
+        f"<p>Recibimos tu pedido <strong>{escape(order_number)}</strong>.</p>"
+        f"<table><tr><th>Producto</th><th>Cantidad</th><th>Total</th></tr>{rows}</table>"
+        f"<p>Total del pedido: <strong>${total_amount:,.2f}</strong></p>"
+    )
+    return queue_email(db, to_email, 'Confirmación de su pedido', html_content)
+
+
+# --- Dispatcher ---
+_wakeup: Optional[asyncio.Event] = None
+_task: Optional[asyncio.Task] = None
+_stopping = False
+
+
+def wake() -> None:
+    """Avisa al dispatcher de que hay correos nuevos (llamar tras el commit)."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+async def dispatch_batch() -> int:
+    """
+    Envía un lote de correos pendientes y devuelve cuántos se procesaron.
+
+    Tres pasos para no retener una conexión del pool (ni bloqueos) mientras responde
+    el proveedor:
+    1. Transacción corta: se reclaman las filas (FOR UPDATE SKIP LOCKED en Postgres,
+       así varias instancias no toman las mismas) pasándolas a "sending" con un lease
+       de EMAIL_LEASE_SECONDS, y se confirma.
+    2. Envío fuera de cualquier transacción.
+    3. Transacción corta: se guarda el resultado de cada correo.
+    Si el proceso cae entre 1 y 3, al vencer el lease las filas se reclaman de nuevo
+    (un correo puede llegar a enviarse dos veces, pero no se pierde).
+    """
+    batch = await _claim_batch()
+    if not batch:
+        return 0
+
+    transport = get_transport()
+    outcomes = await asyncio.gather(
+        *(asyncio.to_thread(transport.send, email["to_email"], email["subject"], email["html_content"])
+          for email in batch),
+        return_exceptions=True
     )
-    try:
-        sg = SendGridAPIClient(settings.SENDGRID_API_KEY)
-        sg.send(message)
-        return True
-    except Exception as e:
-        print(f'Error enviando email: {e}')
-        return False
+    await _record_outcomes(batch, outcomes)
+    return len(batch)
+
+
+async def _claim_batch() -> List[dict]:
+    now = datetime.now(timezone.utc)
+    token = uuid.uuid4().hex
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status.in_([PENDING, SENDING]), EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.id)
+            .limit(settings.EMAIL_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        ids = list(result.scalars())
+        if not ids:
+            return []
+        # El intento cuenta al reclamarlo: si el proceso cae durante el envío también suma
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids))
+            .values(
+                status=SENDING,
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_LEASE_SECONDS),
+                lease_token=token,
+            )
+        )
+        result = await db.execute(
+            select(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject,
+                   EmailOutbox.html_content, EmailOutbox.attempts, EmailOutbox.lease_token)
+            .where(EmailOutbox.id.in_(ids))
+            .order_by(EmailOutbox.id)
+        )
+        batch = [dict(row._mapping) for row in result]
+        await db.commit()
+    return batch
+
+
+async def _record_outcomes(batch: List[dict], outcomes: list) -> None:
+    finished_at = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        for email, outcome in zip(batch, outcomes):
+            if not isinstance(outcome, Exception):
+                values = {"status": SENT, "sent_at": finished_at, "last_error": None}
+            elif email["attempts"] >= settings.EMAIL_MAX_ATTEMPTS:
+                values = {"status": FAILED, "last_error": str(outcome)}
+                logger.error(f"Correo {email['id']} a {email['to_email']} descartado tras {email['attempts']} intentos: {outcome}")
+            else:
+                values = {
+                    "status": PENDING,
+                    "last_error": str(outcome),
+                    "next_attempt_at": finished_at + timedelta(seconds=_retry_delay(email["attempts"])),
+                }
+                logger.warning(f"Fallo al enviar correo {email['id']} (intento {email['attempts']}): {outcome}")
+            # Solo si el lease sigue siendo nuestro (si venció, otro dispatcher ya lo reclamó)
+            await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == email["id"], EmailOutbox.lease_token == email["lease_token"])
+                .values(lease_token=None, **values)
+            )
+        await db.commit()
+
+
+async def _run() -> None:
+    while not _stopping:
+        _wakeup.clear()
+        try:
+            processed = await dispatch_batch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Error en el dispatcher de correos: {e}")
+            processed = 0
+        # Lote completo: probablemente quedan más, se sigue sin esperar
+        if processed >= settings.EMAIL_BATCH_SIZE:
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.EMAIL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start() -> None:
+    global _wakeup, _task, _stopping
+    _stopping = False
+    _wakeup = asyncio.Event()
+    _task = asyncio.create_task(_run())
+    logger.info("Dispatcher de correos iniciado")
+
+
+async def stop() -> None:
+    """Deja terminar el lote en curso (hasta SHUTDOWN_TIMEOUT) para no dejarlo en "sending"."""
+    global _task, _stopping
+    if _task is not None:
+        _stopping = True
+        _wakeup.set()
+        try:
+            await asyncio.wait_for(_task, timeout=SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("El dispatcher de correos no terminó a tiempo: su lote se reintentará al vencer el lease")
+        except Exception:
+            pass
+        _task = None
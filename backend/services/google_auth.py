@@ -0,0 +1,157 @@
+# backend/services/google_auth.py
+"""
+Verificación local de ID tokens de Google (Sign-In).
+
+Las claves públicas de Google (JWKS) se descargan una vez y se guardan lo que indique
+su Cache-Control max-age; poco antes de caducar se renuevan en segundo plano, así que
+verificar un token solo cuesta la comprobación de la firma RS256. Si llega un `kid`
+desconocido (Google rotó las claves) se fuerza una recarga, como mucho una cada
+KEY_MISS_REFRESH_INTERVAL segundos.
+
+La fuente de claves es intercambiable (`set_key_source`) para usar claves locales en
+pruebas sin acceso a la red.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+import urllib.request
+from typing import Any, Dict, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+DEFAULT_MAX_AGE = 3600
+# Fracción final de la vida de las claves en la que ya se recargan en segundo plano
+REFRESH_AHEAD = 0.1
+KEY_MISS_REFRESH_INTERVAL = 60.0
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+# --- Fuentes de claves ---
+class KeySource:
+    """Devuelve (JWKS, segundos de validez)."""
+
+    async def fetch(self) -> Tuple[Dict[str, Any], float]:
+        raise NotImplementedError
+
+
+class GoogleCertsSource(KeySource):
+    def __init__(self, url: str = GOOGLE_CERTS_URL, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def _get(self) -> Tuple[Dict[str, Any], float]:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            jwks = json.load(response)
+            match = _MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        return jwks, float(match.group(1)) if match else DEFAULT_MAX_AGE
+
+    async def fetch(self) -> Tuple[Dict[str, Any], float]:
+        # Descarga síncrona (y poco frecuente) en un hilo, fuera del event loop
+        return await asyncio.to_thread(self._get)
+
+
+class StaticKeySource(KeySource):
+    """JWKS fijo (pruebas o desarrollo sin red)."""
+
+    def __init__(self, jwks: Dict[str, Any], max_age: float = DEFAULT_MAX_AGE):
+        self.jwks = jwks
+        self.max_age = max_age
+
+    async def fetch(self) -> Tuple[Dict[str, Any], float]:
+        return self.jwks, self.max_age
+
+
+# --- Caché de claves ---
+class KeyCache:
+    def __init__(self, source: KeySource):
+        self.source = source
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._refresh: Optional[asyncio.Task] = None
+
+    async def get(self, kid: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        if now >= self._expires_at:
+            try:
+                await asyncio.shield(self._schedule())
+            except Exception:
+                # Google no responde: mientras haya claves anteriores se siguen usando
+                if not self._keys:
+                    raise
+        elif now >= self._expires_at - (self._expires_at - self._fetched_at) * REFRESH_AHEAD:
+            self._schedule()
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._fetched_at >= KEY_MISS_REFRESH_INTERVAL:
+            await asyncio.shield(self._schedule())
+            key = self._keys.get(kid)
+        return key
+
+    def _schedule(self) -> asyncio.Task:
+        # Una sola descarga a la vez, la compartan peticiones o la recarga en segundo plano
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._load())
+            self._refresh.add_done_callback(self._log_failure)
+        return self._refresh
+
+    async def _load(self) -> None:
+        jwks, max_age = await self.source.fetch()
+        self._keys = {key["kid"]: key for key in jwks.get("keys", []) if "kid" in key}
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+        logger.info(f"Claves de Google actualizadas ({len(self._keys)} claves, max-age {max_age:.0f}s)")
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"No se pudieron descargar las claves de Google: {task.exception()}")
+
+
+_cache = KeyCache(GoogleCertsSource())
+
+
+def set_key_source(source: KeySource) -> None:
+    global _cache
+    _cache = KeyCache(source)
+
+
+# --- Verificación ---
+async def verify_id_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Claims del ID token si la firma, audiencia, emisor y expiración son válidos y el
+    email está verificado; None en cualquier otro caso.
+    """
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = await _cache.get(kid) if kid else None
+        if key is None:
+            return None
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            audience=settings.GOOGLE_CLIENT_ID,
+            # at_hash solo se puede comprobar con el access token, que aquí no se recibe
+            options={"verify_at_hash": False},
+        )
+    except JWTError:
+        return None
+    except Exception as e:
+        logger.error(f"Error al verificar token de Google: {e}")
+        return None
+
+    if claims.get("iss") not in GOOGLE_ISSUERS or not claims.get("email_verified"):
+        return None
+    return claims
@@ -0,0 +1,186 @@
+# backend/services/idempotency.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.idempotency import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Peticiones en curso en este proceso: las repeticiones concurrentes esperan el mismo
+# resultado. Se guarda también el hash del cuerpo para rechazar una repetición distinta.
+_inflight: Dict[Tuple[int, str], Tuple[str, asyncio.Future]] = {}
+
+
+def fingerprint(payload: Any) -> str:
+    """Hash estable del cuerpo de la petición para detectar reutilización de la clave."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _reused_key() -> HTTPException:
+    return HTTPException(status_code=422, detail="La Idempotency-Key ya se usó con un cuerpo de petición distinto")
+
+
+def _in_progress() -> HTTPException:
+    return HTTPException(status_code=409, detail="Una petición con esta Idempotency-Key sigue en curso")
+
+
+class Reservation:
+    """Reserva de una Idempotency-Key mientras se ejecuta la petición original."""
+
+    def __init__(self, user_id: int, key: str, token: str, status_code: int):
+        self.user_id = user_id
+        self.key = key
+        self.token = token
+        self.status_code = status_code
+
+    async def save_response(self, db: AsyncSession, body: Any) -> None:
+        """
+        Guarda la respuesta en la sesión `db` del handler, sin commit: debe llamarse en la
+        misma transacción que crea el recurso, así no puede quedar un pedido confirmado sin
+        su respuesta (ni al revés). Si la reserva caducó y otra petición la tomó, falla con
+        409 y el handler deshace su transacción.
+        """
+        result = await db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.lock_token == self.token,
+                IdempotencyKey.status_code.is_(None),
+            )
+            .values(status_code=self.status_code, response_body=json.dumps(body, default=str))
+        )
+        if result.rowcount != 1:
+            raise _in_progress()
+
+
+async def run_idempotent(
+    user_id: int,
+    key: str,
+    request_hash: str,
+    handler: Callable[[Reservation], Awaitable[Any]],
+    status_code: int = 200,
+) -> Tuple[int, Any, bool]:
+    """
+    Ejecuta `handler` una sola vez por (usuario, Idempotency-Key) dentro de la ventana TTL.
+    El handler recibe la reserva y debe llamar a `reservation.save_response(db, body)`
+    antes de su propio commit. Devuelve (status_code, cuerpo JSON, replayed); si la clave
+    ya se usó con éxito se devuelve la respuesta guardada sin volver a ejecutar nada.
+    """
+    slot = (user_id, key)
+    pending = _inflight.get(slot)
+    if pending is not None:
+        pending_hash, future = pending
+        if pending_hash != request_hash:
+            raise _reused_key()
+        stored_status, body, _ = await asyncio.shield(future)
+        return stored_status, body, True
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[slot] = (request_hash, future)
+    try:
+        outcome = await _execute(user_id, key, request_hash, handler, status_code)
+        future.set_result(outcome)
+        return outcome
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # marcada como consumida aunque no haya nadie esperando
+        raise
+    finally:
+        _inflight.pop(slot, None)
+
+
+async def _reserve(user_id: int, key: str, request_hash: str, status_code: int):
+    """Devuelve la respuesta guardada (status, cuerpo) o una Reservation nueva ya confirmada."""
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        )
+        record = result.scalar_one_or_none()
+
+        if record is not None and _as_utc(record.expires_at) > now:
+            if record.request_hash != request_hash:
+                raise _reused_key()
+            if record.status_code is not None:
+                return record.status_code, json.loads(record.response_body)
+            lock_expired = _as_utc(record.created_at) + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS) <= now
+            if not lock_expired:
+                raise _in_progress()
+            # Reserva abandonada (la petición original cayó sin confirmar nada): se toma
+            # solo si sigue siendo esa misma reserva y sin respuesta. Si la original acaba
+            # de confirmar, este DELETE espera a su commit y ya no encuentra la fila.
+            taken = await db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.lock_token == record.lock_token,
+                    IdempotencyKey.status_code.is_(None),
+                )
+            )
+            if taken.rowcount != 1:
+                await db.rollback()
+                raise _in_progress()
+
+        # Limpia las claves caducadas del usuario (incluida esta si lo estaba)
+        await db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.expires_at <= now)
+        )
+        token = uuid.uuid4().hex
+        db.add(IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            lock_token=token,
+            created_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise _in_progress()
+        return Reservation(user_id, key, token, status_code)
+
+
+async def _execute(user_id, key, request_hash, handler, status_code) -> Tuple[int, Any, bool]:
+    reservation = await _reserve(user_id, key, request_hash, status_code)
+    if not isinstance(reservation, Reservation):
+        stored_status, body = reservation
+        return stored_status, body, True
+
+    try:
+        body = await handler(reservation)
+    except BaseException:
+        # El handler deshizo su transacción: se libera la clave para que el cliente pueda reintentar
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.lock_token == reservation.token,
+                    IdempotencyKey.status_code.is_(None),
+                )
+            )
+            await db.commit()
+        raise
+    return status_code, body, False
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite devuelve datetimes sin zona horaria
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -0,0 +1,203 @@
+# backend/services/image_storage.py
+"""
+Subida de imágenes de producto.
+
+Los archivos se vuelcan a disco por trozos mientras se calcula su sha256; las
+imágenes ya subidas antes (misma huella) se resuelven con la tabla image_uploads
+sin volver a subirlas, y el resto se suben en paralelo en un pool de hilos
+acotado, fuera del event loop (los SDK de almacenamiento son síncronos).
+
+El almacenamiento es intercambiable (IMAGE_STORAGE): Cloudinary en producción o
+el sistema de archivos local (static/uploads) para desarrollo y pruebas.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import cloudinary
+import cloudinary.uploader
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from core.config import settings
+from core.database import AsyncSessionLocal, async_engine
+from models.image import ImageUpload
+
+logger = logging.getLogger(__name__)
+
+SPOOL_CHUNK = 1024 * 1024
+
+
+# --- Backends de almacenamiento ---
+class ImageStorage:
+    """Interfaz de almacenamiento. `upload` es síncrono: se ejecuta en el pool de hilos."""
+
+    name = ""
+
+    def upload(self, path: str, key: str) -> str:
+        """Guarda el archivo bajo `key` (su huella) y devuelve la URL pública."""
+        raise NotImplementedError
+
+
+class CloudinaryStorage(ImageStorage):
+    name = "cloudinary"
+
+    def __init__(self):
+        cloudinary.config(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET
+        )
+
+    def upload(self, path: str, key: str) -> str:
+        result = cloudinary.uploader.upload(
+            path,
+            folder="campeones-gn/products",
+            public_id=key,
+            overwrite=False,
+            transformation=[
+                {"width": 800, "height": 800, "crop": "limit"},
+                {"quality": "auto"}
+            ],
+        )
+        return result["secure_url"]
+
+
+class LocalStorage(ImageStorage):
+    """Guarda en static/uploads (servido por el mount /static de main.py)."""
+
+    name = "local"
+
+    def __init__(self, directory: str = "static/uploads", url_prefix: str = "/static/uploads"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+
+    def upload(self, path: str, key: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        filename = key + os.path.splitext(path)[1].lower()
+        shutil.copyfile(path, os.path.join(self.directory, filename))
+        return f"{self.url_prefix}/{filename}"
+
+
+STORAGES = {"cloudinary": CloudinaryStorage, "local": LocalStorage}
+
+_storage: Optional[ImageStorage] = None
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_UPLOAD_WORKERS, thread_name_prefix="image-upload")
+
+
+def get_storage() -> ImageStorage:
+    global _storage
+    if _storage is None:
+        _storage = STORAGES[settings.IMAGE_STORAGE]()
+    return _storage
+
+
+# --- Pipeline ---
+@dataclass
+class SpooledImage:
+    path: str
+    filename: str
+    content_hash: str
+    size: int
+
+
+async def spool_upload(
+    upload: UploadFile, directory: str, images_only: bool = True, max_bytes: Optional[int] = None
+) -> SpooledImage:
+    """
+    Copia el archivo a `directory` por trozos calculando su sha256 y su tamaño. Por defecto
+    solo acepta imágenes de hasta IMAGE_MAX_BYTES; con `images_only=False` (p. ej. el Excel
+    o CSV de una importación) no se comprueba el tipo y el límite es `max_bytes`, si se da.
+    """
+    if images_only and upload.content_type and not upload.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail=f"'{upload.filename}' no es una imagen")
+    if images_only and max_bytes is None:
+        max_bytes = settings.IMAGE_MAX_BYTES
+    name = os.path.basename(upload.filename or ("imagen" if images_only else "archivo"))
+    path = os.path.join(directory, f"{len(os.listdir(directory))}-{name}")
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as f:
+        while chunk := await upload.read(SPOOL_CHUNK):
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"'{name}' supera el tamaño máximo de {max_bytes // (1024 * 1024)} MB"
+                )
+            digest.update(chunk)
+            f.write(chunk)
+    return SpooledImage(path, name, digest.hexdigest(), size)
+
+
+def hash_file(path: str) -> SpooledImage:
+    """SpooledImage de un archivo ya en disco (p. ej. el de una tarea en segundo plano)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(SPOOL_CHUNK):
+            size += len(chunk)
+            digest.update(chunk)
+    return SpooledImage(path, os.path.basename(path), digest.hexdigest(), size)
+
+
+async def store_images(images: List[SpooledImage]) -> List[Dict]:
+    """
+    Sube las imágenes que no estén ya en el almacenamiento y devuelve, por archivo y en
+    el mismo orden, {"filename", "url", "deduplicated"} o {"filename", "error"}.
+    """
+    storage = get_storage()
+    hashes = sorted({image.content_hash for image in images})
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ImageUpload.content_hash, ImageUpload.url)
+            .where(ImageUpload.storage == storage.name, ImageUpload.content_hash.in_(hashes))
+        )
+        known: Dict[str, str] = dict(result.all())
+
+    # Una subida por huella nueva, aunque el mismo archivo venga repetido en la petición
+    pending = {image.content_hash: image for image in images if image.content_hash not in known}
+    loop = asyncio.get_running_loop()
+    outcomes = await asyncio.gather(
+        *(loop.run_in_executor(_executor, storage.upload, image.path, content_hash)
+          for content_hash, image in pending.items()),
+        return_exceptions=True
+    )
+    uploaded: Dict[str, str] = {}
+    failed: Dict[str, Exception] = {}
+    for (content_hash, image), outcome in zip(pending.items(), outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Error al subir imagen '{image.filename}': {outcome}")
+            failed[content_hash] = outcome
+        else:
+            uploaded[content_hash] = outcome
+
+    if uploaded:
+        dialect_insert = postgresql.insert if async_engine.dialect.name == "postgresql" else sqlite.insert
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                dialect_insert(ImageUpload)
+                .values([
+                    {"content_hash": content_hash, "storage": storage.name, "url": url,
+                     "size": pending[content_hash].size}
+                    for content_hash, url in uploaded.items()
+                ])
+                .on_conflict_do_nothing()
+            )
+            await db.commit()
+
+    results = []
+    for image in images:
+        if image.content_hash in failed:
+            results.append({"filename": image.filename, "error": str(failed[image.content_hash])})
+        else:
+            url = known.get(image.content_hash) or uploaded[image.content_hash]
+            results.append({"filename": image.filename, "url": url, "deduplicated": image.content_hash in known})
+    return results
@@ -0,0 +1,243 @@
+# backend/services/jobs.py
+"""
+Cola de tareas en proceso para operaciones largas de admin (importaciones,
+exportaciones, subidas de imágenes).
+
+Las tareas se registran en la tabla `jobs` (estado, progreso, resultado) y las
+ejecutan JOBS_CONCURRENCY workers asyncio arrancados desde el lifespan de la app,
+así la petición HTTP responde al instante y el trabajo pesado no ocupa workers ni
+conexiones más allá de ese límite. Los archivos de entrada y de resultado viven en
+JOBS_DIR/<job_id>/.
+
+Pensado para una sola instancia: al arrancar, las tareas que quedaron "running"
+se marcan como fallidas y las "queued" se vuelven a encolar. Los workers borran
+cada JOBS_PURGE_INTERVAL_SECONDS las tareas terminadas que superan la retención.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.job import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+# Como mucho una escritura de progreso por segundo y tarea
+PROGRESS_INTERVAL = 1.0
+
+Handler = Callable[["JobContext", Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+_handlers: Dict[str, Handler] = {}
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_next_purge_at = 0.0
+
+
+def handler(kind: str):
+    """Registra la corrutina que ejecuta las tareas de tipo `kind`."""
+    def decorator(fn: Handler) -> Handler:
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def job_dir(job_id: str) -> str:
+    path = os.path.join(settings.JOBS_DIR, job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class JobContext:
+    """Lo que recibe el handler: su directorio de trabajo y cómo informar del progreso."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.workdir = job_dir(job_id)
+        self.progress_value = 0
+        self.result_path: Optional[str] = None
+        self.result_filename: Optional[str] = None
+        self._last_write = 0.0
+
+    async def progress(self, done: int) -> None:
+        self.progress_value = done
+        now = time.monotonic()
+        if now - self._last_write >= PROGRESS_INTERVAL:
+            self._last_write = now
+            # El progreso es informativo: un fallo al guardarlo no debe abortar la tarea
+            try:
+                await _update(self.job_id, progress=done)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el progreso de la tarea {self.job_id}: {e}")
+
+    def set_result_file(self, path: str, filename: str) -> None:
+        self.result_path = path
+        self.result_filename = filename
+
+
+async def _update(job_id: str, **values) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+async def submit(kind: str, params: Dict[str, Any], created_by: Optional[str] = None,
+                 job_id: Optional[str] = None) -> Job:
+    """Guarda la tarea como 'queued' y la encola. Devuelve la fila creada."""
+    if kind not in _handlers:
+        raise ValueError(f"Tipo de tarea desconocido: {kind}")
+    if _queue is None:
+        raise RuntimeError("El ejecutor de tareas no está iniciado")
+    job = Job(
+        id=job_id or new_job_id(),
+        kind=kind,
+        status=QUEUED,
+        params=json.dumps(params, default=str),
+        progress=0,
+        created_by=created_by,
+    )
+    async with AsyncSessionLocal() as db:
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+    _queue.put_nowait(job.id)
+    return job
+
+
+async def get(job_id: str) -> Optional[Job]:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def recent(limit: int = 20) -> List[Job]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Job).order_by(Job.created_at.desc()).limit(limit))
+        return list(result.scalars())
+
+
+# --- Workers ---
+async def _run(job_id: str) -> None:
+    job = await get(job_id)
+    if job is None or job.status != QUEUED:
+        return
+    context = JobContext(job_id)
+    await _update(job_id, status=RUNNING, started_at=datetime.now(timezone.utc))
+    try:
+        result = await _handlers[job.kind](context, json.loads(job.params or "{}"))
+    except asyncio.CancelledError:
+        await _update(job_id, status=FAILED, error="Interrumpida al detener el servidor",
+                      finished_at=datetime.now(timezone.utc))
+        raise
+    except Exception as e:
+        logger.exception(f"Error en la tarea {job_id} ({job.kind}): {e}")
+        await _update(job_id, status=FAILED, error=str(getattr(e, "detail", None) or e),
+                      progress=context.progress_value, finished_at=datetime.now(timezone.utc))
+        return
+    await _update(
+        job_id,
+        status=SUCCEEDED,
+        progress=context.progress_value,
+        result=json.dumps(result, default=str) if result is not None else None,
+        result_path=context.result_path,
+        result_filename=context.result_filename,
+        finished_at=datetime.now(timezone.utc),
+    )
+
+
+async def _worker() -> None:
+    global _next_purge_at
+    while True:
+        # La espera tiene tope para que la limpieza periódica corra aunque no lleguen tareas
+        try:
+            job_id = await asyncio.wait_for(_queue.get(), timeout=max(_next_purge_at - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            job_id = None
+
+        if time.monotonic() >= _next_purge_at:
+            # Solo un worker por intervalo: el primero que llega adelanta la siguiente
+            _next_purge_at = time.monotonic() + settings.JOBS_PURGE_INTERVAL_SECONDS
+            try:
+                await _purge_expired()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error al limpiar tareas antiguas: {e}")
+
+        if job_id is None:
+            continue
+        try:
+            await _run(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Error inesperado ejecutando la tarea {job_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def _purge_expired() -> None:
+    """Borra las tareas terminadas hace más de JOBS_RETENTION_HOURS y sus archivos."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.JOBS_RETENTION_HOURS)
+    async with AsyncSessionLocal() as db:
+        expired = await db.execute(
+            select(Job.id).where(Job.status.in_([SUCCEEDED, FAILED]), Job.finished_at < cutoff)
+        )
+        expired_ids = list(expired.scalars())
+        if not expired_ids:
+            return
+        await db.execute(delete(Job).where(Job.id.in_(expired_ids)))
+        await db.commit()
+
+    for job_id in expired_ids:
+        shutil.rmtree(os.path.join(settings.JOBS_DIR, job_id), ignore_errors=True)
+    logger.info(f"Tareas antiguas eliminadas: {len(expired_ids)}")
+
+
+async def _recover() -> None:
+    """Retoma las tareas que quedaron pendientes en un arranque anterior."""
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Job).where(Job.status == RUNNING)
+            .values(status=FAILED, error="Interrumpida por un reinicio del servidor", finished_at=now)
+        )
+        queued = await db.execute(select(Job.id).where(Job.status == QUEUED).order_by(Job.created_at))
+        queued_ids = list(queued.scalars())
+        await db.commit()
+
+    for job_id in queued_ids:
+        _queue.put_nowait(job_id)
+    if queued_ids:
+        logger.info(f"Tareas pendientes reencoladas: {len(queued_ids)}")
+
+
+async def start() -> None:
+    global _queue, _next_purge_at
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    _queue = asyncio.Queue()
+    await _recover()
+    _next_purge_at = time.monotonic()  # primera limpieza nada más arrancar los workers
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(settings.JOBS_CONCURRENCY))
+    logger.info(f"Ejecutor de tareas iniciado con {settings.JOBS_CONCURRENCY} workers")
+
+
+async def stop() -> None:
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
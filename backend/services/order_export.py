@@ -0,0 +1,134 @@
+# backend/services/order_export.py
+"""
+Exportación de pedidos (una fila por item) en CSV o XLSX.
+
+Las filas se leen con un cursor del lado del servidor en bloques, así que la
+memoria no depende del número de pedidos. Solo el CSV se envía en streaming (el
+primer byte sale con el primer bloque). El XLSX es un ZIP que openpyxl guarda de
+una vez al final: se escribe entero en modo write-only sobre un archivo temporal y
+se envía después, así que su primer byte espera a la exportación completa. Para
+volúmenes grandes en XLSX está la tarea en segundo plano (/api/admin/jobs/export-orders).
+"""
+
+import asyncio
+import csv
+import io
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from openpyxl import Workbook
+from sqlalchemy import desc, select
+
+from core.database import AsyncSessionLocal
+from models.order import Order, OrderItem
+from models.product import Product
+from models.user import User
+
+EXPORT_COLUMNS = [
+    "ID Pedido", "Fecha", "Cliente", "Email Cliente", "Total Pedido", "Estado", "Dirección",
+    "Producto SKU", "Producto Nombre", "Cantidad", "Precio Unitario",
+]
+
+# Filas por bloque leídas del cursor (y por trozo de CSV enviado)
+STREAM_CHUNK = 500
+
+# Recibe el número de filas escritas hasta el momento
+Progress = Callable[[int], Awaitable[None]]
+
+CSV_MEDIA_TYPE = "text/csv"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _export_query(conditions: list):
+    # Solo columnas, sin entidades ORM: no hay identity map que crezca con el volumen
+    return (
+        select(
+            Order.id, Order.created_at, User.name, User.email, Order.total_amount, Order.status,
+            Order.shipping_address, OrderItem.id.label("item_id"), OrderItem.quantity,
+            Product.id.label("product_id"), Product.sku, Product.name.label("product_name"), Product.price,
+        )
+        .join(User, Order.user_id == User.id)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(*conditions)
+        .order_by(desc(Order.created_at), desc(Order.id), OrderItem.id)
+        .execution_options(yield_per=STREAM_CHUNK)
+    )
+
+
+def _to_row(r) -> list:
+    base = [
+        r.id, r.created_at.strftime("%Y-%m-%d %H:%M") if r.created_at else "", r.name, r.email,
+        float(r.total_amount), r.status.value, r.shipping_address,
+    ]
+    if r.item_id is None:
+        # Pedidos sin items (ej. pedidos fallidos)
+        return base + ["N/A", "N/A", 0, 0]
+    if r.product_id is None:
+        return base + ["N/A", "Producto Eliminado", r.quantity, 0.0]
+    return base + [r.sku, r.product_name, r.quantity, float(r.price)]
+
+
+async def has_orders(conditions: list) -> bool:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Order.id).join(User, Order.user_id == User.id).where(*conditions).limit(1)
+        )
+        return result.first() is not None
+
+
+async def iter_rows(conditions: list) -> AsyncIterator[List[list]]:
+    """
+    Bloques de filas de exportación leídos de un cursor del lado del servidor.
+    Usa su propia sesión porque normalmente se consume después de devolver la respuesta.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(_export_query(conditions))
+        async for partition in result.partitions():
+            yield [_to_row(r) for r in partition]
+
+
+async def stream_csv(conditions: list) -> AsyncIterator[bytes]:
+    # BOM para que Excel detecte UTF-8 al abrir el CSV
+    buffer = io.StringIO()
+    buffer.write("\ufeff")
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in iter_rows(conditions):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def write_csv(conditions: list, path: str, progress: Optional[Progress] = None) -> int:
+    """Escribe el CSV en `path` y devuelve las filas escritas."""
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        async for rows in iter_rows(conditions):
+            writer.writerows(rows)
+            written += len(rows)
+            if progress is not None:
+                await progress(written)
+    return written
+
+
+async def write_xlsx(conditions: list, path: str, progress: Optional[Progress] = None) -> int:
+    """
+    Escribe el XLSX en `path` y devuelve las filas escritas. El modo write-only acota la
+    memoria, pero el archivo solo está listo (y se puede empezar a enviar) al terminar.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Pedidos")
+    sheet.append(EXPORT_COLUMNS)
+    written = 0
+    async for rows in iter_rows(conditions):
+        for row in rows:
+            sheet.append(row)
+        written += len(rows)
+        if progress is not None:
+            await progress(written)
+    await asyncio.to_thread(workbook.save, path)
+    return written
@@ -0,0 +1,78 @@
+# backend/services/principal_cache.py
+"""
+Caché en proceso para la autenticación de `get_current_user`.
+
+- Payloads de JWT ya verificados, por token, hasta su `exp`.
+- Usuarios resueltos (sus columnas, no la instancia ORM), por `sub` (email), durante
+  PRINCIPAL_CACHE_TTL segundos. Cada petición recibe una instancia propia unida a su
+  sesión sin consultar la BD.
+
+Los cambios de usuario hechos desde admin deben llamar a `invalidate(email)` tras el
+commit. Con varias instancias la invalidación es local: el TTL acota cuánto tarda el
+resto en ver el cambio.
+"""
+
+import itertools
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from core.cache import TTLCache
+from core.config import settings
+from models.user import User
+
+_tokens = TTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+_principals = TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAXSIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+
+# Igual que en catalog_cache: un usuario leído antes de una invalidación no se guarda
+_versions = itertools.count(1)
+_version = next(_versions)
+
+
+def version() -> int:
+    return _version
+
+
+# --- Tokens ---
+def get_payload(token: str) -> Optional[Dict[str, Any]]:
+    return _tokens.get(token)
+
+
+def set_payload(token: str, payload: Dict[str, Any]) -> None:
+    exp = payload.get("exp")
+    if exp is None:
+        return
+    ttl = float(exp) - time.time()
+    if ttl > 0:
+        _tokens.set(token, payload, ttl=ttl)
+
+
+# --- Usuarios ---
+async def get_user(db: AsyncSession, email: str) -> Optional[User]:
+    """Usuario cacheado unido a `db` (sin emitir SQL), o None si no está en caché."""
+    values = _principals.get(email)
+    if values is None:
+        return None
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+def set_user(user: User, at_version: int) -> None:
+    if at_version != _version:
+        return
+    values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    _principals.set(user.email, values)
+
+
+def invalidate(email: Optional[str] = None) -> None:
+    """Olvida un usuario (o todos si no se indica). Llamar tras el commit del cambio."""
+    global _version
+    _version = next(_versions)
+    if email is None:
+        _principals.clear()
+    else:
+        _principals.pop(email)
@@ -0,0 +1,399 @@
+# backend/services/product_import.py
+"""
+Importación masiva de productos (Excel/CSV del proveedor).
+
+La limpieza y validación se hace por columnas con pandas, los productos existentes
+se resuelven con una sola consulta por bloque (por Nombre + Marca) y las escrituras
+van en sentencias por bloque: UPDATE con executemany para los existentes e
+INSERT multi-fila ... ON CONFLICT DO NOTHING para los nuevos. Las filas con
+problemas no abortan la importación: se devuelven en un informe por fila.
+
+El archivo se lee en bloques de tamaño fijo (ver iter_frames), así que la memoria
+máxima depende de IMPORT_BATCH_SIZE y no del tamaño del archivo.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from decimal import Decimal
+from typing import Awaitable, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.database import async_engine
+from models.product import Product
+from services.product_search import normalize
+
+logger = logging.getLogger(__name__)
+
+# Cabecera del archivo -> columna de products
+COLUMNS = {
+    "Nombre": "name",
+    "Marca": "brand",
+    "Categoria": "category",
+    "Precio": "price",
+    "Stock": "stock",
+    "Descripcion": "description",
+    "Slug": "slug",
+    "SKU": "sku",
+    "Image URL": "image_url",
+}
+TEXT_FIELDS = ("name", "brand", "category", "description", "slug", "sku", "image_url")
+MAX_LENGTHS = {"name": 255, "brand": 100, "category": 100, "slug": 255, "sku": 100, "image_url": 255}
+
+# Filas por sentencia de escritura / por consulta de prefetch
+CHUNK_SIZE = 1000
+# Errores devueltos como máximo en la respuesta (el contador sí es exacto)
+MAX_REPORTED_ERRORS = 500
+
+_products = Product.__table__
+
+
+def slugify(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", normalize(value)).strip("-")
+
+
+def _short_hash(*parts: str) -> str:
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def clean_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Normaliza un bloque del archivo, cuyo índice debe ser el número de fila en el archivo.
+    Devuelve (filas válidas, mensajes de error por número de fila).
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    df = df[[c for c in df.columns if c in COLUMNS]].rename(columns=COLUMNS)
+    df = df.reindex(columns=list(COLUMNS.values()))
+
+    for field in TEXT_FIELDS:
+        df[field] = df[field].astype("string").str.strip().replace("", pd.NA)
+
+    raw_price, raw_stock = df["price"], df["stock"]
+    df["price"] = pd.to_numeric(raw_price, errors="coerce")
+    df["stock"] = pd.to_numeric(raw_stock, errors="coerce")
+
+    # El primer problema encontrado por fila (orden de prioridad de np.select)
+    checks = [
+        (df["name"].isna(), "Falta Nombre"),
+        (df["brand"].isna(), "Falta Marca"),
+        (raw_price.notna() & df["price"].isna(), "Precio no numérico"),
+        (df["price"] < 0, "Precio negativo"),
+        (raw_stock.notna() & df["stock"].isna(), "Stock no numérico"),
+        (df["stock"].notna() & ((df["stock"] < 0) | (df["stock"] % 1 != 0)), "Stock debe ser un entero no negativo"),
+    ]
+    checks += [
+        (df[field].str.len() > max_length, f"{field} supera {max_length} caracteres")
+        for field, max_length in MAX_LENGTHS.items()
+    ]
+    masks = [mask.fillna(False).to_numpy(dtype=bool) for mask, _ in checks]
+    messages = pd.Series(np.select(masks, [message for _, message in checks], default=""), index=df.index)
+
+    valid = df[messages == ""]
+    duplicated = valid.duplicated(["name", "brand"], keep="last")
+    messages[duplicated[duplicated].index] = "Fila duplicada (Nombre + Marca); se usa la última"
+    valid = valid[~duplicated]
+    return valid, messages[messages != ""]
+
+
+def _canonical_number(value) -> str:
+    # 10, 10.0 y "10.00" dan lo mismo venga el valor de XLSX (int/float) o de CSV (texto)
+    if pd.isna(value):
+        return ""
+    text = format(Decimal(str(float(value))).normalize(), "f")
+    return "0" if text == "-0" else text
+
+
+def content_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    Huella de las columnas importadas de cada fila. Se guarda en products.content_hash
+    para saltarse las filas que no cambiaron desde la última importación.
+
+    Se calcula (sha256) sobre una representación canónica en texto de cada valor, en el
+    orden fijo de COLUMNS, y no sobre los dtypes de pandas: la misma fila debe dar la
+    misma huella tanto si llega en un XLSX como en un CSV.
+    """
+    canonical = []
+    for field in COLUMNS.values():
+        if field in TEXT_FIELDS:
+            canonical.append(df[field].astype("string").fillna("").tolist())
+        else:
+            canonical.append([_canonical_number(value) for value in df[field]])
+    digests = [
+        hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+        for values in zip(*canonical)
+    ]
+    return pd.Series(digests, index=df.index, dtype=object)
+
+
+def _records(df: pd.DataFrame) -> List[Dict]:
+    """Filas como dicts con None en lugar de NaN/NA, conservando el número de fila en `_row`."""
+    df = df.astype(object).where(df.notna(), None)
+    records = df.to_dict("records")
+    for row_number, record in zip(df.index, records):
+        record["_row"] = int(row_number)
+        if record["stock"] is not None:
+            record["stock"] = int(record["stock"])
+        if record["price"] is not None:
+            record["price"] = float(record["price"])
+    return records
+
+
+# --- Lectura por bloques ---
+def iter_frames(file: BinaryIO, filename: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Lee el archivo en bloques de `batch_size` filas sin cargarlo entero: XLSX con openpyxl
+    en modo read_only y CSV con el lector por chunks de pandas. El índice de cada bloque
+    es el número de fila en el archivo (la cabecera es la fila 1).
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        reader = pd.read_csv(file, dtype=str, chunksize=batch_size, skip_blank_lines=False)
+        for chunk in reader:
+            chunk.index = chunk.index + 2
+            yield chunk.dropna(how="all")
+        return
+    if extension not in (".xlsx", ".xlsm"):
+        # Formatos que openpyxl no lee en streaming (p. ej. .xls): lectura completa
+        df = pd.read_excel(file)
+        df.index = df.index + 2
+        for start in range(0, len(df), batch_size):
+            yield df.iloc[start:start + batch_size]
+        return
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else "" for c in header]
+        batch, numbers = [], []
+        for number, values in enumerate(rows, start=2):
+            if all(v is None for v in values):
+                continue
+            batch.append(values[:len(columns)])
+            numbers.append(number)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=columns, index=numbers)
+                batch, numbers = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=numbers)
+    finally:
+        workbook.close()
+
+
+async def import_file(
+    db: AsyncSession,
+    file: BinaryIO,
+    filename: str,
+    batch_size: int,
+    progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> "ProductImporter":
+    """
+    Importa el archivo bloque a bloque: la memoria usada depende del tamaño de bloque y
+    no del archivo. La lectura (síncrona) se hace en un hilo para no bloquear el loop.
+    `progress` recibe las filas leídas tras cada bloque.
+    """
+    importer = ProductImporter(db)
+    frames = iter_frames(file, filename, batch_size)
+    rows_read = 0
+    while (frame := await asyncio.to_thread(next, frames, None)) is not None:
+        await importer.process(frame)
+        rows_read += len(frame)
+        if progress is not None:
+            await progress(rows_read)
+    return importer
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ProductImporter:
+    """
+    Acumula el resultado de una importación. Se le pasan bloques (DataFrames) con
+    `process()`; el commit y la invalidación de caché corren a cargo del llamador.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.imported = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors: List[Dict] = []
+
+    def _error(self, row: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.imported or self.updated)
+
+    def summary(self) -> Dict:
+        return {
+            "success": True,
+            "imported": self.imported,      # productos nuevos
+            "updated": self.updated,        # existentes con cambios
+            "unchanged": self.unchanged,    # existentes idénticos a la última importación
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+        }
+
+    async def process(self, df: pd.DataFrame) -> None:
+        """Procesa un bloque cuyo índice es el número de fila en el archivo."""
+        valid, messages = clean_frame(df)
+        for row, message in messages.items():
+            self._error(int(row), message)
+        if valid.empty:
+            return
+
+        rows = _records(valid.assign(content_hash=content_hashes(valid)))
+        existing = await self._existing(rows)
+        to_update, to_insert = [], []
+        for row in rows:
+            match = existing.get((row["name"], row["brand"]))
+            if match is not None:
+                product_id, content_hash = match
+                if content_hash == row["content_hash"]:
+                    self.unchanged += 1
+                    continue
+                row["_id"] = product_id
+                to_update.append(row)
+            elif row["category"] is None or row["price"] is None:
+                self._error(row["_row"], "Faltan Categoria o Precio para crear el producto")
+            else:
+                to_insert.append(row)
+
+        for chunk in _chunks(to_update):
+            await self._update(chunk)
+        await self._assign_identifiers(to_insert)
+        to_insert = self._skip_repeated_identifiers(to_insert)
+        for chunk in _chunks(to_insert):
+            await self._insert(chunk)
+
+    async def _existing(self, rows: List[Dict]) -> Dict[Tuple[str, str], Tuple[int, Optional[str]]]:
+        """(Nombre, Marca) -> (id, content_hash) de los productos ya existentes."""
+        names = sorted({row["name"] for row in rows})
+        existing: Dict[Tuple[str, str], Tuple[int, Optional[str]]] = {}
+        for chunk in _chunks(names):
+            result = await self.db.execute(
+                select(Product.id, Product.name, Product.brand, Product.content_hash).where(Product.name.in_(chunk))
+            )
+            for product_id, name, brand, content_hash in result.all():
+                existing.setdefault((name, brand), (product_id, content_hash))
+        return existing
+
+    async def _assign_identifiers(self, rows: List[Dict]) -> None:
+        """Genera slug y SKU para los productos nuevos que no los traen."""
+        generated, taken = [], set()
+        for row in rows:
+            if row["slug"] is None:
+                row["slug"] = slugify(f"{row['name']} {row['brand']}") or _short_hash(row["name"], row["brand"])[:12]
+                generated.append(row)
+            else:
+                taken.add(row["slug"])
+            if row["sku"] is None:
+                row["sku"] = "IMP-" + _short_hash(row["brand"], row["name"])[:10].upper()
+
+        # Un slug generado puede coincidir con el de otro producto: se desambigua con un sufijo
+        for chunk in _chunks(sorted({row["slug"] for row in generated})):
+            result = await self.db.execute(select(Product.slug).where(Product.slug.in_(chunk)))
+            taken.update(result.scalars())
+        for row in generated:
+            if row["slug"] in taken:
+                row["slug"] = f"{row['slug']}-{_short_hash(row['name'], row['brand'])[:6]}"
+            taken.add(row["slug"])
+
+    def _skip_repeated_identifiers(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Un slug o SKU repetido entre las filas nuevas de un bloque haría que ON CONFLICT
+        DO NOTHING descartara la segunda sin que RETURNING lo delatara (devuelve el slug
+        una sola vez). Se queda la primera fila y las demás se reportan como error.
+        """
+        first_rows: Dict[Tuple[str, str], int] = {}
+        kept = []
+        for row in rows:
+            repeated = next(
+                ((label, first_rows[(field, row[field])]) for field, label in (("slug", "Slug"), ("sku", "SKU"))
+                 if (field, row[field]) in first_rows),
+                None,
+            )
+            if repeated is not None:
+                label, first_row = repeated
+                self._error(row["_row"], f"{label} repetido en el archivo (ya usado en la fila {first_row})")
+                continue
+            first_rows[("slug", row["slug"])] = row["_row"]
+            first_rows[("sku", row["sku"])] = row["_row"]
+            kept.append(row)
+        return kept
+
+    async def _update(self, rows: List[Dict]) -> None:
+        # Solo se sobrescriben las columnas que vienen informadas en el archivo
+        fields = [field for field in COLUMNS.values() if any(row[field] is not None for row in rows)]
+        statement = (
+            update(_products)
+            .where(_products.c.id == bindparam("_id"))
+            .values({
+                **{field: func.coalesce(bindparam(f"_{field}"), _products.c[field]) for field in fields},
+                "content_hash": bindparam("_content_hash"),
+            })
+        )
+        params = [
+            {"_id": row["_id"], "_content_hash": row["content_hash"], **{f"_{field}": row[field] for field in fields}}
+            for row in rows
+        ]
+        self.updated += await self._execute_chunk(statement, params, rows)
+
+    async def _insert(self, rows: List[Dict]) -> None:
+        dialect_insert = postgresql.insert if async_engine.dialect.name == "postgresql" else sqlite.insert
+        values = [{field: row[field] for field in (*COLUMNS.values(), "content_hash")} for row in rows]
+        for value in values:
+            # Sin columna Stock el producto nuevo entra con 0, como en el alta manual
+            if value["stock"] is None:
+                value["stock"] = 0
+        statement = (
+            dialect_insert(_products)
+            .values(values)
+            .on_conflict_do_nothing()
+            .returning(_products.c.slug)
+        )
+        result = await self.db.execute(statement)
+        inserted = set(result.scalars())
+        self.imported += len(inserted)
+        for row in rows:
+            if row["slug"] not in inserted:
+                self._error(row["_row"], "El Slug o SKU ya pertenece a otro producto")
+
+    async def _execute_chunk(self, statement, params: List[Dict], rows: List[Dict]) -> int:
+        """
+        Ejecuta el bloque en un savepoint y devuelve las filas aplicadas. Si choca con una
+        restricción única, repite fila a fila para aislar las que fallan.
+        """
+        try:
+            async with self.db.begin_nested():
+                await self.db.execute(statement, params)
+            return len(rows)
+        except IntegrityError:
+            pass
+        applied = 0
+        for param, row in zip(params, rows):
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(statement, [param])
+                applied += 1
+            except IntegrityError:
+                self._error(row["_row"], "El Slug o SKU ya pertenece a otro producto")
+        return applied
@@ -0,0 +1,255 @@
+# backend/services/product_search.py
+
+import asyncio
+import bisect
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import async_engine
+from models.product import Product as ProductModel
+from schemas.product import Product as ProductSchema
+from services import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada campo en el ranking (equivalente a setweight A/B/C/D en Postgres)
+FIELD_WEIGHTS = {"name": 3.0, "brand": 2.0, "category": 1.5, "description": 1.0}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# --- Búsqueda nativa en PostgreSQL (tsvector + pg_trgm) ---
+# El documento se escribe igual en el índice y en la consulta para que el planner use el GIN
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('spanish', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(brand, '')), 'B') || "
+    "setweight(to_tsvector('spanish', coalesce(category, '')), 'C') || "
+    "setweight(to_tsvector('spanish', coalesce(description, '')), 'D')"
+)
+
+_PG_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_products_search_document ON products USING gin (({_PG_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+]
+
+# Palabras de la búsqueda que se consideran (acota el tamaño de la consulta)
+MAX_QUERY_TOKENS = 8
+
+# "postgres" o "memory"; se decide en init_backend() al arrancar la app
+_backend = "memory"
+
+
+async def init_backend() -> str:
+    """
+    Elige el motor de búsqueda. Con PostgreSQL intenta crear pg_trgm y los índices
+    GIN; si no hay permisos o la BD no es Postgres, usa el índice invertido en memoria.
+    """
+    global _backend
+    if settings.SEARCH_BACKEND == "memory" or async_engine.dialect.name != "postgresql":
+        _backend = "memory"
+    else:
+        try:
+            async with async_engine.begin() as conn:
+                for statement in _PG_SETUP:
+                    await conn.execute(text(statement))
+            _backend = "postgres"
+        except Exception as e:
+            logger.warning(f"Búsqueda nativa de Postgres no disponible, se usa índice en memoria: {e}")
+            _backend = "memory"
+    logger.info(f"Motor de búsqueda de productos: {_backend}")
+    return _backend
+
+
+def normalize(value: Optional[str]) -> str:
+    """Minúsculas y sin acentos ("Proteína" -> "proteina")."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalize(value))
+
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    """Levenshtein acotado: corta en cuanto la fila mínima supera `max_distance`."""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return False
+        previous = current
+    return previous[-1] <= max_distance
+
+
+# --- Índice invertido en memoria ---
+class InvertedIndex:
+    """
+    Índice invertido sobre name/brand/category/description con ranking por peso de
+    campo, coincidencia por prefijo (autocompletado) y tolerancia a errores de tipeo.
+    """
+
+    EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+
+    def __init__(self, documents: List[Tuple[int, Dict[str, Optional[str]]]]):
+        """
+        `documents`: pares (id de producto, textos por campo a indexar). Solo guarda ids:
+        precio y stock se leen al devolver los resultados, así el índice no depende de ellos.
+        """
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for product_id, fields in documents:
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(fields.get(field)):
+                    postings = self.postings[token]
+                    postings[product_id] = postings.get(product_id, 0.0) + weight
+        self.vocabulary = sorted(self.postings)
+        self.trigram_index: Dict[str, set] = defaultdict(set)
+        for token in self.vocabulary:
+            for gram in _trigrams(token):
+                self.trigram_index[gram].add(token)
+
+    def _expand(self, token: str, allow_prefix: bool) -> Dict[str, float]:
+        """Términos del vocabulario que encajan con `token` y su factor de coincidencia."""
+        matches: Dict[str, float] = {}
+        if token in self.postings:
+            matches[token] = self.EXACT
+        if allow_prefix:
+            start = bisect.bisect_left(self.vocabulary, token)
+            for term in self.vocabulary[start:start + 50]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, self.PREFIX)
+        if not matches and len(token) >= 4:
+            max_distance = 1 if len(token) <= 6 else 2
+            candidates = set()
+            for gram in _trigrams(token):
+                candidates |= self.trigram_index.get(gram, set())
+            for term in candidates:
+                if _within_distance(token, term, max_distance):
+                    matches[term] = self.FUZZY
+        return matches
+
+    def search(self, query: str, limit: int) -> List[int]:
+        """Ids de producto ordenados por relevancia."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores: Dict[int, float] = defaultdict(float)
+        hits: Dict[int, int] = defaultdict(int)
+        for position, token in enumerate(tokens):
+            # El prefijo siempre aplica a la última palabra (la que el usuario sigue escribiendo);
+            # en las demás solo si tienen al menos 3 letras
+            expanded = self._expand(token, allow_prefix=position == len(tokens) - 1 or len(token) >= 3)
+            matched = set()
+            for term, factor in expanded.items():
+                for product_id, weight in self.postings[term].items():
+                    scores[product_id] += weight * factor
+                    matched.add(product_id)
+            for product_id in matched:
+                hits[product_id] += 1
+
+        # Primero los que coinciden con todas las palabras; después el resto por puntuación
+        ranked = sorted(scores, key=lambda pid: (-hits[pid], -scores[pid], pid))
+        return ranked[:limit]
+
+
+_index: Optional[InvertedIndex] = None
+_index_version: Optional[int] = None
+_index_lock = asyncio.Lock()
+
+
+async def _get_memory_index(db: AsyncSession) -> InvertedIndex:
+    """
+    Reconstruye el índice cuando cambia la versión del catálogo en la BD (catalog_cache.sync),
+    así también ve las ediciones hechas en otros workers; el stock no la cambia.
+    """
+    global _index, _index_version
+    catalog_version = await catalog_cache.sync(db)
+    if _index is not None and _index_version == catalog_version:
+        return _index
+    async with _index_lock:
+        if _index is None or _index_version != catalog_version:
+            result = await db.execute(
+                select(ProductModel.id, *(getattr(ProductModel, field) for field in FIELD_WEIGHTS))
+                .where(ProductModel.is_active.isnot(False))
+            )
+            documents = [(row.id, {field: getattr(row, field) for field in FIELD_WEIGHTS}) for row in result]
+            _index = InvertedIndex(documents)
+            _index_version = catalog_version
+            logger.info(f"Índice de búsqueda reconstruido: {len(documents)} productos")
+    return _index
+
+
+async def _load_ranked(db: AsyncSession, ids: List[int]) -> List[Dict]:
+    """Productos activos con los ids dados, en el mismo orden."""
+    if not ids:
+        return []
+    result = await db.execute(
+        select(ProductModel).where(ProductModel.id.in_(ids), ProductModel.is_active.isnot(False))
+    )
+    by_id = {p.id: ProductSchema.model_validate(p).model_dump() for p in result.scalars()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def _pg_search_statement(tokens: List[str]):
+    """
+    Cada palabra debe encajar con el documento (prefijo, vía tsvector) o, si tiene un error
+    de tipeo, con alguna palabra del nombre (pg_trgm `<%`, similitud por palabra). Así una
+    errata en una sola palabra de la búsqueda no descarta el producto.
+    """
+    conditions, similarity, params = [], [], {}
+    for i, token in enumerate(tokens):
+        params[f"tsquery_{i}"] = f"{token}:*"
+        params[f"token_{i}"] = token
+        # numnode = 0: palabra vacía para el diccionario (p. ej. "de"), no filtra
+        conditions.append(
+            f"(numnode(to_tsquery('spanish', :tsquery_{i})) = 0"
+            f" OR ({_PG_DOCUMENT}) @@ to_tsquery('spanish', :tsquery_{i})"
+            f" OR :token_{i} <% name)"
+        )
+        similarity.append(f"word_similarity(:token_{i}, name)")
+    params["tsquery_any"] = " | ".join(params[f"tsquery_{i}"] for i in range(len(tokens)))
+    statement = text(f"""
+        SELECT id,
+               ts_rank({_PG_DOCUMENT}, to_tsquery('spanish', :tsquery_any)) + ({" + ".join(similarity)}) AS rank
+        FROM products
+        WHERE is_active IS NOT FALSE
+          AND {" AND ".join(conditions)}
+        ORDER BY rank DESC, id
+        LIMIT :limit
+    """)
+    return statement, params
+
+
+async def _search_postgres(db: AsyncSession, query: str, limit: int) -> List[Dict]:
+    tokens = [re.sub(r"[^\w]", "", t) for t in query.split()]
+    tokens = [t for t in tokens if t][:MAX_QUERY_TOKENS]
+    if not tokens:
+        return []
+    statement, params = _pg_search_statement(tokens)
+    rows = (await db.execute(statement, {**params, "limit": limit})).all()
+    return await _load_ranked(db, [row.id for row in rows])
+
+
+async def search_products(db: AsyncSession, query: str, limit: int) -> List[Dict]:
+    if _backend == "postgres":
+        return await _search_postgres(db, query, limit)
+    index = await _get_memory_index(db)
+    return await _load_ranked(db, index.search(query, limit))
@@ -0,0 +1,148 @@
+# backend/services/sales_analytics.py
+"""
+Series temporales de ventas para rangos arbitrarios, leídas de los rollups diarios
+(ver services/sales_rollup.py). El relleno de huecos y el reagrupado por semana/mes
+se hacen vectorizados con pandas, sin una consulta por intervalo.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import TTLCache
+from models.analytics import DailySalesRollup, DailyProductSalesRollup
+from models.product import Product
+from services.sales_rollup import INCOME_STATUSES
+
+# Frecuencias de pandas por granularidad (semanas de lunes a domingo, meses naturales)
+GRANULARITY_FREQ = {"day": "D", "week": "W-MON", "month": "MS"}
+
+GROUP_COLUMNS = {
+    "category": Product.category,
+    "brand": Product.brand,
+    "product": Product.name,
+}
+
+OTHERS_LABEL = "Otros"
+
+# Los rollups solo cambian con pedidos nuevos o cambios de estado: un TTL corto basta
+_cache = TTLCache(maxsize=256, ttl=60)
+
+
+async def _load_totals(db: AsyncSession, date_from: date, date_to: date) -> pd.DataFrame:
+    income = [s.value for s in INCOME_STATUSES]
+    result = await db.execute(
+        select(
+            DailySalesRollup.day,
+            func.sum(DailySalesRollup.gross_amount).label("revenue"),
+            func.sum(DailySalesRollup.orders_count).label("orders"),
+        )
+        .where(DailySalesRollup.day.between(date_from, date_to), DailySalesRollup.status.in_(income))
+        .group_by(DailySalesRollup.day)
+    )
+    df = pd.DataFrame(result.all(), columns=["day", "revenue", "orders"])
+    df["key"] = "total"
+    return df
+
+
+async def _load_grouped(db: AsyncSession, date_from: date, date_to: date, group_by: str) -> pd.DataFrame:
+    income = [s.value for s in INCOME_STATUSES]
+    key = func.coalesce(GROUP_COLUMNS[group_by], "Sin asignar").label("key")
+    result = await db.execute(
+        select(
+            DailyProductSalesRollup.day,
+            key,
+            func.sum(DailyProductSalesRollup.revenue).label("revenue"),
+            func.sum(DailyProductSalesRollup.units).label("units"),
+        )
+        .outerjoin(Product, Product.id == DailyProductSalesRollup.product_id)
+        .where(DailyProductSalesRollup.day.between(date_from, date_to), DailyProductSalesRollup.status.in_(income))
+        .group_by(DailyProductSalesRollup.day, key)
+    )
+    return pd.DataFrame(result.all(), columns=["day", "key", "revenue", "units"])
+
+
+def _to_series(
+    df: pd.DataFrame, date_from: date, date_to: date, freq: str, top: int, default_keys: Tuple[str, ...] = ()
+) -> List[Dict]:
+    """Pivotea (día x clave), rellena los días sin ventas con 0 y reagrupa por periodo."""
+    metrics = [c for c in df.columns if c not in ("day", "key")]
+    df = df.astype({metric: float for metric in metrics})
+
+    # Solo las `top` claves con más ingresos; el resto se agrupa en "Otros"
+    keys = list(df.groupby("key")["revenue"].sum().sort_values(ascending=False).index) or list(default_keys)
+    if len(keys) > top:
+        keys = keys[:top]
+        df = df.assign(key=df["key"].where(df["key"].isin(keys), OTHERS_LABEL))
+        keys.append(OTHERS_LABEL)
+
+    days = pd.date_range(date_from, date_to, freq="D")
+    grid = (
+        df.assign(day=pd.to_datetime(df["day"]))
+        .pivot_table(index="day", columns="key", values=metrics, aggfunc="sum")
+        .reindex(index=days, columns=pd.MultiIndex.from_product([metrics, keys]))
+        .fillna(0.0)
+    )
+    if freq != "D":
+        grid = grid.resample(freq, label="left", closed="left").sum()
+
+    periods = [ts.date().isoformat() for ts in grid.index]
+    series = []
+    for key in keys:
+        values = {metric: grid[(metric, key)].to_numpy() for metric in metrics}
+        series.append({
+            "key": key,
+            "totals": {metric: round(float(values[metric].sum()), 2) for metric in metrics},
+            "points": [
+                {"period": period, **{metric: round(float(values[metric][i]), 2) for metric in metrics}}
+                for i, period in enumerate(periods)
+            ],
+        })
+    return series
+
+
+async def sales_timeseries(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    granularity: str = "day",
+    group_by: Optional[str] = None,
+    compare_previous_year: bool = False,
+    top: int = 10,
+) -> Dict:
+    cache_key = (date_from, date_to, granularity, group_by, compare_previous_year, top)
+    cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    freq = GRANULARITY_FREQ[granularity]
+
+    async def build(start: date, end: date) -> List[Dict]:
+        if group_by:
+            df = await _load_grouped(db, start, end, group_by)
+        else:
+            df = await _load_totals(db, start, end)
+        return _to_series(df, start, end, freq, top, default_keys=() if group_by else ("total",))
+
+    payload = {
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "granularity": granularity,
+        "group_by": group_by,
+        "series": await build(date_from, date_to),
+    }
+    if compare_previous_year:
+        offset = pd.DateOffset(years=1)
+        prev_from = (pd.Timestamp(date_from) - offset).date()
+        prev_to = (pd.Timestamp(date_to) - offset).date()
+        payload["previous_year"] = {
+            "from": prev_from.isoformat(),
+            "to": prev_to.isoformat(),
+            "series": await build(prev_from, prev_to),
+        }
+
+    _cache.set(cache_key, payload)
+    return payload
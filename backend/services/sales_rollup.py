@@ -0,0 +1,232 @@
+# backend/services/sales_rollup.py
+"""
+Rollups diarios de ventas mantenidos en la misma transacción que los pedidos.
+
+Cada pedido cuenta en el cubo (día, estado) de su día de creación (UTC); al cambiar
+de estado se mueve de cubo, así los ingresos (estados COMPLETADO/ENVIADO) siempre
+cuadran con la tabla de pedidos. Cada cubo está repartido en SALES_ROLLUP_SHARDS filas
+(ver models/analytics.py). Si están vacíos y ya hay pedidos se rellenan solos al
+arrancar (`backfill_if_empty`); para reconstruir un rango a mano:
+
+    python -m services.sales_rollup rebuild [--from 2024-01-01] [--to 2024-12-31]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Date, String, cast, delete, func, insert, literal, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import async_engine
+from models.analytics import DailySalesRollup, DailyProductSalesRollup
+from models.order import Order, OrderItem, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+INCOME_STATUSES = (OrderStatus.COMPLETADO, OrderStatus.ENVIADO)
+
+
+def order_day(created_at: datetime) -> date:
+    """Día UTC al que pertenece un pedido."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _order_day_sql():
+    # Debe coincidir con order_day(): fecha en UTC independientemente de la zona de la sesión
+    if async_engine.dialect.name == "postgresql":
+        return cast(func.timezone("UTC", Order.created_at), Date)
+    return func.date(Order.created_at)
+
+
+def _upsert(model, rows: list, key_columns: Tuple[str, ...], sum_columns: Tuple[str, ...]):
+    """INSERT ... ON CONFLICT DO UPDATE que suma los valores sobre la fila existente."""
+    dialect_insert = postgresql.insert if async_engine.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(model).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={column: getattr(model, column) + getattr(statement.excluded, column) for column in sum_columns},
+    )
+
+
+async def _apply(
+    db: AsyncSession,
+    day: date,
+    shard: int,
+    changes: Iterable[Tuple[OrderStatus, int]],
+    total_amount: float,
+    lines: Dict[int, Tuple[int, float]],
+) -> None:
+    """
+    Suma (sign=1) o resta (sign=-1) un pedido en los cubos de `day` para cada
+    (estado, sign) de `changes`.
+
+    Las filas se bloquean siempre en el mismo orden (primero los totales y luego los
+    productos, ordenados por estado y product_id), sea un pedido nuevo o un cambio de
+    estado, para que dos transacciones no se esperen en orden cruzado (deadlock).
+    """
+    changes = sorted(changes, key=lambda change: change[0].value)
+    await db.execute(_upsert(
+        DailySalesRollup,
+        [
+            {"day": day, "status": status.value, "shard": shard,
+             "orders_count": sign, "gross_amount": sign * total_amount}
+            for status, sign in changes
+        ],
+        ("day", "status", "shard"),
+        ("orders_count", "gross_amount"),
+    ))
+    if lines:
+        await db.execute(_upsert(
+            DailyProductSalesRollup,
+            [
+                {"day": day, "product_id": product_id, "status": status.value, "shard": shard,
+                 "units": sign * units, "revenue": sign * revenue}
+                for product_id, (units, revenue) in sorted(lines.items())
+                for status, sign in changes
+            ],
+            ("day", "product_id", "status", "shard"),
+            ("units", "revenue"),
+        ))
+
+
+def _shard(order: Order) -> int:
+    return order.id % max(settings.SALES_ROLLUP_SHARDS, 1)
+
+
+def _group_lines(items: Iterable[Tuple[int, int, float]]) -> Dict[int, Tuple[int, float]]:
+    lines: Dict[int, Tuple[int, float]] = {}
+    for product_id, quantity, line_total in items:
+        units, revenue = lines.get(product_id, (0, 0.0))
+        lines[product_id] = (units + quantity, revenue + line_total)
+    return lines
+
+
+async def record_new_order(db: AsyncSession, order: Order, items: Iterable[Tuple[int, int, float]]) -> None:
+    """
+    Registra un pedido recién creado. `items` son tuplas (product_id, quantity, line_total).
+    Llamar antes del commit del pedido, con `order.id` y `order.created_at` ya cargados.
+    """
+    await _apply(
+        db, order_day(order.created_at), _shard(order), [(order.status, 1)], order.total_amount, _group_lines(items)
+    )
+
+
+async def record_status_change(db: AsyncSession, order: Order, old_status: OrderStatus, new_status: OrderStatus) -> None:
+    """Mueve el pedido del cubo del estado anterior al del nuevo. Llamar antes del commit."""
+    if old_status == new_status:
+        return
+    result = await db.execute(
+        select(OrderItem.product_id, OrderItem.quantity, OrderItem.line_total).where(OrderItem.order_id == order.id)
+    )
+    await _apply(
+        db,
+        order_day(order.created_at),
+        _shard(order),
+        [(old_status, -1), (new_status, 1)],
+        order.total_amount,
+        _group_lines(result.all()),
+    )
+
+
+async def _lock_rollups(db: AsyncSession) -> None:
+    # Hasta el commit los checkouts esperan: ni cuentan dos veces un pedido que la
+    # reconstrucción ya incluye ni dos reconstrucciones se pisan
+    if async_engine.dialect.name == "postgresql":
+        await db.execute(text(
+            f"LOCK TABLE {DailySalesRollup.__tablename__}, {DailyProductSalesRollup.__tablename__} IN EXCLUSIVE MODE"
+        ))
+
+
+async def rebuild(db: AsyncSession, date_from: Optional[date] = None, date_to: Optional[date] = None) -> None:
+    """Recalcula los rollups desde orders/order_items para el rango [date_from, date_to]."""
+    await _lock_rollups(db)
+    day = _order_day_sql()
+    order_range = []
+    if date_from:
+        order_range.append(day >= date_from)
+    if date_to:
+        order_range.append(day <= date_to)
+
+    for model in (DailySalesRollup, DailyProductSalesRollup):
+        statement = delete(model)
+        if date_from:
+            statement = statement.where(model.day >= date_from)
+        if date_to:
+            statement = statement.where(model.day <= date_to)
+        await db.execute(statement)
+
+    # En los rollups el estado se guarda como texto (el valor del Enum)
+    status = cast(Order.status, String(20))
+    orders_by_day = (
+        select(day.label("day"), status, literal(0), func.count(Order.id), func.sum(Order.total_amount))
+        .where(*order_range)
+        .group_by(day, Order.status)
+    )
+    await db.execute(insert(DailySalesRollup).from_select(
+        ["day", "status", "shard", "orders_count", "gross_amount"], orders_by_day
+    ))
+
+    products_by_day = (
+        select(day.label("day"), OrderItem.product_id, status, literal(0),
+               func.sum(OrderItem.quantity), func.sum(OrderItem.line_total))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(*order_range)
+        .group_by(day, OrderItem.product_id, Order.status)
+    )
+    await db.execute(insert(DailyProductSalesRollup).from_select(
+        ["day", "product_id", "status", "shard", "units", "revenue"], products_by_day
+    ))
+
+
+async def backfill_if_empty() -> bool:
+    """
+    Reconstruye los rollups si están vacíos pero ya hay pedidos (primer despliegue o
+    tablas recreadas), para que el dashboard no arranque en cero. Se llama al iniciar.
+    """
+    from core.database import AsyncSessionLocal
+
+    async def needs_backfill(db: AsyncSession) -> bool:
+        has_rollups = await db.scalar(select(DailySalesRollup.day).limit(1))
+        return has_rollups is None and await db.scalar(select(Order.id).limit(1)) is not None
+
+    async with AsyncSessionLocal() as db:
+        if not await needs_backfill(db):
+            return False
+        await _lock_rollups(db)
+        # Otro proceso pudo rellenarlos mientras se esperaba el bloqueo
+        if not await needs_backfill(db):
+            await db.rollback()
+            return False
+        await rebuild(db)
+        await db.commit()
+    logger.info("Rollups de ventas vacíos: reconstruidos desde los pedidos existentes")
+    return True
+
+
+async def _main() -> None:
+    from core.database import AsyncSessionLocal, create_tables
+
+    parser = argparse.ArgumentParser(description="Mantenimiento de rollups de ventas")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    await create_tables()
+    async with AsyncSessionLocal() as db:
+        await rebuild(db, args.date_from, args.date_to)
+        await db.commit()
+    logger.info(f"Rollups reconstruidos ({args.date_from or 'inicio'} - {args.date_to or 'hoy'})")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
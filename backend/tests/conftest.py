@@ -0,0 +1,237 @@
+# backend/tests/conftest.py
+"""
+Configuración común de las pruebas.
+
+Se usa una BD SQLite temporal (aiosqlite) en lugar de Postgres: las variables de
+entorno se fijan antes de importar la app, así nunca se toca la BD del .env.
+Ejecutar desde backend/:
+
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event, select, update
+
+_TMP_DIR = tempfile.mkdtemp(prefix="ecommerce-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite+aiosqlite:///{_TMP_DIR}/test.db",
+    JOBS_DIR=os.path.join(_TMP_DIR, "jobs"),
+    EMAIL_TRANSPORT="console",
+    IMAGE_STORAGE="local",
+    SEARCH_BACKEND="memory",
+    RATE_LIMIT_ENABLED="false",
+    SQL_METRICS_LOG_REQUESTS="false",
+)
+for name, value in {
+    "SECRET_KEY": "test-secret-key-with-at-least-32-chars",
+    "FRONTEND_URL": "http://localhost:5173",
+    "GOOGLE_CLIENT_ID": "test-client-id",
+    "GOOGLE_CLIENT_SECRET": "test-client-secret",
+    "GOOGLE_REDIRECT_URI": "http://localhost:5173/auth/google",
+    "FROM_EMAIL": "tienda@example.com",
+    "CLOUDINARY_CLOUD_NAME": "test",
+    "CLOUDINARY_API_KEY": "test",
+    "CLOUDINARY_API_SECRET": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import AsyncSessionLocal, Base, async_engine, create_tables  # noqa: E402
+from core.security import create_access_token  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.user import User  # noqa: E402
+from services import catalog_cache, idempotency, principal_cache, product_search, sales_analytics  # noqa: E402
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _sqlite_functions(dbapi_connection, connection_record):
+    # models/product.py usa now() de Postgres en sus valores por defecto
+    dbapi_connection.create_function(
+        "now", 0, lambda: datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    )
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def _reset_database():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await create_tables()
+    await async_engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """BD vacía y cachés en memoria limpias en cada prueba."""
+    asyncio.run(_reset_database())
+    catalog_cache.invalidate()
+    principal_cache.invalidate()
+    product_search._index = None
+    idempotency._inflight.clear()
+    sales_analytics._cache.clear()
+    yield
+    # Cada prueba corre en su propio event loop: las conexiones no se reutilizan entre ellas
+    asyncio.run(async_engine.dispose())
+
+
+_portal = None
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    global _portal
+    with TestClient(main.app) as test_client:
+        _portal = test_client.portal
+        try:
+            yield test_client
+            # Cierra las conexiones en el loop de la app, que desaparece al salir
+            test_client.portal.call(async_engine.dispose)
+        finally:
+            _portal = None
+
+
+def run(coroutine):
+    """
+    Ejecuta una corrutina de la prueba (semillas y comprobaciones en la BD). Con la app
+    arrancada se usa su event loop: el pool de conexiones no se comparte entre loops.
+    """
+    async def wrapper():
+        return await coroutine
+
+    if _portal is not None:
+        return _portal.call(wrapper)
+
+    async def standalone():
+        try:
+            return await coroutine
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(standalone())
+
+
+async def add_all(*instances):
+    async with AsyncSessionLocal() as db:
+        db.add_all(instances)
+        await db.commit()
+    return instances
+
+
+def make_user(email: str = "cliente@example.com", name: str = "Cliente") -> User:
+    (user,) = run(add_all(User(email=email, name=name, hashed_password="!")))
+    return user
+
+
+def make_products(*specs) -> list:
+    """`specs`: dicts con los campos que difieren de un producto de ejemplo."""
+    products = []
+    for number, spec in enumerate(specs):
+        fields = {"name": f"Producto {number}", "slug": f"producto-{number}", "sku": f"SKU-{number}",
+                  "category": "Proteínas", "brand": "Marca", "price": 100.0, "stock": 10, **spec}
+        products.append(Product(**fields))
+    return list(run(add_all(*products)))
+
+
+def auth_headers(email: str = "cliente@example.com") -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def admin_headers() -> dict:
+    token = create_access_token({"sub": "admin@example.com", "role": "ADMIN", "is_admin": True})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def order_payload(*items, shipping_cost: float = 50.0) -> dict:
+    """Cuerpo de POST /api/orders/ para los pares (product_id, quantity) dados."""
+    return {
+        "payment_method": "tarjeta",
+        "shipping_address": "Calle 1, Ciudad",
+        "shipping_type": "estandar",
+        "shipping_cost": shipping_cost,
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items],
+    }
+
+
+async def product_stock() -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Product.id, Product.stock))
+        return dict(result.all())
+
+
+@contextmanager
+def count_queries():
+    """Lista de las sentencias SQL ejecutadas dentro del bloque."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def change_in_other_worker(product_id: int, **values):
+    """Escritura hecha por otro proceso: sube la versión en la BD pero no toca nuestra caché."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Product).where(Product.id == product_id).values(**values))
+        await catalog_cache.bump(db)
+        await db.commit()
+
+
+def wait_for_job(client, job_id: str, timeout: float = 10.0) -> dict:
+    """Consulta la tarea hasta que termina (los workers corren en el loop de la app)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/admin/jobs/{job_id}", headers=admin_headers()).json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def make_order(user: User, created_at: datetime, *items, status=None, number: str = None):
+    """
+    Pedido insertado directamente (sin checkout ni rollups) con fecha fija: `items` son
+    pares (producto, cantidad). En SQLite las fechas de server_default no llevan
+    microsegundos y no se comparan bien con las de los cursores.
+    """
+    from models.order import Order, OrderItem, OrderStatus
+
+    async def create():
+        async with AsyncSessionLocal() as db:
+            order = Order(
+                user_id=user.id,
+                order_number=number or f"GN-{created_at:%m%d%H%M%S}",
+                status=status or OrderStatus.PENDING,
+                total_amount=sum(product.price * quantity for product, quantity in items),
+                shipping_address="Calle 1, Ciudad",
+                payment_method="tarjeta",
+                created_at=created_at,
+            )
+            db.add(order)
+            await db.flush()
+            db.add_all([
+                OrderItem(order_id=order.id, product_id=product.id, product_name=product.name,
+                          product_price=product.price, quantity=quantity, line_total=product.price * quantity)
+                for product, quantity in items
+            ])
+            await db.commit()
+            return order
+    return run(create())
@@ -0,0 +1,81 @@
+# backend/tests/test_admin_orders.py
+
+import json
+from datetime import datetime
+
+from conftest import admin_headers, auth_headers, make_order, make_products, make_user
+from models.order import OrderStatus
+
+
+def _seed():
+    ana = make_user("ana@example.com", "Ana")
+    luis = make_user("luis@example.com", "Luis")
+    creatina, whey = make_products({"name": "Creatina", "price": 10.0}, {"name": "Whey", "price": 25.0})
+    orders = [
+        make_order(ana, datetime(2026, 5, 1, 10), (creatina, 1), number="GN-AAA001"),
+        make_order(luis, datetime(2026, 5, 2, 10), (whey, 2), status=OrderStatus.ENVIADO, number="GN-AAA002"),
+        make_order(ana, datetime(2026, 5, 3, 10), (creatina, 2), (whey, 1), number="GN-AAA003"),
+        make_order(ana, datetime(2026, 5, 3, 10), (whey, 1), number="GN-AAA004"),
+    ]
+    return [order.id for order in orders]
+
+
+def _numbers(response) -> list:
+    return [order["order_number"] for order in response.json()]
+
+
+def test_orders_page_newest_first_with_items(client):
+    _seed()
+
+    response = client.get("/api/admin/orders", params={"limit": 10}, headers=admin_headers())
+
+    assert response.status_code == 200
+    # Misma fecha: desempata el id (el más reciente primero)
+    assert _numbers(response) == ["GN-AAA004", "GN-AAA003", "GN-AAA002", "GN-AAA001"]
+    third = response.json()[1]
+    assert third["user"] == {"name": "Ana", "email": "ana@example.com"}
+    assert [(item["product_name"], item["quantity"]) for item in third["items"]] == [("Creatina", 2), ("Whey", 1)]
+    assert "x-next-cursor" not in response.headers
+
+
+def test_orders_cursor_walks_every_order_once(client):
+    _seed()
+    numbers, cursor = [], None
+    while True:
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/admin/orders", params=params, headers=admin_headers())
+        numbers += _numbers(response)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert numbers == ["GN-AAA004", "GN-AAA003", "GN-AAA002", "GN-AAA001"]
+
+
+def test_orders_filters(client):
+    _seed()
+
+    def numbers(**params):
+        return _numbers(client.get("/api/admin/orders", params=params, headers=admin_headers()))
+
+    assert numbers(status="enviado") == ["GN-AAA002"]
+    assert numbers(email=" LUIS@example.com ") == ["GN-AAA002"]
+    assert numbers(order_number="gn-aaa001") == ["GN-AAA001"]
+    assert numbers(date_from="2026-05-02T00:00:00", date_to="2026-05-03T00:00:00") == ["GN-AAA002"]
+    assert client.get("/api/admin/orders", params={"status": "perdido"}, headers=admin_headers()).status_code == 400
+
+
+def test_orders_ndjson_streams_every_order(client):
+    _seed()
+
+    response = client.get("/api/admin/orders", params={"format": "ndjson", "limit": 1}, headers=admin_headers())
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    # Ignora limit: un pedido por línea con todos sus items
+    assert [order["order_number"] for order in orders] == ["GN-AAA004", "GN-AAA003", "GN-AAA002", "GN-AAA001"]
+    assert [len(order["items"]) for order in orders] == [1, 2, 1, 1]
+
+
+def test_orders_require_admin(client):
+    assert client.get("/api/admin/orders", headers=auth_headers()).status_code == 401
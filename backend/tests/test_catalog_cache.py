@@ -0,0 +1,84 @@
+# backend/tests/test_catalog_cache.py
+
+from conftest import admin_headers, change_in_other_worker, count_queries, make_products, run
+from core.config import settings
+from services import catalog_cache
+
+
+def test_list_answers_304_from_memory(client):
+    make_products({"name": "Creatina"}, {"name": "Glutamina"})
+    first = client.get("/api/products/")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+    with count_queries() as statements:
+        response = client.get("/api/products/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert statements == []
+
+
+def test_etag_depends_on_content_not_on_the_process(client):
+    make_products({"name": "Creatina"})
+    etag = client.get("/api/products/").headers["etag"]
+
+    # Otro worker (caché vacía) calcula el mismo ETag para el mismo contenido
+    catalog_cache.invalidate()
+    response = client.get("/api/products/", headers={"If-None-Match": f'W/{etag}, "otro"'})
+
+    assert response.status_code == 304
+    # Cada página tiene el suyo
+    assert client.get("/api/products/", params={"limit": 1, "category": "Otra"}).headers["etag"] != etag
+
+
+def test_list_etag_changes_after_an_edit(client):
+    (product,) = make_products({"name": "Creatina"})
+    etag = client.get("/api/products/").headers["etag"]
+
+    response = client.put(f"/api/admin/products/{product.id}", json={"price": 150.0}, headers=admin_headers())
+    assert response.status_code == 200
+
+    response = client.get("/api/products/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["price"] == 150.0
+
+
+def test_detail_etag_and_if_none_match(client):
+    product, other = make_products({"name": "Creatina"}, {"name": "Glutamina"})
+    first = client.get(f"/api/products/{product.id}")
+    etag = first.headers["etag"]
+
+    assert client.get(f"/api/products/{product.id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/products/{product.id}", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get(f"/api/products/{other.id}", headers={"If-None-Match": etag}).status_code == 200
+    # '*' no vale para un recurso que no existe
+    assert client.get("/api/products/999", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_change_in_other_worker_is_seen_after_the_version_check(client, monkeypatch):
+    (product,) = make_products({"name": "Creatina", "price": 100.0})
+    etag = client.get(f"/api/products/{product.id}").headers["etag"]
+
+    run(change_in_other_worker(product.id, price=120.0))
+
+    # Dentro de CATALOG_VERSION_TTL se sigue sirviendo la copia en memoria
+    assert client.get(f"/api/products/{product.id}", headers={"If-None-Match": etag}).status_code == 304
+
+    monkeypatch.setattr(settings, "CATALOG_VERSION_TTL", 0)
+    response = client.get(f"/api/products/{product.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == 120.0
+
+
+def test_version_check_is_a_single_primary_key_read(client, monkeypatch):
+    make_products({"name": "Creatina"})
+    etag = client.get("/api/products/").headers["etag"]
+    monkeypatch.setattr(settings, "CATALOG_VERSION_TTL", 0)
+
+    with count_queries() as statements:
+        response = client.get("/api/products/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert len(statements) == 1 and "catalog_version" in statements[0]
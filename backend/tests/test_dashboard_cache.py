@@ -0,0 +1,148 @@
+# backend/tests/test_dashboard_cache.py
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from conftest import admin_headers, count_queries, make_order, make_products, make_user
+from core import cache
+from core.cache import StaleWhileRevalidate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake.monotonic)
+    return fake
+
+
+class Loader:
+    """Devuelve 1, 2, 3... en cada carga; puede fallar o quedarse esperando a `release`."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("BD no disponible")
+        return self.calls
+
+
+@pytest.mark.anyio
+async def test_fresh_value_is_reused_within_ttl(clock):
+    loader = Loader()
+    swr = StaleWhileRevalidate(loader, ttl=15, max_stale=300)
+
+    first, meta = await swr.get()
+    clock.now += 14
+    again, meta_again = await swr.get()
+
+    assert (first, again, loader.calls) == (1, 1, 1)
+    assert meta["stale"] is False and meta_again["age_seconds"] == 14
+
+
+@pytest.mark.anyio
+async def test_stale_value_is_served_while_one_refresh_runs(clock):
+    loader = Loader()
+    swr = StaleWhileRevalidate(loader, ttl=15, max_stale=300)
+    await swr.get()
+    clock.now += 20
+    loader.release.clear()
+
+    # Varias peticiones con el valor caducado: responden ya y comparten una sola recarga
+    results = [await swr.get() for _ in range(3)]
+    assert [value for value, _ in results] == [1, 1, 1]
+    assert all(meta["stale"] for _, meta in results)
+    await asyncio.sleep(0)
+    await swr.get()
+    assert loader.calls == 2
+
+    loader.release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    value, meta = await swr.get()
+    assert (value, meta["stale"], loader.calls) == (2, False, 2)
+
+
+@pytest.mark.anyio
+async def test_too_old_value_waits_for_the_reload(clock):
+    loader = Loader()
+    swr = StaleWhileRevalidate(loader, ttl=15, max_stale=300)
+    await swr.get()
+    clock.now += 15 + 300
+
+    value, meta = await swr.get()
+
+    assert (value, meta["stale"]) == (2, False)
+
+
+@pytest.mark.anyio
+async def test_failed_background_refresh_keeps_the_old_value(clock):
+    loader = Loader()
+    swr = StaleWhileRevalidate(loader, ttl=15, max_stale=300)
+    await swr.get()
+    clock.now += 20
+    loader.fail = True
+
+    value, meta = await swr.get()
+    await asyncio.sleep(0)
+
+    assert (value, meta["stale"]) == (1, True)
+    # Sin valor que servir, el error llega al que espera
+    swr.invalidate()
+    with pytest.raises(RuntimeError):
+        await swr.get()
+
+
+@pytest.mark.anyio
+async def test_force_reloads_immediately(clock):
+    loader = Loader()
+    swr = StaleWhileRevalidate(loader, ttl=15, max_stale=300)
+    await swr.get()
+
+    value, _ = await swr.get(force=True)
+
+    assert (value, loader.calls) == (2, 2)
+
+
+# --- Endpoint ---
+
+@pytest.fixture
+def dashboard_cache():
+    from api import admin
+
+    admin._dashboard_cache.invalidate()
+    yield admin._dashboard_cache
+    admin._dashboard_cache.invalidate()
+
+
+def test_dashboard_is_computed_once_per_ttl(client, dashboard_cache):
+    user = make_user()
+    (product,) = make_products({"price": 10.0})
+    make_order(user, datetime(2026, 3, 2, 12), (product, 2), number="GN-1")
+
+    first = client.get("/api/admin/dashboard", headers=admin_headers())
+    with count_queries() as statements:
+        second = client.get("/api/admin/dashboard", headers=admin_headers())
+
+    assert first.status_code == 200 and first.json()["cache"]["stale"] is False
+    assert second.json()["recentOrders"] == first.json()["recentOrders"]
+    assert [statement for statement in statements if "orders" in statement] == []
+
+    make_order(user, datetime(2026, 3, 3, 12), (product, 1), number="GN-2")
+    refreshed = client.get("/api/admin/dashboard", params={"refresh": True}, headers=admin_headers())
+    assert len(refreshed.json()["recentOrders"]) == 2
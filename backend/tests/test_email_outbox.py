@@ -0,0 +1,142 @@
+# backend/tests/test_email_outbox.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from conftest import add_all
+from core.config import settings
+from core.database import AsyncSessionLocal, async_engine
+from models.email import EmailOutbox
+from services import email_service
+
+
+class RecordingTransport(email_service.EmailTransport):
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+        self.connections_in_use = []
+
+    def send(self, to_email: str, subject: str, html_content: str) -> None:
+        # El envío no debe retener conexiones del pool
+        self.connections_in_use.append(async_engine.pool.checkedout())
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("proveedor caído")
+        self.sent.append(to_email)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    recording = RecordingTransport()
+    monkeypatch.setattr(email_service, "_transport", recording)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_SECONDS", 30.0)
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 3)
+    return recording
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def _queue(*emails):
+    async with AsyncSessionLocal() as db:
+        for email in emails:
+            email_service.queue_email(db, email, "Asunto", "<p>Hola</p>")
+        await db.commit()
+
+
+async def _outbox():
+    async with AsyncSessionLocal() as db:
+        return list((await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars())
+
+
+async def _make_due():
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(EmailOutbox).values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        await db.commit()
+
+
+@pytest.mark.anyio
+async def test_pending_emails_are_sent_without_holding_a_connection(transport):
+    await _queue("a@example.com", "b@example.com")
+
+    assert await email_service.dispatch_batch() == 2
+
+    assert transport.sent == ["a@example.com", "b@example.com"]
+    assert transport.connections_in_use == [0, 0]
+    assert [(e.status, e.attempts, e.lease_token) for e in await _outbox()] == [("sent", 1, None)] * 2
+    assert await email_service.dispatch_batch() == 0
+
+
+@pytest.mark.anyio
+async def test_failed_send_is_retried_with_exponential_backoff(transport):
+    transport.failures = 2
+    await _queue("a@example.com")
+
+    delays = []
+    for _ in range(2):
+        started = datetime.now(timezone.utc)
+        assert await email_service.dispatch_batch() == 1
+        (email,) = await _outbox()
+        assert (email.status, email.last_error) == ("pending", "proveedor caído")
+        delays.append(round((_utc(email.next_attempt_at) - started).total_seconds()))
+        assert await email_service.dispatch_batch() == 0  # aún no toca
+        await _make_due()
+
+    assert delays == [30, 60]
+    assert await email_service.dispatch_batch() == 1
+    (email,) = await _outbox()
+    assert (email.status, email.attempts, email.last_error) == ("sent", 3, None)
+
+
+@pytest.mark.anyio
+async def test_email_fails_after_max_attempts(transport):
+    transport.failures = 10
+    await _queue("a@example.com")
+
+    for _ in range(settings.EMAIL_MAX_ATTEMPTS):
+        assert await email_service.dispatch_batch() == 1
+        await _make_due()
+
+    (email,) = await _outbox()
+    assert (email.status, email.attempts) == ("failed", 3)
+    assert await email_service.dispatch_batch() == 0
+
+
+def test_retry_delay_is_capped():
+    assert [email_service._retry_delay(n) for n in (1, 2, 3)] == [
+        settings.EMAIL_RETRY_BASE_SECONDS * factor for factor in (1, 2, 4)
+    ]
+    assert email_service._retry_delay(50) == email_service.MAX_RETRY_DELAY
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_reclaimed(transport):
+    now = datetime.now(timezone.utc)
+    await add_all(
+        EmailOutbox(to_email="caido@example.com", subject="s", html_content="h", status="sending",
+                    attempts=1, lease_token="otro", next_attempt_at=now - timedelta(seconds=1)),
+        EmailOutbox(to_email="en-curso@example.com", subject="s", html_content="h", status="sending",
+                    attempts=1, lease_token="otro", next_attempt_at=now + timedelta(minutes=5)),
+    )
+
+    assert await email_service.dispatch_batch() == 1
+
+    assert transport.sent == ["caido@example.com"]
+    assert [(e.status, e.attempts) for e in await _outbox()] == [("sent", 2), ("sending", 1)]
+
+
+@pytest.mark.anyio
+async def test_outcome_is_dropped_when_the_lease_was_lost(transport):
+    await _queue("a@example.com")
+    batch = await email_service._claim_batch()
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(EmailOutbox).values(lease_token="otro-dispatcher"))
+        await db.commit()
+
+    await email_service._record_outcomes(batch, [None])
+
+    (email,) = await _outbox()
+    assert (email.status, email.lease_token) == ("sending", "otro-dispatcher")
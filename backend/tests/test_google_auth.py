@@ -0,0 +1,133 @@
+# backend/tests/test_google_auth.py
+
+import asyncio
+import base64
+import time
+
+import pytest
+import rsa
+from jose import jwt
+
+from core.config import settings
+from services import google_auth
+
+
+def _rsa_key(kid: str):
+    public, private = rsa.newkeys(1024)
+
+    def b64(number: int) -> str:
+        return base64.urlsafe_b64encode(number.to_bytes((number.bit_length() + 7) // 8, "big")).rstrip(b"=").decode()
+
+    jwk = {"kty": "RSA", "kid": kid, "alg": "RS256", "use": "sig", "n": b64(public.n), "e": b64(public.e)}
+    return jwk, private.save_pkcs1().decode()
+
+
+OLD_JWK, OLD_PEM = _rsa_key("clave-vieja")
+NEW_JWK, NEW_PEM = _rsa_key("clave-nueva")
+
+
+class RotatingSource(google_auth.KeySource):
+    def __init__(self, keys, max_age: float = 3600):
+        self.keys = list(keys)
+        self.max_age = max_age
+        self.fetches = 0
+        self.fail = False
+
+    async def fetch(self):
+        self.fetches += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise OSError("sin red")
+        return {"keys": self.keys}, self.max_age
+
+
+@pytest.fixture
+def source(monkeypatch):
+    rotating = RotatingSource([OLD_JWK])
+    monkeypatch.setattr(google_auth, "_cache", google_auth.KeyCache(rotating))
+    return rotating
+
+
+def _id_token(pem: str = OLD_PEM, kid: str = "clave-vieja", **claims) -> str:
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": settings.GOOGLE_CLIENT_ID,
+        "sub": "google-123",
+        "email": "cliente@gmail.com",
+        "email_verified": True,
+        "exp": int(time.time()) + 300,
+        **claims,
+    }
+    return jwt.encode(payload, pem, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.mark.anyio
+async def test_keys_are_fetched_once_for_concurrent_verifications(source):
+    results = await asyncio.gather(*(google_auth.verify_id_token(_id_token()) for _ in range(10)))
+
+    assert all(claims and claims["email"] == "cliente@gmail.com" for claims in results)
+    assert source.fetches == 1
+
+
+@pytest.mark.anyio
+async def test_rotated_key_triggers_a_refresh(source, monkeypatch):
+    monkeypatch.setattr(google_auth, "KEY_MISS_REFRESH_INTERVAL", 0.0)
+    assert await google_auth.verify_id_token(_id_token())
+
+    # Google publica la clave nueva y retira la vieja
+    source.keys = [NEW_JWK]
+    claims = await google_auth.verify_id_token(_id_token(NEW_PEM, "clave-nueva"))
+
+    assert claims and claims["sub"] == "google-123"
+    assert source.fetches == 2
+    assert await google_auth.verify_id_token(_id_token()) is None
+
+
+@pytest.mark.anyio
+async def test_unknown_kid_refreshes_at_most_once_per_interval(source):
+    assert await google_auth.verify_id_token(_id_token()) is not None
+
+    for _ in range(3):
+        assert await google_auth.verify_id_token(_id_token(NEW_PEM, "clave-desconocida")) is None
+
+    assert source.fetches == 1
+
+
+@pytest.mark.anyio
+async def test_expired_keys_are_kept_when_google_is_unreachable(source):
+    source.max_age = 0.05
+    assert await google_auth.verify_id_token(_id_token())
+    await asyncio.sleep(0.1)
+
+    source.fail = True
+    assert await google_auth.verify_id_token(_id_token())
+    assert source.fetches == 2
+
+
+@pytest.mark.anyio
+async def test_keys_are_refreshed_ahead_of_expiry(source):
+    source.max_age = 1.0
+    assert await google_auth.verify_id_token(_id_token())
+    await asyncio.sleep(1.0 * (1 - google_auth.REFRESH_AHEAD) + 0.02)
+
+    # Dentro del margen final: responde con las claves actuales y recarga en segundo plano
+    assert await google_auth.verify_id_token(_id_token())
+    await asyncio.sleep(0.05)
+    assert source.fetches == 2
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("claims", [
+    {"aud": "otra-app"},
+    {"iss": "https://evil.example.com"},
+    {"email_verified": False},
+    {"exp": int(time.time()) - 60},
+])
+async def test_invalid_claims_are_rejected(source, claims):
+    assert await google_auth.verify_id_token(_id_token(**claims)) is None
+
+
+@pytest.mark.anyio
+async def test_token_signed_with_another_key_is_rejected(source):
+    assert await google_auth.verify_id_token(_id_token(NEW_PEM, "clave-vieja")) is None
+    assert await google_auth.verify_id_token("no-es-un-jwt") is None
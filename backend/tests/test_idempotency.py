@@ -0,0 +1,149 @@
+# backend/tests/test_idempotency.py
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+
+from conftest import auth_headers, make_products, make_user, order_payload, product_stock, run
+from core.database import AsyncSessionLocal
+from models.idempotency import IdempotencyKey
+from models.order import Order
+from models.product import Product
+from services import idempotency
+
+
+async def _keys():
+    async with AsyncSessionLocal() as db:
+        return list((await db.execute(select(IdempotencyKey))).scalars())
+
+
+async def _count_orders():
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count(Order.id)))
+
+
+def test_retry_replays_the_stored_order(client):
+    make_user()
+    (product,) = make_products({"stock": 5})
+    headers = {**auth_headers(), "Idempotency-Key": "pedido-1"}
+
+    first = client.post("/api/orders/", json=order_payload((product.id, 2)), headers=headers)
+    retry = client.post("/api/orders/", json=order_payload((product.id, 2)), headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert first.headers["Idempotent-Replayed"] == "false"
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert run(product_stock()) == {product.id: 3}
+    assert run(_count_orders()) == 1
+
+
+def test_response_is_stored_with_the_order(client):
+    make_user()
+    (product,) = make_products({"stock": 5})
+
+    response = client.post(
+        "/api/orders/", json=order_payload((product.id, 1)), headers={**auth_headers(), "Idempotency-Key": "k"}
+    )
+
+    (key,) = run(_keys())
+    assert key.status_code == 201
+    assert json.loads(key.response_body) == response.json()
+
+
+def test_key_reused_with_another_body_is_rejected(client):
+    make_user()
+    (product,) = make_products({"stock": 5})
+    headers = {**auth_headers(), "Idempotency-Key": "pedido-1"}
+
+    client.post("/api/orders/", json=order_payload((product.id, 1)), headers=headers)
+    response = client.post("/api/orders/", json=order_payload((product.id, 2)), headers=headers)
+
+    assert response.status_code == 422
+    assert run(product_stock()) == {product.id: 4}
+
+
+def test_failed_request_releases_the_key(client):
+    make_user()
+    (product,) = make_products({"stock": 1})
+    headers = {**auth_headers(), "Idempotency-Key": "pedido-1"}
+
+    assert client.post("/api/orders/", json=order_payload((product.id, 2)), headers=headers).status_code == 400
+    assert run(_keys()) == []
+
+    async def restock():
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Product).values(stock=2))
+            await db.commit()
+    run(restock())
+
+    assert client.post("/api/orders/", json=order_payload((product.id, 2)), headers=headers).status_code == 201
+
+
+@pytest.mark.anyio
+async def test_concurrent_duplicate_waits_for_the_first_result():
+    release = asyncio.Event()
+    calls = 0
+
+    async def handler(reservation):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        async with AsyncSessionLocal() as db:
+            await reservation.save_response(db, {"ok": True})
+            await db.commit()
+        return {"ok": True}
+
+    first = asyncio.create_task(idempotency.run_idempotent(1, "k", "hash-a", handler, 201))
+    await asyncio.sleep(0.05)
+    duplicate = asyncio.create_task(idempotency.run_idempotent(1, "k", "hash-a", handler, 201))
+    with pytest.raises(HTTPException) as reused:
+        await idempotency.run_idempotent(1, "k", "hash-b", handler, 201)
+    release.set()
+
+    assert await first == (201, {"ok": True}, False)
+    assert await duplicate == (201, {"ok": True}, True)
+    assert reused.value.status_code == 422
+    assert calls == 1
+
+
+@pytest.mark.anyio
+async def test_stale_reservation_is_taken_over_and_the_original_cannot_save():
+    stale = await idempotency._reserve(1, "k", "hash-a", 201)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(IdempotencyKey).values(created_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        )
+        await db.commit()
+
+    async def handler(reservation):
+        async with AsyncSessionLocal() as db:
+            await reservation.save_response(db, {"attempt": 2})
+            await db.commit()
+        return {"attempt": 2}
+
+    assert await idempotency.run_idempotent(1, "k", "hash-a", handler, 201) == (201, {"attempt": 2}, False)
+
+    # La petición original, si seguía viva, ya no puede confirmar su resultado
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(HTTPException) as conflict:
+            await stale.save_response(db, {"attempt": 1})
+    assert conflict.value.status_code == 409
+    (key,) = await _keys()
+    assert json.loads(key.response_body) == {"attempt": 2}
+
+
+@pytest.mark.anyio
+async def test_reservation_in_progress_is_a_conflict():
+    await idempotency._reserve(1, "k", "hash-a", 201)
+
+    async def handler(reservation):
+        raise AssertionError("no debe ejecutarse")
+
+    with pytest.raises(HTTPException) as conflict:
+        await idempotency.run_idempotent(1, "k", "hash-a", handler, 201)
+    assert conflict.value.status_code == 409
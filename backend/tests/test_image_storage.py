@@ -0,0 +1,99 @@
+# backend/tests/test_image_storage.py
+
+import hashlib
+import os
+
+import pytest
+
+from conftest import admin_headers, wait_for_job
+from core.config import settings
+from services import image_storage, jobs
+
+
+class RecordingStorage(image_storage.ImageStorage):
+    """Almacenamiento de prueba: anota cada subida y puede fallar para ciertos contenidos."""
+
+    name = "test"
+
+    def __init__(self, fail_on=()):
+        self.uploads = []
+        self.fail_on = set(fail_on)
+
+    def upload(self, path: str, key: str) -> str:
+        with open(path, "rb") as f:
+            if f.read() in self.fail_on:
+                raise RuntimeError("almacenamiento no disponible")
+        self.uploads.append(key)
+        return f"https://cdn.example.com/{key}"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    recording = RecordingStorage()
+    monkeypatch.setattr(image_storage, "_storage", recording)
+    return recording
+
+
+def _files(*contents):
+    return [("files", (f"foto-{i}.png", content, "image/png")) for i, content in enumerate(contents)]
+
+
+def test_same_image_is_uploaded_once(client, storage):
+    response = client.post("/api/admin/upload-images", files=_files(b"uno", b"dos", b"uno"), headers=admin_headers())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(storage.uploads) == sorted(hashlib.sha256(c).hexdigest() for c in (b"uno", b"dos"))
+    assert body["urls"][0] == body["urls"][2] != body["urls"][1]
+    assert [f["deduplicated"] for f in body["files"]] == [False, False, False]
+
+
+def test_known_images_are_not_uploaded_again(client, storage):
+    first = client.post("/api/admin/upload-images", files=_files(b"uno"), headers=admin_headers()).json()
+    storage.uploads.clear()
+
+    again = client.post("/api/admin/upload-images", files=_files(b"uno", b"nueva"), headers=admin_headers()).json()
+
+    assert storage.uploads == [hashlib.sha256(b"nueva").hexdigest()]
+    assert again["urls"][0] == first["urls"][0]
+    assert [f["deduplicated"] for f in again["files"]] == [True, False]
+
+
+def test_failed_upload_is_reported_and_retried_later(client, storage):
+    storage.fail_on = {b"rota"}
+
+    body = client.post("/api/admin/upload-images", files=_files(b"rota", b"buena"), headers=admin_headers()).json()
+
+    assert "error" in body["files"][0] and "url" in body["files"][1]
+    assert body["urls"] == [body["files"][1]["url"]]
+
+    # Un fallo no se guarda como subida: el siguiente intento vuelve a subirla
+    storage.fail_on = set()
+    retry = client.post("/api/admin/upload-images", files=_files(b"rota"), headers=admin_headers()).json()
+    assert retry["files"][0]["deduplicated"] is False
+
+
+def test_rejected_job_upload_leaves_no_spool_directory(client, storage):
+    files = _files(b"uno") + [("files", ("notas.txt", b"texto", "text/plain"))]
+
+    response = client.post("/api/admin/jobs/upload-images", files=files, headers=admin_headers())
+
+    assert response.status_code == 400
+    assert os.listdir(settings.JOBS_DIR) == []
+
+
+def test_import_job_spools_spreadsheets_with_the_same_helper(client, monkeypatch):
+    # En SQLite el progreso esperaría a que la importación suelte el bloqueo de escritura
+    monkeypatch.setattr(jobs, "PROGRESS_INTERVAL", float("inf"))
+    csv = "Nombre,Marca,Categoria,Precio,Stock\nCreatina,Birdman,Creatina,350,4\n".encode("utf-8")
+
+    response = client.post(
+        "/api/admin/jobs/import-products", files={"excel": ("catalogo.csv", csv, "text/csv")}, headers=admin_headers()
+    )
+
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["result"]["imported"] == 1
+    # El archivo de la tarea se borra al terminar
+    assert os.listdir(os.path.join(settings.JOBS_DIR, job["id"])) == []
@@ -0,0 +1,92 @@
+# backend/tests/test_jobs.py
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from conftest import add_all, admin_headers, run, wait_for_job
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.job import Job
+from services import jobs
+
+
+async def _statuses() -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Job.id, Job.status, Job.error))
+        return {job_id: (status, error) for job_id, status, error in result.all()}
+
+
+@pytest.mark.anyio
+async def test_restart_fails_running_jobs_and_requeues_queued_ones(monkeypatch):
+    monkeypatch.setattr(jobs, "_queue", asyncio.Queue())
+    await add_all(
+        Job(id="en-curso", kind="export_orders", status=jobs.RUNNING, created_at=datetime(2026, 1, 1, 10)),
+        Job(id="segunda", kind="export_orders", status=jobs.QUEUED, created_at=datetime(2026, 1, 1, 12)),
+        Job(id="primera", kind="export_orders", status=jobs.QUEUED, created_at=datetime(2026, 1, 1, 11)),
+        Job(id="hecha", kind="export_orders", status=jobs.SUCCEEDED, created_at=datetime(2026, 1, 1, 9)),
+    )
+
+    await jobs._recover()
+
+    assert await _statuses() == {
+        "en-curso": (jobs.FAILED, "Interrumpida por un reinicio del servidor"),
+        "segunda": (jobs.QUEUED, None),
+        "primera": (jobs.QUEUED, None),
+        "hecha": (jobs.SUCCEEDED, None),
+    }
+    requeued = [jobs._queue.get_nowait() for _ in range(jobs._queue.qsize())]
+    assert requeued == ["primera", "segunda"]
+
+
+@pytest.mark.anyio
+async def test_purge_removes_only_expired_finished_jobs():
+    old = datetime.now(timezone.utc) - timedelta(hours=settings.JOBS_RETENTION_HOURS + 1)
+    recent = datetime.now(timezone.utc) - timedelta(minutes=5)
+    await add_all(
+        Job(id="vieja", kind="export_orders", status=jobs.SUCCEEDED, finished_at=old),
+        Job(id="vieja-fallida", kind="export_orders", status=jobs.FAILED, finished_at=old),
+        Job(id="reciente", kind="export_orders", status=jobs.SUCCEEDED, finished_at=recent),
+        Job(id="en-curso", kind="export_orders", status=jobs.RUNNING),
+    )
+    for job_id in ("vieja", "reciente"):
+        with open(os.path.join(jobs.job_dir(job_id), "pedidos.csv"), "w") as f:
+            f.write("id\n")
+
+    await jobs._purge_expired()
+
+    assert set(await _statuses()) == {"reciente", "en-curso"}
+    assert not os.path.exists(os.path.join(settings.JOBS_DIR, "vieja"))
+    assert os.path.exists(os.path.join(settings.JOBS_DIR, "reciente", "pedidos.csv"))
+
+
+def test_worker_runs_handler_and_records_result(client, monkeypatch):
+    async def count_to(context, params):
+        for done in range(1, params["total"] + 1):
+            await context.progress(done)
+        return {"total": params["total"]}
+
+    async def broken(context, params):
+        await context.progress(2)
+        raise ValueError("Archivo corrupto")
+
+    monkeypatch.setitem(jobs._handlers, "contar", count_to)
+    monkeypatch.setitem(jobs._handlers, "romper", broken)
+
+    done = wait_for_job(client, run(jobs.submit("contar", {"total": 3}, "admin@example.com")).id)
+    failed = wait_for_job(client, run(jobs.submit("romper", {})).id)
+
+    assert (done["status"], done["progress"], done["result"]) == (jobs.SUCCEEDED, 3, {"total": 3})
+    assert done["created_by"] == "admin@example.com" and done["finished_at"] is not None
+    assert (failed["status"], failed["progress"], failed["error"]) == (jobs.FAILED, 2, "Archivo corrupto")
+    listed = client.get("/api/admin/jobs", headers=admin_headers()).json()
+    assert {job["id"] for job in listed} == {done["id"], failed["id"]}
+    assert client.get("/api/admin/jobs/no-existe", headers=admin_headers()).status_code == 404
+
+
+def test_unknown_kind_is_rejected(client):
+    with pytest.raises(ValueError):
+        run(jobs.submit("desconocida", {}))
@@ -0,0 +1,46 @@
+# backend/tests/test_order_export.py
+
+import csv
+import io
+
+from openpyxl import load_workbook
+
+from conftest import admin_headers, auth_headers, make_products, make_user, order_payload
+from services import order_export
+
+
+def _place_orders(client):
+    make_user()
+    creatina, whey = make_products({"name": "Creatina", "sku": "CRE-1"}, {"name": "Whey", "sku": "WHE-1"})
+    for items in (((creatina.id, 1), (whey.id, 2)), ((whey.id, 1),)):
+        assert client.post("/api/orders/", json=order_payload(*items), headers=auth_headers()).status_code == 201
+
+
+def test_csv_export_has_one_row_per_item(client):
+    _place_orders(client)
+
+    response = client.get("/api/admin/export-orders", params={"format": "csv"}, headers=admin_headers())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(order_export.CSV_MEDIA_TYPE)
+    rows = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert rows[0] == order_export.EXPORT_COLUMNS
+    assert sorted((row[7], row[9]) for row in rows[1:]) == [("CRE-1", "1"), ("WHE-1", "1"), ("WHE-1", "2")]
+
+
+def test_xlsx_export_matches_csv_rows(client):
+    _place_orders(client)
+
+    response = client.get("/api/admin/export-orders", params={"format": "xlsx"}, headers=admin_headers())
+
+    assert response.status_code == 200
+    sheet = load_workbook(io.BytesIO(response.content), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == order_export.EXPORT_COLUMNS
+    assert sorted((row[7], row[9]) for row in rows[1:]) == [("CRE-1", 1), ("WHE-1", 1), ("WHE-1", 2)]
+
+
+def test_export_without_orders_is_404(client):
+    response = client.get("/api/admin/export-orders", params={"format": "csv"}, headers=admin_headers())
+
+    assert response.status_code == 404
@@ -0,0 +1,178 @@
+# backend/tests/test_orders.py
+
+from datetime import datetime
+
+from sqlalchemy import event, func, select, update
+
+from conftest import auth_headers, count_queries, make_products, make_user, order_payload, product_stock, run
+from core.database import AsyncSessionLocal, async_engine
+from models.order import Order
+
+
+def _count_orders() -> int:
+    async def count():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count(Order.id)))
+    return run(count())
+
+
+async def _set_created_at(dates: dict) -> None:
+    async with AsyncSessionLocal() as db:
+        for order_id, created_at in dates.items():
+            await db.execute(update(Order).where(Order.id == order_id).values(created_at=created_at))
+        await db.commit()
+
+
+def test_order_decrements_stock(client):
+    make_user()
+    first, second = make_products({"price": 100.0, "stock": 5}, {"price": 30.0, "stock": 2})
+
+    response = client.post(
+        "/api/orders/", json=order_payload((first.id, 2), (second.id, 2)), headers=auth_headers()
+    )
+
+    assert response.status_code == 201
+    order = response.json()
+    assert order["total_amount"] == 2 * 100.0 + 2 * 30.0 + 50.0
+    assert sorted((item["product_id"], item["quantity"]) for item in order["items"]) == [(first.id, 2), (second.id, 2)]
+    assert run(product_stock()) == {first.id: 3, second.id: 0}
+
+
+def test_repeated_lines_are_aggregated(client):
+    make_user()
+    (product,) = make_products({"stock": 4})
+
+    response = client.post(
+        "/api/orders/", json=order_payload((product.id, 1), (product.id, 2)), headers=auth_headers()
+    )
+
+    assert response.status_code == 201
+    assert [(item["product_id"], item["quantity"]) for item in response.json()["items"]] == [(product.id, 3)]
+    assert run(product_stock()) == {product.id: 1}
+
+
+def test_insufficient_stock_changes_nothing(client):
+    make_user()
+    available, scarce = make_products({"stock": 5}, {"stock": 1})
+
+    response = client.post(
+        "/api/orders/", json=order_payload((available.id, 1), (scarce.id, 2)), headers=auth_headers()
+    )
+
+    assert response.status_code == 400
+    assert run(product_stock()) == {available.id: 5, scarce.id: 1}
+    assert _count_orders() == 0
+
+
+def test_repeated_lines_cannot_exceed_stock(client):
+    make_user()
+    (product,) = make_products({"stock": 2})
+
+    response = client.post(
+        "/api/orders/", json=order_payload((product.id, 2), (product.id, 1)), headers=auth_headers()
+    )
+
+    assert response.status_code == 400
+    assert run(product_stock()) == {product.id: 2}
+
+
+def test_unknown_product_and_invalid_quantity(client):
+    make_user()
+    (product,) = make_products({"stock": 2})
+
+    assert client.post("/api/orders/", json=order_payload((999, 1)), headers=auth_headers()).status_code == 404
+    assert client.post("/api/orders/", json=order_payload((product.id, 0)), headers=auth_headers()).status_code == 400
+    assert client.post("/api/orders/", json=order_payload(), headers=auth_headers()).status_code == 400
+    assert run(product_stock()) == {product.id: 2}
+
+
+def test_orders_drain_stock_exactly(client):
+    make_user()
+    (product,) = make_products({"stock": 3})
+
+    statuses = [
+        client.post("/api/orders/", json=order_payload((product.id, 1)), headers=auth_headers()).status_code
+        for _ in range(5)
+    ]
+
+    assert statuses == [201, 201, 201, 400, 400]
+    assert run(product_stock()) == {product.id: 0}
+    assert _count_orders() == 3
+
+
+def test_sold_out_between_read_and_update_answers_409(client):
+    make_user()
+    (product,) = make_products({"stock": 3})
+
+    # Otro checkout se lleva el stock justo después de nuestra lectura y antes del
+    # descuento condicional (en Postgres lo impide el FOR UPDATE; aquí se simula)
+    def sell_out(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE PRODUCTS SET STOCK"):
+            cursor.execute("UPDATE products SET stock = 1 WHERE id = ?", (product.id,))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", sell_out)
+    try:
+        response = client.post("/api/orders/", json=order_payload((product.id, 2)), headers=auth_headers())
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", sell_out)
+
+    assert response.status_code == 409
+    assert _count_orders() == 0
+    # Se deshizo toda la transacción, también la venta simulada
+    assert run(product_stock()) == {product.id: 3}
+
+
+def test_checkout_only_evicts_the_products_it_sold(client):
+    make_user()
+    sold, untouched = make_products(
+        {"name": "Creatina", "stock": 5}, {"name": "Glutamina", "category": "Aminoácidos", "stock": 5}
+    )
+    client.get(f"/api/products/{sold.id}")
+    client.get(f"/api/products/{untouched.id}")
+    page_etag = client.get("/api/products/", params={"category": "Aminoácidos"}).headers["etag"]
+
+    assert client.post("/api/orders/", json=order_payload((sold.id, 2)), headers=auth_headers()).status_code == 201
+
+    with count_queries() as statements:
+        assert client.get(f"/api/products/{untouched.id}").json()["stock"] == 5
+        # Una página sin el producto vendido sigue en caché (304 sin consultar)
+        response = client.get("/api/products/", params={"category": "Aminoácidos"}, headers={"If-None-Match": page_etag})
+        assert response.status_code == 304
+    # (el dispatcher de correos puede consultar su bandeja mientras tanto)
+    assert [statement for statement in statements if "products" in statement] == []
+
+    assert client.get(f"/api/products/{sold.id}").json()["stock"] == 3
+    assert {item["id"]: item["stock"] for item in client.get("/api/products/").json()} == {sold.id: 3, untouched.id: 5}
+
+
+def test_order_history_views(client):
+    make_user()
+    first, second = make_products({"price": 100.0}, {"price": 30.0})
+    for items in (((first.id, 1), (second.id, 2)), ((first.id, 3),)):
+        assert client.post("/api/orders/", json=order_payload(*items), headers=auth_headers()).status_code == 201
+
+    full = client.get("/api/orders/", headers=auth_headers()).json()
+    summary = client.get("/api/orders/", params={"view": "summary"}, headers=auth_headers()).json()
+
+    assert [len(order["items"]) for order in full] == [1, 2]
+    assert [(order["item_count"], order["items_total"]) for order in summary] == [(1, 300.0), (2, 160.0)]
+    assert "items" not in summary[0]
+    assert [order["id"] for order in summary] == [order["id"] for order in full]
+
+
+def test_order_history_pages_by_cursor(client):
+    make_user()
+    (product,) = make_products({"stock": 10})
+    for _ in range(3):
+        client.post("/api/orders/", json=order_payload((product.id, 1)), headers=auth_headers())
+    # En SQLite CURRENT_TIMESTAMP se guarda como texto sin microsegundos y no se compara
+    # bien con el del cursor: se fijan fechas con el formato de SQLAlchemy (dos iguales)
+    run(_set_created_at({1: datetime(2026, 1, 1), 2: datetime(2026, 1, 2), 3: datetime(2026, 1, 2)}))
+
+    first = client.get("/api/orders/", params={"limit": 2, "view": "summary"}, headers=auth_headers())
+    cursor = first.headers["x-next-cursor"]
+    second = client.get("/api/orders/", params={"limit": 2, "view": "summary", "cursor": cursor}, headers=auth_headers())
+
+    ids = [order["id"] for order in first.json() + second.json()]
+    assert ids == [3, 2, 1]
+    assert "x-next-cursor" not in second.headers
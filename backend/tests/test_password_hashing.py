@@ -0,0 +1,71 @@
+# backend/tests/test_password_hashing.py
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+from conftest import add_all, run
+from core import security
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.user import User
+
+
+@pytest.fixture
+def cheap_bcrypt(monkeypatch):
+    """Coste 5 en lugar de BCRYPT_ROUNDS para que las pruebas no tarden."""
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5)
+    monkeypatch.setattr(security, "pwd_context", context)
+    return context
+
+
+@pytest.mark.anyio
+async def test_hashing_beyond_the_pending_limit_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 1)
+    release = threading.Event()
+    running = asyncio.create_task(security._run_hashing(release.wait, 5))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as error:
+        await security._run_hashing(str, "contraseña")
+    release.set()
+
+    assert (error.value.status_code, error.value.headers) == (503, {"Retry-After": "1"})
+    assert await running is True
+    assert security._pending == 0
+    # Con el hueco libre vuelve a admitirse
+    assert await security._run_hashing(str, "contraseña") == "contraseña"
+
+
+def test_register_answers_503_when_hashing_is_saturated(client, monkeypatch):
+    monkeypatch.setattr(security, "_pending", settings.PASSWORD_HASH_MAX_PENDING)
+
+    response = client.post(
+        "/api/auth/register", json={"email": "nuevo@example.com", "name": "Nuevo", "password": "secreta123"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_login_rehashes_passwords_stored_with_another_cost(client, cheap_bcrypt):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secreta123")
+    run(add_all(User(email="cliente@example.com", name="Cliente", hashed_password=old_hash)))
+
+    async def stored_hash() -> str:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(User.hashed_password).where(User.email == "cliente@example.com"))
+
+    login = {"email": "cliente@example.com", "password": "secreta123"}
+    assert client.post("/api/auth/login", json=login).status_code == 200
+    new_hash = run(stored_hash())
+    assert new_hash.startswith("$2b$05$") and cheap_bcrypt.verify("secreta123", new_hash)
+
+    # Ya con el coste actual no se vuelve a escribir
+    assert client.post("/api/auth/login", json=login).status_code == 200
+    assert run(stored_hash()) == new_hash
+    assert client.post("/api/auth/login", json={**login, "password": "otra"}).status_code == 401
@@ -0,0 +1,56 @@
+# backend/tests/test_principal_cache.py
+
+import pytest
+
+from conftest import admin_headers, auth_headers, count_queries, make_user
+from core.database import AsyncSessionLocal
+from models.user import User, UserRole
+from services import principal_cache
+
+
+def _user_queries(statements) -> list:
+    return [statement for statement in statements if "FROM users" in statement]
+
+
+def test_authenticated_user_is_served_from_cache(client):
+    make_user()
+    assert client.get("/api/orders/", headers=auth_headers()).status_code == 200
+
+    with count_queries() as statements:
+        assert client.get("/api/orders/", headers=auth_headers()).status_code == 200
+
+    assert _user_queries(statements) == []
+
+
+def test_deactivated_user_is_rejected_right_away(client):
+    user = make_user()
+    assert client.get("/api/orders/", headers=auth_headers()).status_code == 200
+
+    assert client.delete(f"/api/admin/users/{user.id}", headers=admin_headers()).status_code == 200
+
+    assert client.get("/api/orders/", headers=auth_headers()).status_code == 403
+
+
+def test_role_change_evicts_the_cached_user(client):
+    user = make_user()
+    client.get("/api/orders/", headers=auth_headers())
+
+    response = client.patch(f"/api/admin/users/{user.id}/role", json={"role": "ADMIN"}, headers=admin_headers())
+    assert response.status_code == 200
+
+    with count_queries() as statements:
+        client.get("/api/orders/", headers=auth_headers())
+    assert len(_user_queries(statements)) == 1
+    assert principal_cache._principals.get(user.email)["role"] == UserRole.ADMIN
+
+
+@pytest.mark.anyio
+async def test_user_read_before_an_invalidation_is_not_stored():
+    user = User(id=1, email="cliente@example.com", name="Cliente", hashed_password="!", is_active=True)
+    at_version = principal_cache.version()
+
+    principal_cache.invalidate(user.email)  # el admin cambia al usuario mientras se leía
+    principal_cache.set_user(user, at_version)
+
+    async with AsyncSessionLocal() as db:
+        assert await principal_cache.get_user(db, user.email) is None
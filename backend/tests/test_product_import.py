@@ -0,0 +1,145 @@
+# backend/tests/test_product_import.py
+
+import io
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import select
+
+from conftest import admin_headers, run
+from core.database import AsyncSessionLocal
+from models.product import Product
+from services import product_import
+
+HEADER = "Nombre,Marca,Categoria,Precio,Stock,Slug,SKU\n"
+
+
+def _xlsx(*rows) -> io.BytesIO:
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _import(client, csv: str, filename: str = "catalogo.csv"):
+    response = client.post(
+        "/api/admin/import-excel",
+        files={"excel": (filename, (HEADER + csv).encode("utf-8"), "text/csv")},
+        headers=admin_headers(),
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def _products() -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Product.slug, Product.name))
+        return dict(result.all())
+
+
+def test_repeated_slug_in_one_chunk_is_reported(client):
+    summary = _import(client, (
+        "Creatina,Birdman,Creatina,350,4,creatina,SKU-1\n"
+        "Creatina HCL,Kevin,Creatina,420,2,creatina,SKU-2\n"
+        "Glutamina,Birdman,Aminoácidos,300,5,glutamina,SKU-1\n"
+    ))
+
+    assert summary["imported"] == 1
+    assert summary["error_count"] == 2
+    assert summary["errors"] == [
+        {"row": 3, "error": "Slug repetido en el archivo (ya usado en la fila 2)"},
+        {"row": 4, "error": "SKU repetido en el archivo (ya usado en la fila 2)"},
+    ]
+    assert run(_products()) == {"creatina": "Creatina"}
+
+
+def test_slug_taken_by_an_existing_product_is_reported(client):
+    _import(client, "Creatina,Birdman,Creatina,350,4,creatina,SKU-1\n")
+
+    summary = _import(client, "Creatina HCL,Kevin,Creatina,420,2,creatina,SKU-2\n")
+
+    assert summary["imported"] == 0
+    assert summary["errors"] == [{"row": 2, "error": "El Slug o SKU ya pertenece a otro producto"}]
+
+
+def test_new_product_without_stock_column_starts_at_zero(client):
+    response = client.post(
+        "/api/admin/import-excel",
+        files={"excel": ("catalogo.csv", "Nombre,Marca,Categoria,Precio\nCreatina,Birdman,Creatina,350\n".encode(), "text/csv")},
+        headers=admin_headers(),
+    )
+
+    assert response.json()["imported"] == 1
+    assert [(product["name"], product["stock"]) for product in client.get("/api/products/").json()] == [("Creatina", 0)]
+
+
+# --- Lectura por bloques ---
+
+@pytest.mark.parametrize("filename", ["catalogo.csv", "catalogo.xlsx"])
+def test_file_is_read_in_batches_keeping_row_numbers(filename):
+    rows = [("Nombre", "Marca"), ("A", "X"), ("B", "X"), (None, None), ("C", "X"), ("D", "X"), ("E", "X")]
+    if filename.endswith(".csv"):
+        text = "\n".join(",".join(value or "" for value in row) for row in rows) + "\n"
+        file = io.BytesIO(text.encode("utf-8"))
+    else:
+        file = _xlsx(*rows)
+
+    frames = list(product_import.iter_frames(file, filename, batch_size=2))
+
+    # Las filas en blanco se saltan pero no desplazan la numeración (cabecera = fila 1)
+    assert frames[0].index.tolist() == [2, 3]
+    numbered = {row: name for frame in frames for row, name in frame["Nombre"].items()}
+    assert numbered == {2: "A", 3: "B", 5: "C", 6: "D", 7: "E"}
+    assert max(len(frame) for frame in frames) <= 2
+
+
+@pytest.mark.anyio
+async def test_import_reports_progress_after_each_batch():
+    text = "Nombre,Marca,Categoria,Precio\n" + "".join(f"P{n},X,C,{n + 1}\n" for n in range(5))
+    progress = []
+
+    async def record(rows_read):
+        progress.append(rows_read)
+
+    async with AsyncSessionLocal() as db:
+        importer = await product_import.import_file(
+            db, io.BytesIO(text.encode("utf-8")), "catalogo.csv", batch_size=2, progress=record
+        )
+        await db.commit()
+
+    assert progress == [2, 4, 5]
+    assert importer.imported == 5
+
+
+# --- Filas sin cambios ---
+
+def test_reimport_skips_unchanged_rows(client):
+    catalog = "Creatina,Birdman,Creatina,350,4,creatina,SKU-1\nGlutamina,Birdman,Aminoácidos,300,5,glutamina,SKU-2\n"
+    _import(client, catalog)
+
+    again = _import(client, catalog)
+    changed = _import(client, catalog.replace("350,4", "399,4"))
+
+    assert (again["imported"], again["updated"], again["unchanged"]) == (0, 0, 2)
+    assert (changed["imported"], changed["updated"], changed["unchanged"]) == (0, 1, 1)
+    assert {product["name"]: product["price"] for product in client.get("/api/products/").json()} == {
+        "Creatina": 399.0, "Glutamina": 300.0,
+    }
+
+
+def test_same_row_hashes_alike_from_xlsx_and_csv():
+    header = ["Nombre", "Marca", "Categoria", "Precio", "Stock", "Descripcion"]
+    values = ["Creatina", "Birdman", "Creatina", 350, 4, None]
+    csv = io.BytesIO((",".join(header) + "\nCreatina,Birdman,Creatina,350.00,4,\n").encode("utf-8"))
+
+    hashes = []
+    for file, filename in ((_xlsx(header, values), "catalogo.xlsx"), (csv, "catalogo.csv")):
+        (frame,) = product_import.iter_frames(file, filename, batch_size=10)
+        valid, errors = product_import.clean_frame(frame)
+        assert errors.empty
+        hashes.append(product_import.content_hashes(valid).tolist())
+
+    assert hashes[0] == hashes[1]
@@ -0,0 +1,63 @@
+# backend/tests/test_product_search.py
+
+from conftest import admin_headers, change_in_other_worker, make_products, run
+from core.config import settings
+from services.product_search import InvertedIndex
+
+DOCUMENTS = [
+    (1, {"name": "Proteína Whey Gold", "brand": "Optimum", "category": "Proteínas", "description": "Sabor chocolate"}),
+    (2, {"name": "Creatina Monohidratada", "brand": "Birdman", "category": "Creatinas", "description": None}),
+    (3, {"name": "Pre Entreno C4", "brand": "Cellucor", "category": "Pre entrenos", "description": "Sabor fresa"}),
+]
+
+
+def test_index_tolerates_typos():
+    index = InvertedIndex(DOCUMENTS)
+    assert index.search("creatna", 10) == [2]          # falta una letra
+    assert index.search("proteina wehy", 10)[0] == 1    # letras cambiadas y sin acento
+    assert index.search("cellucro", 10) == [3]
+
+
+def test_index_matches_prefix_of_last_word():
+    index = InvertedIndex(DOCUMENTS)
+    assert index.search("sabor choc", 10) == [1, 3]
+
+
+def test_short_words_are_not_fuzzy_matched():
+    # Con menos de 4 letras un error de tipeo daría demasiados falsos positivos
+    assert InvertedIndex(DOCUMENTS).search("xc4", 10) == []
+
+
+def test_search_endpoint_ranks_and_skips_inactive(client):
+    make_products(
+        {"name": "Creatina Monohidratada", "brand": "Birdman"},
+        {"name": "Creatina HCL", "brand": "Kevin Levrone", "is_active": False},
+        {"name": "Glutamina", "brand": "Birdman", "description": "Ideal con creatina"},
+    )
+
+    response = client.get("/api/products/search", params={"q": "creatna"})
+
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()] == ["Creatina Monohidratada", "Glutamina"]
+
+
+def test_search_index_follows_catalog_changes(client):
+    (product,) = make_products({"name": "Multivitamínico", "brand": "Centrum"})
+    assert client.get("/api/products/search", params={"q": "multivitaminico"}).json()[0]["id"] == product.id
+
+    response = client.put(f"/api/admin/products/{product.id}", json={"name": "Omega 3"}, headers=admin_headers())
+    assert response.status_code == 200
+
+    assert client.get("/api/products/search", params={"q": "omega"}).json()[0]["id"] == product.id
+    assert client.get("/api/products/search", params={"q": "multivitaminico"}).json() == []
+
+
+def test_search_sees_edits_made_in_other_workers(client, monkeypatch):
+    (product,) = make_products({"name": "Multivitamínico", "brand": "Centrum"})
+    assert client.get("/api/products/search", params={"q": "multivitaminico"}).json()[0]["id"] == product.id
+
+    run(change_in_other_worker(product.id, name="Omega 3"))
+    monkeypatch.setattr(settings, "CATALOG_VERSION_TTL", 0)
+
+    assert client.get("/api/products/search", params={"q": "omega"}).json()[0]["id"] == product.id
+    assert client.get("/api/products/search", params={"q": "multivitaminico"}).json() == []
@@ -0,0 +1,144 @@
+# backend/tests/test_products.py
+
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import admin_headers, count_queries, make_products
+from core.config import settings
+from core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def _raw_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+# --- Cursores ---
+
+def test_cursor_round_trip():
+    moment = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+    assert decode_cursor(encode_cursor(["Creatina", 7]), (str, int)) == ["Creatina", 7]
+    assert decode_cursor(encode_cursor([moment, 7]), (datetime, int)) == [moment, 7]
+    assert decode_cursor(None, (str, int)) is None
+    # Token opaco y apto para URL
+    assert "=" not in encode_cursor(["Ñandú", 1])
+
+
+@pytest.mark.parametrize("token", [
+    "no-es-base64!!",
+    _raw_cursor({"name": "Creatina", "id": 7}),   # no es una lista
+    _raw_cursor(["Creatina"]),                    # faltan valores
+    _raw_cursor(["Creatina", "7; DROP TABLE"]),  # id que no es entero
+    _raw_cursor(["Creatina", True]),              # bool no vale como id
+    _raw_cursor([["Creatina"], 7]),               # nombre que no es texto
+])
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(token, (str, int))
+    assert error.value.status_code == 400
+
+
+def test_endpoint_rejects_tampered_cursor(client):
+    response = client.get("/api/products/", params={"cursor": _raw_cursor(["Creatina", "x"])})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor de paginación inválido"
+
+
+# --- Paginación keyset ---
+
+def _walk(client, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get("/api/products/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([(item["name"], item["id"]) for item in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+def test_pages_follow_name_then_id_without_gaps_or_repeats(client):
+    # Nombres repetidos: el id desempata dentro del mismo nombre
+    products = make_products(
+        {"name": "Whey"}, {"name": "Creatina"}, {"name": "Whey"}, {"name": "Creatina"}, {"name": "Aminoácidos"},
+    )
+
+    pages = _walk(client, limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    expected = sorted((product.name, product.id) for product in products)
+    assert [row for page in pages for row in page] == expected
+
+
+def test_last_full_page_has_no_next_cursor(client):
+    make_products({"name": "A"}, {"name": "B"})
+
+    response = client.get("/api/products/", params={"limit": 2})
+
+    assert len(response.json()) == 2
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_filters_apply_server_side_across_pages(client):
+    make_products(
+        {"name": "Whey", "category": "Proteínas"},
+        {"name": "Creatina", "category": "Creatina"},
+        {"name": "Caseína", "category": "Proteínas"},
+        {"name": "Multi", "category": "Vitaminas"},
+    )
+
+    pages = _walk(client, limit=1, category=["proteínas", "VITAMINAS"])
+
+    assert [name for page in pages for name, _ in page] == ["Caseína", "Multi", "Whey"]
+
+
+def test_inactive_products_require_admin(client):
+    make_products({"name": "Activo"}, {"name": "Oculto", "is_active": False})
+
+    assert [item["name"] for item in client.get("/api/products/").json()] == ["Activo"]
+    assert client.get("/api/products/", params={"include_inactive": True}).status_code == 401
+    response = client.get("/api/products/", params={"include_inactive": True}, headers=admin_headers())
+    assert [item["name"] for item in response.json()] == ["Activo", "Oculto"]
+
+
+# --- Consulta por lotes ---
+
+def test_batch_returns_requested_order_and_missing_ids(client):
+    first, second = make_products({"name": "Creatina", "price": 350.0}, {"name": "Whey", "stock": 0})
+
+    response = client.get("/api/products/batch", params={"ids": f"{second.id},999,{first.id},{second.id}"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["products"]) == [str(second.id), str(first.id)]
+    assert body["products"][str(first.id)]["price"] == 350.0
+    assert body["products"][str(second.id)]["stock"] == 0
+    assert body["missing"] == [999]
+
+
+def test_batch_reuses_cached_products(client):
+    first, second = make_products({"name": "Creatina"}, {"name": "Whey"})
+    client.get(f"/api/products/{first.id}")
+
+    with count_queries() as statements:
+        client.get("/api/products/batch", params={"ids": f"{first.id},{second.id}"})
+    # Solo se consulta el que no estaba en caché, en una única sentencia
+    product_queries = [statement for statement in statements if "FROM products" in statement]
+    assert len(product_queries) == 1
+
+    with count_queries() as statements:
+        client.get("/api/products/batch", params={"ids": f"{first.id},{second.id}"})
+    assert [statement for statement in statements if "FROM products" in statement] == []
+
+
+def test_batch_validates_ids(client, monkeypatch):
+    assert client.get("/api/products/batch", params={"ids": "1,dos"}).status_code == 400
+    assert client.get("/api/products/batch", params={"ids": ","}).status_code == 400
+
+    monkeypatch.setattr(settings, "PRODUCTS_PAGE_MAX", 2)
+    assert client.get("/api/products/batch", params={"ids": "1,2,3"}).status_code == 400
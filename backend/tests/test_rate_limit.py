@@ -0,0 +1,142 @@
+# backend/tests/test_rate_limit.py
+
+import asyncio
+
+from core.config import Settings
+from core.rate_limit import RateLimitMiddleware, RateLimitRule
+from core.security import create_access_token
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _call(middleware, path="/api/auth/login", method="POST", headers=None, client=("10.0.0.1", 1234)):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": client,
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    start = messages[0]
+    return start["status"], dict(start["headers"])
+
+
+def _limiter(proxy_hops=0, burst=2):
+    rules = [
+        RateLimitRule(prefix="/api/auth/login", rate=1, burst=burst, methods=("POST",)),
+        RateLimitRule(prefix="/api/products", rate=1, burst=burst),
+    ]
+    return RateLimitMiddleware(_ok, rules, proxy_hops=proxy_hops)
+
+
+# --- Reglas ---
+
+def test_rule_matches_whole_path_segments():
+    rule = RateLimitRule(prefix="/api/auth/login/", rate=10, burst=5, methods=("POST",))
+
+    assert rule.matches("POST", "/api/auth/login")
+    assert rule.matches("POST", "/api/auth/login/extra")
+    assert not rule.matches("POST", "/api/auth/login-x")
+    assert not rule.matches("POST", "/api/auth")
+    assert not rule.matches("GET", "/api/auth/login")
+
+
+def test_rule_without_methods_skips_options():
+    rule = RateLimitRule.from_dict({"prefix": "/api/products", "rate": 60, "burst": 10})
+
+    assert rule.matches("GET", "/api/products/7")
+    assert rule.matches("DELETE", "/api/products")
+    assert not rule.matches("OPTIONS", "/api/products")
+
+
+def test_longest_prefix_wins():
+    middleware = RateLimitMiddleware(_ok, [
+        RateLimitRule(prefix="/api/products", rate=60, burst=1),
+        RateLimitRule(prefix="/api/products/search", rate=60, burst=3),
+    ])
+
+    statuses = [_call(middleware, "/api/products/search", "GET")[0] for _ in range(4)]
+
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_unmatched_paths_are_not_limited():
+    middleware = _limiter(burst=1)
+
+    assert [_call(middleware, "/api/auth/login-x")[0] for _ in range(3)] == [200, 200, 200]
+
+
+# --- Claves de cliente ---
+
+def test_exhausted_bucket_answers_429_with_retry_after():
+    middleware = _limiter(burst=2)
+
+    responses = [_call(middleware) for _ in range(3)]
+
+    assert [status for status, _ in responses] == [200, 200, 429]
+    assert int(responses[-1][1][b"retry-after"]) >= 1
+
+
+def test_without_proxy_hops_forwarded_header_is_ignored():
+    middleware = _limiter(burst=1)
+
+    assert _call(middleware, headers={"X-Forwarded-For": "1.1.1.1"})[0] == 200
+    # Otra IP falsificada no abre un cubo nuevo: cuenta la IP de la conexión
+    assert _call(middleware, headers={"X-Forwarded-For": "2.2.2.2"})[0] == 429
+
+
+def test_proxy_hops_use_the_address_added_by_the_trusted_proxy():
+    middleware = _limiter(proxy_hops=1, burst=1)
+    proxy = ("10.0.0.254", 443)
+
+    # Detrás del mismo proxy, dos clientes distintos tienen cubos distintos
+    assert _call(middleware, headers={"X-Forwarded-For": "1.1.1.1"}, client=proxy)[0] == 200
+    assert _call(middleware, headers={"X-Forwarded-For": "2.2.2.2"}, client=proxy)[0] == 200
+    # Lo que el cliente antepone a X-Forwarded-For no cambia su clave
+    assert _call(middleware, headers={"X-Forwarded-For": "9.9.9.9, 1.1.1.1"}, client=proxy)[0] == 429
+
+
+def test_signed_token_also_charges_the_user_bucket():
+    middleware = _limiter(burst=2)
+    token = create_access_token({"sub": "cliente@example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert _call(middleware, headers=headers, client=("1.1.1.1", 1))[0] == 200
+    assert _call(middleware, headers=headers, client=("2.2.2.2", 1))[0] == 200
+    # Misma cuenta desde una tercera IP: el cubo del usuario ya está vacío
+    assert _call(middleware, headers=headers, client=("3.3.3.3", 1))[0] == 429
+    # La IP nueva sin token sigue teniendo su propio cubo
+    assert _call(middleware, client=("3.3.3.3", 1))[0] == 200
+
+
+def test_forged_token_does_not_open_a_new_bucket():
+    middleware = _limiter(burst=1)
+
+    assert _call(middleware, headers={"Authorization": "Bearer a.b.c"})[0] == 200
+    assert _call(middleware, headers={"Authorization": "Bearer d.e.f"})[0] == 429
+
+
+# --- Configuración ---
+
+def test_proxy_hops_default_follows_render(monkeypatch):
+    monkeypatch.delenv("RATE_LIMIT_PROXY_HOPS", raising=False)
+    monkeypatch.delenv("RENDER", raising=False)
+    assert Settings().RATE_LIMIT_PROXY_HOPS == 0
+
+    monkeypatch.setenv("RENDER", "true")
+    assert Settings().RATE_LIMIT_PROXY_HOPS == 1
+
+    monkeypatch.setenv("RATE_LIMIT_PROXY_HOPS", "2")
+    assert Settings().RATE_LIMIT_PROXY_HOPS == 2
@@ -0,0 +1,95 @@
+# backend/tests/test_sales_analytics.py
+
+from datetime import datetime
+
+from conftest import admin_headers, make_order, make_products, make_user, run
+from core.database import AsyncSessionLocal
+from models.order import OrderStatus
+from services import sales_rollup
+
+PAID = OrderStatus.COMPLETADO
+
+
+async def _rebuild_rollups():
+    async with AsyncSessionLocal() as db:
+        await sales_rollup.rebuild(db)
+        await db.commit()
+
+
+def _seed():
+    user = make_user()
+    creatina, whey, multi = make_products(
+        {"name": "Creatina", "category": "Creatina", "brand": "Birdman", "price": 10.0},
+        {"name": "Whey", "category": "Proteínas", "brand": "Optimum", "price": 25.0},
+        {"name": "Multi", "category": "Vitaminas", "brand": "Centrum", "price": 5.0},
+    )
+    make_order(user, datetime(2026, 3, 2, 12), (creatina, 1), status=PAID, number="GN-1")                 # lunes
+    make_order(user, datetime(2026, 3, 4, 12), (whey, 2), status=OrderStatus.ENVIADO, number="GN-2")
+    make_order(user, datetime(2026, 3, 4, 13), (multi, 4), status=OrderStatus.PENDING, number="GN-3")     # sin cobrar
+    make_order(user, datetime(2026, 3, 10, 12), (creatina, 3), (multi, 1), status=PAID, number="GN-4")
+    make_order(user, datetime(2026, 4, 1, 12), (whey, 1), status=PAID, number="GN-5")
+    make_order(user, datetime(2025, 3, 3, 12), (whey, 4), status=PAID, number="GN-6")                     # año anterior
+    run(_rebuild_rollups())
+
+
+def _analytics(client, **params):
+    response = client.get("/api/admin/analytics/sales", params=params, headers=admin_headers())
+    assert response.status_code == 200
+    return response.json()
+
+
+def _points(series, metric="revenue"):
+    return [(point["period"], point[metric]) for point in series["points"]]
+
+
+def test_daily_series_fills_gaps_with_zero(client):
+    _seed()
+
+    body = _analytics(client, **{"from": "2026-03-01", "to": "2026-03-05"})
+
+    (total,) = body["series"]
+    assert total["key"] == "total"
+    # Solo pedidos cobrados (COMPLETADO/ENVIADO)
+    assert _points(total) == [
+        ("2026-03-01", 0.0), ("2026-03-02", 10.0), ("2026-03-03", 0.0), ("2026-03-04", 50.0), ("2026-03-05", 0.0),
+    ]
+    assert total["totals"] == {"revenue": 60.0, "orders": 2.0}
+
+
+def test_week_and_month_granularity(client):
+    _seed()
+
+    weeks = _analytics(client, **{"from": "2026-03-02", "to": "2026-03-15", "granularity": "week"})
+    months = _analytics(client, **{"from": "2026-03-01", "to": "2026-04-30", "granularity": "month"})
+
+    # Semanas de lunes a domingo
+    assert _points(weeks["series"][0]) == [("2026-03-02", 60.0), ("2026-03-09", 35.0)]
+    assert _points(months["series"][0]) == [("2026-03-01", 95.0), ("2026-04-01", 25.0)]
+
+
+def test_group_by_keeps_top_keys_and_folds_the_rest(client):
+    _seed()
+
+    body = _analytics(client, **{"from": "2026-03-01", "to": "2026-03-31", "group_by": "category", "top": 1})
+
+    assert [(series["key"], series["totals"]) for series in body["series"]] == [
+        ("Proteínas", {"revenue": 50.0, "units": 2.0}),
+        ("Otros", {"revenue": 45.0, "units": 5.0}),
+    ]
+
+
+def test_compare_with_previous_year(client):
+    _seed()
+
+    body = _analytics(client, **{"from": "2026-03-01", "to": "2026-03-31", "granularity": "month", "compare": "yoy"})
+
+    previous = body["previous_year"]
+    assert (previous["from"], previous["to"]) == ("2025-03-01", "2025-03-31")
+    assert _points(previous["series"][0]) == [("2025-03-01", 100.0)]
+
+
+def test_invalid_ranges_are_rejected(client):
+    url = "/api/admin/analytics/sales"
+    assert client.get(url, params={"from": "2026-03-05", "to": "2026-03-01"}, headers=admin_headers()).status_code == 400
+    assert client.get(url, params={"from": "2010-01-01", "to": "2026-01-01"}, headers=admin_headers()).status_code == 400
+    assert client.get(url, params={"granularity": "hour"}, headers=admin_headers()).status_code == 422
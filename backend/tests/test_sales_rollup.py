@@ -0,0 +1,136 @@
+# backend/tests/test_sales_rollup.py
+
+import pytest
+from sqlalchemy import event, func, select
+
+from conftest import add_all, admin_headers, auth_headers, make_products, make_user, order_payload, run
+from core.config import settings
+from core.database import AsyncSessionLocal, async_engine
+from models.analytics import DailyProductSalesRollup, DailySalesRollup
+from models.order import Order, OrderItem, OrderStatus
+from models.user import User
+from services import sales_rollup
+
+
+async def _buckets():
+    """Rollups sumados por cubo (sin shards) y sin cubos vacíos."""
+    async with AsyncSessionLocal() as db:
+        totals = await db.execute(
+            select(DailySalesRollup.status, func.sum(DailySalesRollup.orders_count), func.sum(DailySalesRollup.gross_amount))
+            .group_by(DailySalesRollup.status)
+            .having(func.sum(DailySalesRollup.orders_count) != 0)
+            .order_by(DailySalesRollup.status)
+        )
+        products = await db.execute(
+            select(DailyProductSalesRollup.product_id, DailyProductSalesRollup.status,
+                   func.sum(DailyProductSalesRollup.units), func.sum(DailyProductSalesRollup.revenue))
+            .group_by(DailyProductSalesRollup.product_id, DailyProductSalesRollup.status)
+            .having(func.sum(DailyProductSalesRollup.units) != 0)
+            .order_by(DailyProductSalesRollup.product_id, DailyProductSalesRollup.status)
+        )
+        return [tuple(row) for row in totals], [tuple(row) for row in products]
+
+
+async def _rebuild():
+    async with AsyncSessionLocal() as db:
+        await sales_rollup.rebuild(db)
+        await db.commit()
+
+
+def _place_orders(client, product_ids):
+    return [
+        client.post("/api/orders/", json=order_payload(*items, shipping_cost=0), headers=auth_headers()).json()["id"]
+        for items in ([(product_ids[0], 1)], [(product_ids[0], 2), (product_ids[1], 1)], [(product_ids[1], 3)])
+    ]
+
+
+def test_rollups_follow_orders_and_status_changes(client):
+    make_user()
+    first, second = (product.id for product in make_products({"price": 10.0}, {"price": 25.0}))
+    orders = _place_orders(client, [first, second])
+
+    response = client.patch(f"/api/admin/orders/{orders[1]}/status", json={"status": "COMPLETADO"}, headers=admin_headers())
+    assert response.status_code == 200
+
+    totals, products = run(_buckets())
+    assert totals == [("COMPLETADO", 1, 45.0), ("PENDING", 2, 85.0)]
+    assert products == [
+        (first, "COMPLETADO", 2, 20.0),
+        (first, "PENDING", 1, 10.0),
+        (second, "COMPLETADO", 1, 25.0),
+        (second, "PENDING", 3, 75.0),
+    ]
+
+    # Los rollups incrementales coinciden con una reconstrucción desde los pedidos
+    run(_rebuild())
+    assert run(_buckets()) == (totals, products)
+
+
+def test_orders_are_spread_across_shards(client):
+    make_user()
+    (product,) = make_products({"price": 10.0})
+    for _ in range(3):
+        client.post("/api/orders/", json=order_payload((product.id, 1), shipping_cost=0), headers=auth_headers())
+
+    async def shards():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(DailySalesRollup.shard, DailySalesRollup.orders_count))
+            return dict(result.all())
+
+    assert run(shards()) == {order_id % settings.SALES_ROLLUP_SHARDS: 1 for order_id in (1, 2, 3)}
+
+
+@pytest.mark.anyio
+async def test_rows_are_locked_in_a_fixed_order():
+    """Pedido nuevo y cambio de estado escriben los cubos en el mismo orden (sin deadlocks)."""
+    (user,) = await add_all(User(email="cliente@example.com", name="Cliente", hashed_password="!"))
+    (order,) = await add_all(Order(
+        user_id=user.id, order_number="GN-1", total_amount=60.0, status=OrderStatus.PENDING,
+        payment_method="tarjeta", shipping_address="Calle 1", shipping_type="estandar", shipping_cost=0,
+    ))
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "daily_product_sales_rollup" in statement and statement.lstrip().upper().startswith("INSERT"):
+            statements.append(parameters)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with AsyncSessionLocal() as db:
+            order = await db.get(Order, order.id)
+            await sales_rollup.record_new_order(db, order, [(9, 1, 10.0), (3, 1, 20.0), (5, 1, 30.0)])
+            await sales_rollup._apply(
+                db, sales_rollup.order_day(order.created_at), 0,
+                [(OrderStatus.PENDING, -1), (OrderStatus.COMPLETADO, 1)],
+                order.total_amount, {9: (1, 10.0), 3: (1, 20.0)},
+            )
+            await db.rollback()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+    def keys(parameters):
+        # (product_id, status) en el orden en que van en el INSERT multi-fila
+        values = list(parameters)
+        return [(values[i + 1], values[i + 2]) for i in range(0, len(values), 6)]
+
+    assert keys(statements[0]) == [(3, "PENDING"), (5, "PENDING"), (9, "PENDING")]
+    assert keys(statements[1]) == [(3, "COMPLETADO"), (3, "PENDING"), (9, "COMPLETADO"), (9, "PENDING")]
+
+
+
+@pytest.mark.anyio
+async def test_empty_rollups_are_backfilled_from_orders():
+    assert await sales_rollup.backfill_if_empty() is False  # sin pedidos no hay nada que rellenar
+
+    (user,) = await add_all(User(email="cliente@example.com", name="Cliente", hashed_password="!"))
+    (order,) = await add_all(Order(
+        user_id=user.id, order_number="GN-1", total_amount=30.0, status=OrderStatus.ENVIADO,
+        payment_method="tarjeta", shipping_address="Calle 1", shipping_type="estandar", shipping_cost=0,
+    ))
+    await add_all(OrderItem(order_id=order.id, product_id=7, quantity=3, product_name="P",
+                            product_price=10.0, line_total=30.0))
+
+    assert await sales_rollup.backfill_if_empty() is True
+    assert await _buckets() == ([("ENVIADO", 1, 30.0)], [(7, "ENVIADO", 3, 30.0)])
+    assert await sales_rollup.backfill_if_empty() is False
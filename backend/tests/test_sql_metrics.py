@@ -0,0 +1,100 @@
+# backend/tests/test_sql_metrics.py
+
+import asyncio
+import json
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from conftest import make_products
+from core.database import AsyncSessionLocal, async_engine
+from core.sql_metrics import SQLMetricsMiddleware, instrument
+
+
+@pytest.fixture(autouse=True)
+def instrumented():
+    # main.py lo hace al arrancar; aquí algunas pruebas no importan la app
+    instrument(async_engine.sync_engine)
+
+
+def _queries(server_timing: str) -> int:
+    # db;dur=1.2;desc="3 queries", db-slowest;dur=0.4
+    return int(server_timing.split('desc="')[1].split(" ")[0])
+
+
+def _call(app, path="/prueba"):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    async def main():
+        try:
+            await app(scope, receive, send)
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(main())
+    return dict(messages[0]["headers"])
+
+
+def _app_running(*statements):
+    """App ASGI que lanza las sentencias con una sesión async (dentro del greenlet de SQLAlchemy)."""
+    async def app(scope, receive, send):
+        async with AsyncSessionLocal() as db:
+            for statement in statements:
+                await db.execute(text(statement))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def test_server_timing_counts_queries_from_async_sessions():
+    headers = _call(SQLMetricsMiddleware(_app_running("SELECT 1", "SELECT 2", "SELECT 3")))
+
+    timing = headers[b"server-timing"].decode()
+    assert _queries(timing) == 3
+    assert "db-slowest;dur=" in timing
+
+
+def test_requests_without_queries_have_no_header():
+    headers = _call(SQLMetricsMiddleware(_app_running()))
+
+    assert b"server-timing" not in headers
+
+
+def test_repeated_statement_is_reported_as_n_plus_one(caplog):
+    app = SQLMetricsMiddleware(_app_running(*["SELECT 1"] * 4, "SELECT 2"), n_plus_one_threshold=4)
+
+    with caplog.at_level(logging.INFO, logger="core.sql_metrics"):
+        _call(app)
+
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    # El log por petición está desactivado por defecto; el aviso de N+1 no
+    assert [(e["event"], e["sql"], e["count"]) for e in events] == [("sql_n_plus_one", "SELECT 1", 4)]
+
+
+def test_request_log_when_enabled(caplog):
+    app = SQLMetricsMiddleware(_app_running("SELECT 1"), log_requests=True)
+
+    with caplog.at_level(logging.INFO, logger="core.sql_metrics"):
+        _call(app, "/api/products/")
+
+    (event,) = [json.loads(record.getMessage()) for record in caplog.records]
+    assert (event["event"], event["path"], event["queries"]) == ("request_sql", "/api/products/", 1)
+
+
+def test_app_reports_queries_of_each_request(client):
+    (product,) = make_products({"name": "Creatina"})
+
+    first = client.get(f"/api/products/{product.id}")
+    cached = client.get(f"/api/products/{product.id}")
+
+    # Versión del catálogo + el producto; la segunda sale de la caché sin consultar
+    assert _queries(first.headers["server-timing"]) == 2
+    assert "server-timing" not in cached.headers
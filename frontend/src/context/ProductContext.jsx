@@ -1,25 +1,56 @@
-import React, { createContext, useState, useContext, useEffect } from 'react';
-import axios from 'axios';
+import React, { createContext, useState, useContext, useEffect, useCallback, useRef } from 'react';
+import { fetchProductsPage } from '../utils/api';
 
 const ProductContext = createContext();
 
+// El catálogo se pide página a página y solo cuando algún componente usa useProducts():
+// montar la app ya no descarga todos los productos.
 export function ProductProvider({ children }) {
   const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const started = useRef(false);
+  const inFlight = useRef(false);
 
-useEffect(() => {
-  // Construye la URL completa usando la variable de entorno
-  const apiUrl = `${import.meta.env.VITE_API_URL}/api/products`;
-  
-  axios.get(apiUrl)
-    .then(res => setProducts(res.data))
-    .catch(err => console.log(err));
-}, []);
+  const loadPage = useCallback(async (cursor) => {
+    if (inFlight.current) return;
+    inFlight.current = true;
+    setLoading(true);
+    try {
+      const page = await fetchProductsPage({}, cursor);
+      setProducts(prev => (cursor ? [...prev, ...page.products] : page.products));
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.log(err);
+    } finally {
+      inFlight.current = false;
+      setLoading(false);
+    }
+  }, []);
+
+  const ensureLoaded = useCallback(() => {
+    if (!started.current) {
+      started.current = true;
+      loadPage(null);
+    }
+  }, [loadPage]);
+
+  const loadMore = useCallback(() => {
+    if (nextCursor) loadPage(nextCursor);
+  }, [loadPage, nextCursor]);
 
   return (
-    <ProductContext.Provider value={{ products }}>
+    <ProductContext.Provider value={{ products, loading, hasMore: Boolean(nextCursor), loadMore, ensureLoaded }}>
       {children}
     </ProductContext.Provider>
   );
 }
 
-export const useProducts = () => useContext(ProductContext);
+export const useProducts = () => {
+  const context = useContext(ProductContext);
+  const { ensureLoaded } = context;
+  useEffect(() => {
+    ensureLoaded();
+  }, [ensureLoaded]);
+  return context;
+};
@@ -9,10 +9,21 @@ import { DataGrid } from '@mui/x-data-grid';
 import { useForm } from 'react-hook-form';
 import { Add, Edit, Delete, Image as ImageIcon, Close as CloseIcon } from '@mui/icons-material';
 import { uploadImage } from '../../utils/uploadImageToFirebase';
+import { fetchAllProducts } from '../../utils/api';
 
 // ✅ CORRECCIÓN: Se define la URL base de la API usando variables de entorno
 const API_URL = `${import.meta.env.VITE_API_URL}/api/products`;
 
+// El login de admin guarda { token } en localStorage.user (AuthContext)
+const adminAuthHeaders = () => {
+  try {
+    const token = JSON.parse(localStorage.getItem('user'))?.token;
+    return token ? { Authorization: `Bearer ${token}` } : {};
+  } catch {
+    return {};
+  }
+};
+
 function ProductsPage() {
   const { register, handleSubmit, reset, setValue, watch, formState: { errors } } = useForm();
   const imageFile = watch('image'); 
@@ -43,14 +54,8 @@ function ProductsPage() {
   const loadProducts = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(API_URL);
-      if (Array.isArray(response.data)) {
-        setProducts(response.data);
-      } else {
-        console.error("La respuesta de la API no es un array válido:", response.data);
-        setProducts([]);
-        setSnackbar({ open: true, message: 'Error: La respuesta del servidor no es válida.', severity: 'error' });
-      }
+      // Todas las páginas, incluidos los inactivos (requiere el token de admin)
+      setProducts(await fetchAllProducts({ include_inactive: true }, adminAuthHeaders()));
     } catch (error) {
       console.error("Error al cargar productos:", error);
       setProducts([]);
@@ -73,7 +73,8 @@ export default function Home() {
     // ✅ CORRECCIÓN 1: La llamada a la API usa la variable de entorno
     const API_URL = `${import.meta.env.VITE_API_URL}/api/products`;
     
-    axios.get(API_URL)
+    // Solo se muestran 8: basta con la primera página del listado
+    axios.get(API_URL, { params: { limit: 8 } })
       .then(res => setProducts(res.data.products || res.data))
       .catch(() => setProducts([]))
       .finally(() => setLoading(false));
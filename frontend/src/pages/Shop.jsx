@@ -1,5 +1,5 @@
-import { useState, useEffect } from "react";
-import axios from "axios";
+import { useState, useEffect, useRef } from "react";
+import { fetchProductsPage, searchProducts } from "../utils/api";
 import ProductCard from "../components/ProductCard";
 
 const FILTERS = [
@@ -10,32 +10,73 @@ const FILTERS = [
   { key: "ganadores de peso", label: "Ganadores de peso" },
 ];
 
+const SEARCH_DELAY_MS = 300;
+
 export default function Shop() {
   const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
-  const [visible, setVisible] = useState(12);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [activeFilters, setActiveFilters] = useState([]);
   
   // --- PASO 1: Crea un estado para el término de búsqueda ---
   const [searchTerm, setSearchTerm] = useState("");
+  // Cambia con cada búsqueda o filtro: una página pedida antes ya no se añade
+  const listingRef = useRef(0);
 
+  // Filtros y búsqueda se resuelven en el servidor: solo se descarga lo que se muestra
   useEffect(() => {
-    // 1. Obtenemos la URL de la API desde las variables de entorno
-    const API_URL = import.meta.env.VITE_API_URL;
-
-    setLoading(true);
-    // 2. Usamos la URL completa para la petición
-    axios.get(`${API_URL}/api/products`) // <-- LÍNEA CORREGIDA
-      .then(res => {
-        if (Array.isArray(res.data)) {
-          setProducts(res.data);
+    let cancelled = false;
+    listingRef.current += 1;
+    const term = searchTerm.trim();
+    const load = async () => {
+      setLoading(true);
+      try {
+        if (term) {
+          // La búsqueda devuelve un único bloque rankeado; las categorías se aplican encima
+          const found = await searchProducts(term);
+          if (cancelled) return;
+          setProducts(found.filter(product =>
+            activeFilters.length === 0 ||
+            (product.category && activeFilters.includes(product.category.toLowerCase()))
+          ));
+          setNextCursor(null);
         } else {
+          const page = await fetchProductsPage({ category: activeFilters });
+          if (cancelled) return;
+          setProducts(page.products);
+          setNextCursor(page.nextCursor);
+        }
+      } catch {
+        if (!cancelled) {
           setProducts([]);
+          setNextCursor(null);
         }
-      })
-      .catch(() => setProducts([]))
-      .finally(() => setLoading(false));
-  }, []);
+      } finally {
+        if (!cancelled) setLoading(false);
+      }
+    };
+    const timer = setTimeout(load, term ? SEARCH_DELAY_MS : 0);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [activeFilters, searchTerm]);
+
+  const loadMore = async () => {
+    const listing = listingRef.current;
+    setLoadingMore(true);
+    try {
+      const page = await fetchProductsPage({ category: activeFilters }, nextCursor);
+      if (listing !== listingRef.current) return;
+      setProducts(prev => [...prev, ...page.products]);
+      setNextCursor(page.nextCursor);
+    } catch {
+      if (listing === listingRef.current) setNextCursor(null);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleFilterChange = (filterKey) => {
     setActiveFilters(prevFilters => 
@@ -44,20 +85,6 @@ export default function Shop() {
         : [...prevFilters, filterKey]
     );
   };
-  
-  // --- PASO 3: Modifica el filtrado para incluir la búsqueda por nombre ---
-  const filteredProducts = products.filter(product => {
-    // Primero, filtra por categoría (si hay filtros activos)
-    const matchesCategory = activeFilters.length === 0 || 
-      (product.category && activeFilters.includes(product.category.toLowerCase()));
-    
-    // Luego, filtra por el término de búsqueda (si existe)
-    const matchesSearch = searchTerm.trim() === "" || 
-      product.name.toLowerCase().includes(searchTerm.toLowerCase());
-      
-    // El producto se muestra si cumple ambas condiciones
-    return matchesCategory && matchesSearch;
-  });
 
   return (
     <div className="shop-bg-gradient min-vh-100 pt-5">
@@ -98,28 +125,29 @@ export default function Shop() {
             <h1 className="fs-2 fw-bold text-primary">
               Tienda <span className="text-warning">Suplementos</span>
             </h1>
-            <span className="text-secondary small">{filteredProducts.length} productos</span>
+            <span className="text-secondary small">{products.length}{nextCursor ? "+" : ""} productos</span>
           </div>
           {loading ? (
             <div className="text-primary fw-bold fs-4 py-5 text-center">Cargando productos...</div>
-          ) : filteredProducts.length === 0 ? (
+          ) : products.length === 0 ? (
             <div className="text-muted py-5 text-center fw-semibold fs-5">No se encontraron productos.</div>
           ) : (
             <div className="row g-3 animate-fade-in">
-              {filteredProducts.slice(0, visible).map(product => (
+              {products.map(product => (
                 <div className="col-12 col-sm-6 col-md-4" key={product.id}>
                   <ProductCard product={product} />
                 </div>
               ))}
             </div>
           )}
-          {visible < filteredProducts.length && (
+          {!loading && nextCursor && (
             <div className="d-flex justify-content-center mt-5">
               <button
                 className="btn btn-primary btn-lg fw-bold rounded-pill shop-btn"
-                onClick={() => setVisible(v => v + 8)}
+                onClick={loadMore}
+                disabled={loadingMore}
               >
-                Ver más productos
+                {loadingMore ? "Cargando..." : "Ver más productos"}
               </button>
             </div>
           )}
@@ -1,3 +1,5 @@
+import axios from "axios";
+
 export async function apiFetch(url, options = {}) {
   const token = localStorage.getItem("admin_token");
   const headers = {
@@ -6,4 +8,43 @@ export async function apiFetch(url, options = {}) {
     "Content-Type": "application/json",
   };
   return fetch(url, { ...options, headers });
-}
\ No newline at end of file
+}
+
+// El listado de productos está paginado por cursor: la cabecera X-Next-Cursor trae el
+// cursor de la página siguiente (ausente en la última).
+const PRODUCTS_URL = `${import.meta.env.VITE_API_URL}/api/products`;
+export const PRODUCTS_PAGE_SIZE = 24;
+const PRODUCTS_PAGE_MAX = 500;
+
+// Una página del catálogo: { products, nextCursor }. Los filtros van en `params`;
+// category puede ser una lista (?category=a&category=b).
+export async function fetchProductsPage(params = {}, cursor = null, headers = {}) {
+  const res = await axios.get(PRODUCTS_URL, {
+    params: { limit: PRODUCTS_PAGE_SIZE, ...params, ...(cursor ? { cursor } : {}) },
+    paramsSerializer: { indexes: null },
+    headers,
+  });
+  if (!Array.isArray(res.data)) {
+    throw new Error("La respuesta de la API no es un array válido");
+  }
+  return { products: res.data, nextCursor: res.headers["x-next-cursor"] || null };
+}
+
+// Búsqueda rankeada (tolera errores de tipeo); devuelve como mucho `limit` productos.
+export async function searchProducts(q, limit = 100) {
+  const res = await axios.get(`${PRODUCTS_URL}/search`, { params: { q, limit } });
+  return Array.isArray(res.data) ? res.data : [];
+}
+
+// Catálogo completo siguiendo todas las páginas. Solo para el panel de admin: la tienda
+// pide página a página con fetchProductsPage.
+export async function fetchAllProducts(params = {}, headers = {}) {
+  const products = [];
+  let cursor = null;
+  do {
+    const page = await fetchProductsPage({ limit: PRODUCTS_PAGE_MAX, ...params }, cursor, headers);
+    products.push(...page.products);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return products;
+}